@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_batch.py
+"""
+POST /api/batch против отдельных запросов: k изменений подписок подряд
+(как при редактировании нескольких подписок в клиенте) отдельными PATCH
+и одним пакетом — без общей транзакции и с atomic=true.
+Сервер — uvicorn на временной базе; клиент ждет ответа перед следующим запросом,
+как Flutter-клиент при последовательных записях. --rtt-ms добавляет задержку
+сети на каждый запрос.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_batch --sizes 1 5 20 --rtt-ms 30
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db_url: str, subscriptions: int) -> tuple:
+    os.environ["DATABASE_URL"] = db_url
+    from sqlalchemy import select
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, init_db
+    from backend.models.subscription import Subscription
+
+    init_db()
+    user_id = seed_user(engine, "batch@example.com", subscriptions=subscriptions, notifications=0)
+    with engine.connect() as conn:
+        sub_ids = [row[0] for row in conn.execute(select(Subscription.id).where(Subscription.userId == user_id))]
+    engine.dispose()
+    return user_id, sub_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Имитация задержки сети на запрос, мс")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="subs-batch-") as tmp_dir:
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'batch.db')}"
+        user_id, sub_ids = seed(db_url, max(args.sizes))
+        from backend.utils.security import create_access_token
+        headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env={**os.environ, "DATABASE_URL": db_url, "LOG_LEVEL": "WARNING"},
+            stdout=subprocess.DEVNULL
+        )
+        base = f"http://127.0.0.1:{args.port}"
+        try:
+            for _ in range(300):
+                try:
+                    httpx.get(base + "/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+
+            with httpx.Client(base_url=base, headers=headers, timeout=60) as client:
+                amount = iter(range(1000, 10_000_000))
+
+                def send(method, path, **kwargs):
+                    if args.rtt_ms:
+                        time.sleep(args.rtt_ms / 1000)
+                    response = client.request(method, path, **kwargs)
+                    response.raise_for_status()
+                    return response
+
+                def separate(k):
+                    for sub_id in sub_ids[:k]:
+                        send("PATCH", f"/api/subscriptions/{sub_id}", json={"currentAmount": next(amount)})
+
+                def batch(k, atomic):
+                    result = send("POST", "/api/batch", json={"atomic": atomic, "operations": [
+                        {"method": "PATCH", "path": f"/api/subscriptions/{sub_id}",
+                         "body": {"currentAmount": next(amount)}}
+                        for sub_id in sub_ids[:k]
+                    ]}).json()
+                    assert result["committed"] and all(item["status"] == 200 for item in result["results"]), result
+
+                variants = [
+                    ("отдельные PATCH", separate),
+                    ("/api/batch", lambda k: batch(k, False)),
+                    ("/api/batch atomic", lambda k: batch(k, True)),
+                ]
+                print(f"Повторов: {args.repeat}, задержка сети: {args.rtt_ms} мс на запрос")
+                for k in args.sizes:
+                    print(f"\n{k} изменений подписок:")
+                    baseline = None
+                    for title, fn in variants:
+                        fn(k)
+                        timings = []
+                        for _ in range(args.repeat):
+                            started = time.perf_counter()
+                            fn(k)
+                            timings.append((time.perf_counter() - started) * 1000)
+                        median = statistics.median(timings)
+                        baseline = baseline or median
+                        print(f"  {title:20} медиана {median:8.1f} мс  ({median / k:6.2f} мс на изменение, "
+                              f"{median / baseline:.2f}x)")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# backend/benchmarks/bench_compression.py
+"""
+Сжатие типичных ответов: сколько байт экономит gzip/brotli на каждом уровне и
+сколько процессорного времени стоит. Ответы берутся из приложения на временной
+базе: список подписок, сгруппированные уведомления, история цен и подписка с историей.
+В конце — сквозная проверка CompressionMiddleware с уровнями по умолчанию.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_compression --subscriptions 50 --notifications 500
+"""
+import argparse
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+GZIP_LEVELS = (1, 3, 4, 5, 6, 9)
+BROTLI_QUALITIES = (1, 3, 4, 5, 7, 11)
+
+
+def cpu_us(fn, repeat: int) -> float:
+    """Процессорное время одного вызова, мкс (process_time не учитывает ожидание)"""
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=50)
+    parser.add_argument("--notifications", type=int, default=500)
+    parser.add_argument("--price-changes", type=int, default=24, help="Записей истории цен у одной подписки")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-compression-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert, select
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, init_db
+    from backend.main import app
+    from backend.models.subscription import PriceHistory, Subscription
+    from backend.utils import compression
+    from backend.utils.security import create_access_token
+
+    init_db()
+
+    user_id = seed_user(engine, "compression@example.com", subscriptions=args.subscriptions,
+                        notifications=args.notifications, read_ratio=0.5)
+    with engine.begin() as conn:
+        sub_ids = [row[0] for row in conn.execute(select(Subscription.id).where(Subscription.userId == user_id))]
+        start = date.today() - timedelta(days=30 * args.price_changes)
+        conn.execute(insert(PriceHistory), [
+            {"subscriptionId": sub_id, "amount": 100 + i, "startDate": start + timedelta(days=30 * i)}
+            for sub_id in sub_ids for i in range(args.price_changes if sub_id == sub_ids[0] else 1)
+        ])
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}",
+               "Accept-Encoding": "identity"}
+    payloads = {
+        "GET /api/subscriptions": client.get("/api/subscriptions", headers=headers).content,
+        "GET /notifications/grouped": client.get("/notifications/grouped", headers=headers).content,
+        "GET /api/subscriptions/{id}/price-history":
+            client.get(f"/api/subscriptions/{sub_ids[0]}/price-history", headers=headers).content,
+        "GET /api/subscriptions/{id}": client.get(f"/api/subscriptions/{sub_ids[0]}", headers=headers).content,
+    }
+
+    codecs = [(f"gzip {level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+              for level in GZIP_LEVELS]
+    if compression.brotli is not None:
+        codecs += [(f"br {quality}", lambda body, quality=quality: compression.brotli.compress(body, quality=quality))
+                   for quality in BROTLI_QUALITIES]
+    else:
+        print("Пакет brotli не установлен: только gzip")
+
+    print(f"Подписок: {args.subscriptions}, уведомлений: {args.notifications}, "
+          f"порог сжатия: {compression.COMPRESSION_MIN_SIZE} байт")
+    for title, body in payloads.items():
+        print(f"\n{title}: {len(body)} байт")
+        for name, codec in codecs:
+            size = len(codec(body))
+            spent = cpu_us(lambda: codec(body), args.repeat)
+            print(f"  {name:8} {size:8} байт ({size / len(body):6.1%}), сэкономлено {len(body) - size:8} байт, "
+                  f"CPU {spent:8.1f} мкс ({spent / (len(body) / 1_000_000):7.0f} мкс/МБ)")
+
+    print(f"\nCompressionMiddleware (gzip {compression.GZIP_LEVEL}, br {compression.BROTLI_QUALITY}):")
+    for encoding in ("gzip", "br", "identity"):
+        if encoding == "br" and compression.brotli is None:
+            continue
+        response = client.get("/notifications/grouped", headers={**headers, "Accept-Encoding": encoding})
+        print(f"  Accept-Encoding: {encoding:8} -> Content-Encoding: "
+              f"{response.headers.get('content-encoding', '-'):5} {response.num_bytes_downloaded} байт по сети")
+
+    client.close()
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
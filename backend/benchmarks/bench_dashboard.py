@@ -0,0 +1,163 @@
+# backend/benchmarks/bench_dashboard.py
+"""
+GET /api/dashboard против сегодняшнего набора запросов главного экрана:
+/api/subscriptions, /notifications/grouped, /api/analytics за текущий месяц
+и /notifications/subscription/{id}/unread-count по каждой подписке.
+
+Набор запросов измеряется последовательно и параллельно (как отправляет
+Flutter-клиент), /api/dashboard — с параллельными чтениями и без них
+(DASHBOARD_CONCURRENT=0, отдельный сервер). Сервера — uvicorn на временной базе.
+Заодно проверяется, что суммы и бейджи в /api/dashboard совпадают с отдельными эндпоинтами.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_dashboard --subscriptions 30 --notifications 3000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db_url: str, args) -> tuple:
+    os.environ["DATABASE_URL"] = db_url
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import Session
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, init_db
+    from backend.models.subscription import PriceHistory, Subscription
+    from backend.services.unread_counters import backfill_unread_counters
+
+    init_db()
+    user_id = seed_user(engine, "dashboard@example.com", subscriptions=args.subscriptions,
+                        notifications=args.notifications, read_ratio=0.7)
+    with engine.begin() as conn:
+        sub_ids = [row[0] for row in conn.execute(select(Subscription.id).where(Subscription.userId == user_id))]
+        month_start = date.today().replace(day=1)
+        conn.execute(insert(PriceHistory), [
+            {"subscriptionId": sub_id, "amount": 100 + i + k, "startDate": month_start - timedelta(days=30 * k)}
+            for i, sub_id in enumerate(sub_ids) for k in range(args.price_changes)
+        ])
+    with Session(engine) as db:
+        backfill_unread_counters(db)
+    engine.dispose()
+    return user_id, sub_ids
+
+
+def start_server(port: int, db_url: str, concurrent: bool) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "DATABASE_URL": db_url, "LOG_LEVEL": "WARNING",
+             "DASHBOARD_CONCURRENT": "1" if concurrent else "0"},
+        stdout=subprocess.DEVNULL
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn не запустился")
+
+
+def fan_out_requests(sub_ids: list) -> list:
+    today = date.today()
+    requests = [
+        ("/api/subscriptions", None),
+        ("/notifications/grouped", None),
+        ("/api/analytics", {"period": "month", "year": today.year, "month": today.month}),
+    ]
+    return requests + [(f"/notifications/subscription/{sub_id}/unread-count", None) for sub_id in sub_ids]
+
+
+async def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def run(args, ports: dict, headers: dict, sub_ids: list):
+    requests = fan_out_requests(sub_ids)
+    async with httpx.AsyncClient(headers=headers, timeout=60) as client:
+        base = f"http://127.0.0.1:{ports['concurrent']}"
+
+        async def get(path, params=None, port_base=base):
+            response = await client.get(port_base + path, params=params)
+            response.raise_for_status()
+            return response
+
+        async def sequential():
+            for path, params in requests:
+                await get(path, params)
+
+        async def parallel():
+            await asyncio.gather(*(get(path, params) for path, params in requests))
+
+        dashboard_serial_base = f"http://127.0.0.1:{ports['serial']}"
+        variants = [
+            (f"Набор запросов последовательно ({len(requests)} шт.)", sequential),
+            (f"Набор запросов параллельно ({len(requests)} шт.)", parallel),
+            ("/api/dashboard, чтения последовательно", lambda: get("/api/dashboard", port_base=dashboard_serial_base)),
+            ("/api/dashboard, чтения параллельно", lambda: get("/api/dashboard")),
+        ]
+        for _, fn in variants:
+            await fn()
+
+        # Суммы и бейджи совпадают с отдельными эндпоинтами
+        dashboard = (await get("/api/dashboard")).json()
+        analytics = (await get(*requests[2])).json()
+        assert dashboard["analytics"] == analytics, (dashboard["analytics"], analytics)
+        for sub_id in sub_ids:
+            single = (await get(f"/notifications/subscription/{sub_id}/unread-count")).json()["unread_count"]
+            assert dashboard["unread_counts"].get(str(sub_id), 0) == single
+        assert len(dashboard["subscriptions"]) == len((await get("/api/subscriptions")).json())
+
+        print(f"Подписок: {args.subscriptions}, уведомлений: {args.notifications}, повторов: {args.repeat}")
+        results = [(title, await timed(fn, args.repeat)) for title, fn in variants]
+        baseline = results[0][1]
+        for title, median in results:
+            print(f"  {title:45} медиана {median:8.1f} мс  ({median / baseline:.2f}x от последовательного набора)")
+        size = len((await client.get(base + "/api/dashboard")).content)
+        print(f"  Размер ответа /api/dashboard: {size} байт, upcoming: {len(dashboard['upcoming_payments'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=30)
+    parser.add_argument("--notifications", type=int, default=3000)
+    parser.add_argument("--price-changes", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="subs-dashboard-") as tmp_dir:
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'dashboard.db')}"
+        user_id, sub_ids = seed(db_url, args)
+        from backend.utils.security import create_access_token
+        headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+
+        ports = {"concurrent": args.port, "serial": args.port + 1}
+        servers = [start_server(ports["concurrent"], db_url, True), start_server(ports["serial"], db_url, False)]
+        try:
+            asyncio.run(run(args, ports, headers, sub_ids))
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_metrics_overhead.py
+"""
+Накладные расходы метрик: одно и то же приложение вызывается напрямую через
+ASGI (без сети и HTTP-клиента) без MetricsMiddleware и с ним, плюс с событиями
+SQLAlchemy на Engine. Завершается с кодом 1, если добавка на запрос больше бюджета.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_metrics_overhead --requests 2000 --budget-us 50
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+
+async def call(app, path: str, headers: list) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def timed(app, path: str, headers: list, requests: int) -> float:
+    """Среднее время запроса, мкс"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path, headers)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--budget-us", type=float, default=50.0, help="Допустимая добавка на запрос, мкс")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-metrics-")
+    # Приложение собирается без метрик; middleware и события подключаем вручную
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ["METRICS_ENABLED"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from sqlalchemy import insert
+    from backend.database import engine, init_db
+    from backend.main import app
+    from backend.models.subscription import Subscription
+    from backend.models.user import User
+    from backend.utils.metrics import MetricsMiddleware, instrument_engine, uninstrument_engine, registry
+    from backend.utils.security import create_access_token
+
+    init_db()
+
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(email="metrics@example.com", password="x")).inserted_primary_key[0]
+        sub_id = conn.execute(insert(Subscription).values(
+            userId=user_id, name="Metrics", currentAmount=100, nextPaymentDate=date.today(),
+            connectedDate=date.today(), category="video", notifyDays=3, billingCycle="monthly",
+            autoRenewal=False, notificationsEnabled=True, createdAt=datetime.utcnow(), updatedAt=datetime.utcnow()
+        )).inserted_primary_key[0]
+    auth = [(b"authorization", f"Bearer {create_access_token({'user_id': user_id}, 60)}".encode())]
+
+    cases = [("/health", [], "/health"), (f"/api/subscriptions/{sub_id}", auth, "GET /api/subscriptions/{id}")]
+    wrapped = MetricsMiddleware(app)
+
+    async def run(path, headers) -> dict:
+        # Варианты чередуются внутри каждого раунда, чтобы дрейф машины не попадал в разницу
+        for variant in (app, wrapped):
+            for _ in range(50):
+                assert await call(variant, path, headers) == 200
+        timings = {"plain": [], "middleware": [], "sql_events": []}
+        for _ in range(args.rounds):
+            timings["plain"].append(await timed(app, path, headers, args.requests))
+            timings["middleware"].append(await timed(wrapped, path, headers, args.requests))
+            instrument_engine(engine)
+            timings["sql_events"].append(await timed(wrapped, path, headers, args.requests))
+            uninstrument_engine(engine)
+        return {name: statistics.median(values) for name, values in timings.items()}
+
+    rows = [(title, asyncio.run(run(path, headers))) for path, headers, title in cases]
+    started = time.perf_counter()
+    registry.render()
+    exposition = (time.perf_counter() - started) * 1_000_000
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+    print(f"Запросов на раунд: {args.requests}, раундов: {args.rounds}, бюджет: {args.budget_us:.0f} мкс")
+    worst = 0.0
+    for title, result in rows:
+        added = result["sql_events"] - result["plain"]
+        worst = max(worst, added)
+        print(f"  {title:30} без метрик {result['plain']:8.1f} мкс, middleware {result['middleware']:8.1f} мкс, "
+              f"+ события SQL {result['sql_events']:8.1f} мкс (+{added:.1f})")
+    print(f"  Отрисовка /metrics: {exposition:.0f} мкс")
+
+    if worst > args.budget_us:
+        print(f"Бюджет превышен: +{worst:.1f} мкс > {args.budget_us:.0f} мкс")
+        sys.exit(1)
+    print(f"В пределах бюджета: +{worst:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_notification_digest.py
+"""
+Проверка и замер режима дайджеста: серия изменений подписок (цена, период,
+автопродление) с дайджестом и без. Сравнивает число строк и размер ответа
+/notifications/grouped и проверяет, что семантика непрочитанных не изменилась:
+счетчики совпадают с таблицей, бейдж считает строки, а прочитанный дайджест
+при новом событии снова становится непрочитанным.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_notification_digest --subscriptions 50 --updates 10
+"""
+import argparse
+import asyncio
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from backend.benchmarks.common import temp_database, seed_user, handler_context
+from backend.models.notification import Notification
+from backend.models.subscription import Subscription
+from backend.models.user import User
+from backend.routes.notifications import get_notifications_grouped_by_subscription
+from backend.services.notifications_service import NotificationService
+from backend.services.unread_counters import check_unread_counters, get_unread_count, get_unread_counts
+
+
+def emit_updates(db, user_id: int, sub_ids: list, updates: int, digest: bool):
+    """Каждая подписка получает updates изменений подряд"""
+    for sub_id in sub_ids:
+        for i in range(updates):
+            kind = i % 3
+            if kind == 0:
+                NotificationService.create_notification(
+                    db, user_id, sub_id, "price_changed", "Изменение цены",
+                    f"Цена подписки изменилась: {100 + i} руб.", digest=digest
+                )
+            elif kind == 1:
+                NotificationService.create_notification(
+                    db, user_id, sub_id, "payment_date_changed", "Перенос платежа",
+                    f"Дата платежа изменена на {(date.today() + timedelta(days=i)).strftime('%d.%m.%Y')}",
+                    digest=digest
+                )
+            else:
+                NotificationService.create_notification(
+                    db, user_id, sub_id, "auto_renewal_changed", "Автопродление изменено",
+                    f"Автоматическое продление {'включено' if i % 2 else 'отключено'}", digest=digest
+                )
+
+
+def run_scenario(args, digest: bool) -> dict:
+    with temp_database() as (engine, SessionLocal):
+        user_id = seed_user(engine, subscriptions=args.subscriptions)
+        db = SessionLocal()
+        sub_ids = [row[0] for row in db.query(Subscription.id).filter(Subscription.userId == user_id)]
+
+        emit_updates(db, user_id, sub_ids, args.updates, digest)
+
+        rows = db.query(func.count(Notification.id)).scalar()
+        unread_rows = db.query(func.count(Notification.id)).filter(Notification.read == False).scalar()
+        badges = get_unread_counts(db, user_id)
+        assert sum(badges.values()) == unread_rows, "бейджи не совпадают с непрочитанными строками"
+        assert not check_unread_counters(db, user_id), "счетчики разошлись с таблицей"
+
+        # Прочитали подписку — следующее изменение снова дает один непрочитанный
+        target = sub_ids[0]
+        NotificationService.mark_read(db, user_id, Notification.subscription_id == target)
+        assert get_unread_count(db, user_id, target) == 0
+        emit_updates(db, user_id, [target], 1, digest)
+        assert get_unread_count(db, user_id, target) == 1
+        emit_updates(db, user_id, [target], 2, digest)
+        assert get_unread_count(db, user_id, target) == (1 if digest else 3)
+        assert not check_unread_counters(db, user_id), "счетчики разошлись с таблицей"
+
+        db.expunge_all()
+        grouped = asyncio.run(get_notifications_grouped_by_subscription(
+            *handler_context(), limit=20, fields=None, current_user=db.get(User, user_id), db=db
+        ))
+        payload = len(json.dumps(grouped, default=str).encode())
+        db.close()
+
+    return {"rows": rows, "unread": unread_rows, "payload": payload}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=10, help="Изменений подряд на подписку")
+    args = parser.parse_args()
+
+    plain = run_scenario(args, digest=False)
+    digest = run_scenario(args, digest=True)
+
+    print(f"Подписок: {args.subscriptions}, изменений на подписку: {args.updates}")
+    print(f"  Без дайджеста: {plain['rows']} строк, непрочитанных {plain['unread']}, "
+          f"/grouped {plain['payload'] / 1024:.1f} КБ")
+    print(f"  С дайджестом:  {digest['rows']} строк, непрочитанных {digest['unread']}, "
+          f"/grouped {digest['payload'] / 1024:.1f} КБ")
+    print("  Проверки непрочитанных пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# backend/benchmarks/bench_notification_keys.py
+"""
+Бенчмарк ключей уведомлений: строковый uuid4 + TEXT user_id (старая схема)
+против INTEGER AUTOINCREMENT + INTEGER user_id. Скорость вставки, размер файла
+и время онлайн-миграции старой базы.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_notification_keys --notifications 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from backend.migrations import notification_int_ids
+from backend.migrations.notification_int_ids import _create_index_sql, _create_table_sql
+from backend.models.notification import Notification
+
+LEGACY_DDL = [
+    """CREATE TABLE notifications (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        user_id VARCHAR NOT NULL,
+        subscription_id INTEGER NOT NULL,
+        type VARCHAR NOT NULL,
+        title VARCHAR NOT NULL,
+        message VARCHAR NOT NULL,
+        read BOOLEAN,
+        scheduled_date DATETIME,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+    )""",
+    "CREATE INDEX ix_notifications_user_sub_created ON notifications (user_id, subscription_id, created_at, read)",
+    "CREATE INDEX ix_notifications_user_unread ON notifications (user_id, created_at) WHERE read = 0",
+]
+
+
+def create_schema(path: str, legacy: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    if legacy:
+        statements = LEGACY_DDL
+    else:
+        statements = [_create_table_sql(Notification.__table__, "notifications")] + \
+            _create_index_sql(Notification.__table__)
+    for statement in statements:
+        conn.execute(statement)
+    return conn
+
+
+def make_rows(count: int, legacy: bool, users: int = 20):
+    now = datetime.utcnow()
+    for i in range(count):
+        user_id = i % users + 1
+        values = (
+            str(user_id) if legacy else user_id,
+            i % 50 + 1, "payment_reminder", "Скоро списание", f"Уведомление #{i}",
+            i % 5 != 0, now.isoformat(" "), (now - timedelta(seconds=count - i)).isoformat(" ")
+        )
+        yield (str(uuid.uuid4()), *values) if legacy else values
+
+
+def insert_rows(conn: sqlite3.Connection, legacy: bool, count: int, per_transaction: int) -> float:
+    columns = "user_id, subscription_id, type, title, message, read, scheduled_date, created_at"
+    if legacy:
+        sql = f"INSERT INTO notifications (id, {columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    else:
+        sql = f"INSERT INTO notifications ({columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+    rows = list(make_rows(count, legacy))
+    started = time.perf_counter()
+    for offset in range(0, count, per_transaction):
+        conn.execute("BEGIN")
+        conn.executemany(sql, rows[offset:offset + per_transaction])
+        conn.execute("COMMIT")
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=2000, help="Сколько вставок по одной строке на транзакцию")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="subs-keys-") as tmp_dir:
+        results = {}
+        for legacy in (True, False):
+            path = os.path.join(tmp_dir, "legacy.db" if legacy else "integer.db")
+            conn = create_schema(path, legacy)
+            bulk_rate = insert_rows(conn, legacy, args.notifications, 1000)
+            single_rate = insert_rows(conn, legacy, args.single, 1)
+            conn.close()
+            results[legacy] = (bulk_rate, single_rate, os.path.getsize(path))
+
+        # Миграция старой базы на новую схему
+        legacy_path = os.path.join(tmp_dir, "legacy.db")
+        engine = create_engine(f"sqlite:///{legacy_path}")
+        migrated = notification_int_ids.migrate(engine)
+        engine.dispose()
+        conn = sqlite3.connect(legacy_path, isolation_level=None)
+        conn.execute("VACUUM")
+        conn.close()
+        migrated_size = os.path.getsize(legacy_path)
+
+    total = args.notifications + args.single
+    print(f"Уведомлений: {total}")
+    for legacy, title in ((True, "uuid4 TEXT"), (False, "INTEGER   ")):
+        bulk_rate, single_rate, size = results[legacy]
+        print(f"  {title}: пакетами {bulk_rate:9.0f} строк/с, по одной {single_rate:7.0f} строк/с, "
+              f"файл {size / 1024 / 1024:6.1f} МБ ({size / total:.0f} Б/строку)")
+    print(f"  Миграция старой базы: {migrated['notifications']} строк за {migrated['seconds']:.2f} с, "
+          f"после VACUUM {migrated_size / 1024 / 1024:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
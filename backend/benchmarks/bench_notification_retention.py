@@ -0,0 +1,69 @@
+# backend/benchmarks/bench_notification_retention.py
+"""
+Бенчмарк задачи ретеншна: скорость переноса в архив (строк/с), размер горячей
+таблицы и время /notifications/grouped до и после.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_notification_retention --notifications 100000
+"""
+import argparse
+import asyncio
+import os
+from datetime import timedelta
+
+from sqlalchemy import func, text
+
+from backend.benchmarks.common import temp_database, seed_user, measure, handler_context
+from backend.models.notification import Notification, NotificationArchive
+from backend.models.user import User
+from backend.routes.notifications import get_notifications_grouped_by_subscription
+from backend.services.notification_retention import RetentionPolicy, apply_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90, help="Порог возраста для ретеншна")
+    parser.add_argument("--history-days", type=int, default=365, help="За сколько дней сгенерировать историю")
+    parser.add_argument("--mode", choices=["archive", "delete"], default="archive")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, SessionLocal):
+        user_id = seed_user(engine, notifications=args.notifications, span=timedelta(days=args.history_days))
+        db_path = engine.url.database
+        db = SessionLocal()
+        user = db.get(User, user_id)
+
+        def grouped():
+            db.expunge_all()
+            return asyncio.run(get_notifications_grouped_by_subscription(
+                *handler_context(), limit=20, fields=None, current_user=user, db=db
+            ))
+
+        size_before = os.path.getsize(db_path)
+        grouped_before, _ = measure(grouped)
+
+        report = apply_retention(db, RetentionPolicy(
+            older_than_days=args.days, mode=args.mode, batch_size=args.batch_size
+        ))
+
+        hot = db.query(func.count(Notification.id)).scalar()
+        archived = db.query(func.count(NotificationArchive.id)).scalar()
+        auto_vacuum = db.execute(text("PRAGMA auto_vacuum")).scalar()
+        grouped_after, _ = measure(grouped)
+        size_after = os.path.getsize(db_path)
+        db.close()
+
+    print(f"Уведомлений: {args.notifications} за {args.history_days} дн., порог: {args.days} дн., режим: {args.mode}")
+    print(f"  Обработано: {report.processed} строк, {report.batches} пакетов по {args.batch_size}, "
+          f"{report.seconds:.2f} с -> {report.rows_per_second:.0f} строк/с")
+    print(f"  Горячая таблица: {args.notifications} -> {hot} строк (в архиве: {archived})")
+    print(f"  Итоговых записей истории: {report.summaries}, освобождено страниц: {report.freed_pages} "
+          f"(auto_vacuum={auto_vacuum})")
+    print(f"  Файл БД: {size_before / 1024 / 1024:.1f} МБ -> {size_after / 1024 / 1024:.1f} МБ")
+    print(f"  /notifications/grouped: {grouped_before:.1f} мс -> {grouped_after:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_notifications_grouped.py
+"""
+Бенчмарк /notifications/grouped: старая группировка в Python
+против агрегата и оконной функции в SQL.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_notifications_grouped --notifications 100000
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import desc
+
+from backend.benchmarks.common import temp_database, seed_user, measure, handler_context
+from backend.models.notification import Notification
+from backend.models.subscription import Subscription
+from backend.models.user import User
+from backend.routes.notifications import get_notifications_grouped_by_subscription
+
+
+def legacy_grouped(db, user_id: int):
+    """Прежняя реализация: загрузка всех уведомлений и группировка в Python"""
+    notifications = db.query(Notification).filter(
+        Notification.user_id == user_id
+    ).order_by(desc(Notification.created_at)).all()
+    subscriptions = db.query(Subscription).filter(Subscription.userId == user_id).all()
+    sub_dict = {sub.id: sub for sub in subscriptions}
+
+    grouped = {}
+    for n in notifications:
+        if n.subscription_id not in sub_dict:
+            continue
+        sub = sub_dict[n.subscription_id]
+        group = grouped.setdefault(n.subscription_id, {
+            "subscription_id": sub.id,
+            "subscription_name": sub.name,
+            "subscription_amount": float(sub.currentAmount),
+            "subscription_category": sub.category,
+            "notifications": [],
+            "unread_count": 0,
+            "last_notification_date": None
+        })
+        group["notifications"].append({
+            "id": n.id, "type": n.type, "title": n.title, "message": n.message,
+            "read": n.read, "created_at": n.created_at.isoformat()
+        })
+        if not n.read:
+            group["unread_count"] += 1
+        if not group["last_notification_date"] or n.created_at > group["last_notification_date"]:
+            group["last_notification_date"] = n.created_at
+
+    result = []
+    for data in grouped.values():
+        data["notifications"].sort(key=lambda x: x["created_at"], reverse=True)
+        data["last_notification_date"] = data["last_notification_date"].isoformat()
+        result.append(data)
+    result.sort(key=lambda x: x["last_notification_date"] or "", reverse=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=100_000)
+    parser.add_argument("--subscriptions", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20, help="Уведомлений на группу (K)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, SessionLocal):
+        user_id = seed_user(engine, subscriptions=args.subscriptions, notifications=args.notifications)
+        db = SessionLocal()
+        user = db.get(User, user_id)
+
+        def run_legacy():
+            db.expunge_all()
+            return legacy_grouped(db, user_id)
+
+        def run_sql():
+            db.expunge_all()
+            return asyncio.run(get_notifications_grouped_by_subscription(
+                *handler_context(), limit=args.limit, fields=None, current_user=user, db=db
+            ))
+
+        legacy_ms, legacy = measure(run_legacy, args.repeat)
+        sql_ms, grouped = measure(run_sql, args.repeat)
+        db.close()
+
+    # Счетчики и порядок групп должны совпадать с прежней реализацией
+    assert [g["subscription_id"] for g in grouped] == [g["subscription_id"] for g in legacy]
+    assert [g["unread_count"] for g in grouped] == [g["unread_count"] for g in legacy]
+
+    print(f"Уведомлений: {args.notifications}, подписок: {args.subscriptions}, K={args.limit}")
+    print(f"  Python-группировка: {legacy_ms:9.1f} мс, ответ {len(json.dumps(legacy, default=str)) / 1024:9.1f} КБ")
+    print(f"  SQL + окно:         {sql_ms:9.1f} мс, ответ {len(json.dumps(grouped, default=str)) / 1024:9.1f} КБ")
+    print(f"  Ускорение: x{legacy_ms / sql_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
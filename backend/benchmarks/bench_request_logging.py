@@ -0,0 +1,123 @@
+# backend/benchmarks/bench_request_logging.py
+"""
+Задержка запросов в зависимости от логирования: вход, список подписок и
+изменение цены подписки через TestClient. Каждый уровень логирования
+запускается в отдельном процессе; stdout и stderr сервера пишутся в файл,
+как при работе под systemd или docker.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_request_logging --requests 300 --levels INFO DEBUG
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(timings: list, p: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_worker(args):
+    """Выполняется в дочернем процессе: DATABASE_URL и LOG_LEVEL уже заданы"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+
+    from backend.database import engine, init_db
+    from backend.main import app
+    from backend.models.user import User
+    from backend.utils.log import setup_logging
+    from backend.utils.security import hash_password
+
+    # TestClient без with не запускает lifespan, где логирование настраивается в приложении
+    setup_logging()
+    init_db()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"user{i}@example.com", "password": "x"} for i in range(args.users)
+        ])
+        conn.execute(insert(User).values(email="bench@example.com", password=hash_password("bench-password")))
+
+    client = TestClient(app)
+    login = {"email": "bench@example.com", "password": "bench-password"}
+    token = client.post("/api/login", json=login).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post("/api/subscriptions", headers=headers, json={
+        "name": "Logging benchmark", "currentAmount": 100, "category": "video"
+    }).json()
+    for i in range(args.subscriptions):
+        client.post("/api/subscriptions", headers=headers, json={
+            "name": f"Logging benchmark {i}", "currentAmount": 100 + i, "category": "music"
+        })
+
+    scenarios = {
+        "POST /api/login": lambda i: client.post("/api/login", json=login),
+        "GET /api/subscriptions": lambda i: client.get("/api/subscriptions", headers=headers),
+        "PATCH /api/subscriptions/{id}": lambda i: client.patch(
+            f"/api/subscriptions/{created['id']}", headers=headers, json={"currentAmount": 200 + i}
+        ),
+    }
+
+    results = {}
+    for name, request in scenarios.items():
+        count = args.requests if "login" not in name else max(args.requests // 10, 10)
+        timings = []
+        for i in range(count):
+            started = time.perf_counter()
+            response = request(i)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code < 400, response.text
+        results[name] = {"p50": statistics.median(timings), "p95": percentile(timings, 0.95)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--users", type=int, default=2000, help="Сколько других пользователей в базе")
+    parser.add_argument("--subscriptions", type=int, default=20)
+    parser.add_argument("--levels", nargs="+", default=["INFO", "DEBUG"])
+    parser.add_argument("--worker", metavar="RESULT_FILE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.worker, "w") as result_file:
+            json.dump(run_worker(args), result_file)
+        return
+
+    print(f"Запросов: {args.requests}, пользователей в базе: {args.users + 1}")
+    for level in args.levels:
+        with tempfile.TemporaryDirectory(prefix="subs-logging-") as tmp_dir:
+            log_path = os.path.join(tmp_dir, "server.log")
+            result_path = os.path.join(tmp_dir, "result.json")
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+                "LOG_LEVEL": level,
+            }
+            with open(log_path, "w") as log_file:
+                subprocess.run(
+                    [sys.executable, "-m", "backend.benchmarks.bench_request_logging", "--worker", result_path,
+                     "--requests", str(args.requests), "--users", str(args.users),
+                     "--subscriptions", str(args.subscriptions)],
+                    cwd=REPO_ROOT, env=env, stdout=log_file, stderr=log_file, check=True
+                )
+            log_size = os.path.getsize(log_path)
+            with open(result_path) as result_file:
+                results = json.load(result_file)
+
+        print(f"  LOG_LEVEL={level} (вывод сервера: {log_size / 1024:.0f} КБ)")
+        for name, timing in results.items():
+            print(f"    {name:32} p50 {timing['p50']:7.2f} мс   p95 {timing['p95']:7.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# backend/benchmarks/bench_shards.py
+"""
+Суммарная пропускная способность записей в зависимости от числа шардов SQLite
+(SHARDS, см. database.py).
+
+Против uvicorn на временной базе с SHARDS = 1, 2, 4, 8 (--shards) --concurrency
+задач непрерывно пишут от имени --users пользователей — создание и изменение
+подписок, продление, "прочитать все" (нагрузка bench_write_queue). Пользователи
+распределяются по шардам хешем id, поэтому записи разных шардов не ждут одну
+блокировку файла.
+
+Для каждого числа шардов — записей в секунду, p50/p99 записей, ответы 5xx и число
+"database is locked" в логе сервера; ускорение — относительно первого варианта.
+С --write-queue у каждого шарда своя очередь с потоком-писателем (WRITE_QUEUE=1).
+
+Второй замер — только база, без HTTP: --concurrency потоков в одном процессе
+пишут через user_session (изменение подписки и версии данных, коммит на запись).
+Через HTTP на немногих ядрах предел обычно — процессор воркера, а не блокировка
+файла; здесь видно, сколько дает параллельная запись в разные файлы, когда
+предел — ожидание блокировки и fsync (медленный диск, много ядер). На одном ядре
+с быстрым fsync выигрыша может не быть ни в одном замере.
+Ошибки записи в любом варианте — код возврата 1.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_shards --shards 1,2,4,8 --concurrency 32 --duration 15
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.benchmarks.bench_write_queue import run
+from backend.benchmarks.load_api import REPO_ROOT, percentile
+
+
+def storage_load(users: int, threads: int, duration: float):
+    """
+    Запись напрямую через user_session в процессе с SHARDS из окружения;
+    печатает число записей, ошибок и секунды
+    """
+    from sqlalchemy.exc import OperationalError
+
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, init_db, user_session
+    from backend.models.subscription import Subscription
+    from backend.services.data_versions import SUBSCRIPTIONS, bump_versions
+    from backend.services.sync import stamp
+
+    init_db()
+    user_ids = [seed_user(engine, f"storage{i}@example.com", subscriptions=5) for i in range(users)]
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def write(index: int) -> tuple:
+        user_id = user_ids[index % len(user_ids)]
+        rng = random.Random(index)
+        writes = errors = 0
+        while time.perf_counter() < deadline:
+            with user_session(user_id) as db:
+                try:
+                    subscription = db.query(Subscription).filter(Subscription.userId == user_id).first()
+                    subscription.currentAmount = rng.randrange(99, 2000)
+                    stamp(bump_versions(db, user_id, SUBSCRIPTIONS), subscription)
+                    db.commit()
+                    writes += 1
+                except OperationalError:
+                    db.rollback()
+                    errors += 1
+        return writes, errors
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(write, range(threads)))
+    print(sum(r[0] for r in results), sum(r[1] for r in results), time.perf_counter() - started)
+
+
+def run_storage(args, shards: int, tmp_dir: str) -> tuple:
+    """(записей в секунду, ошибок) для записи в базу без HTTP"""
+    env = {**os.environ, "SHARDS": str(shards), "SQLITE_WAL": "1", "LOG_LEVEL": "WARNING",
+           "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, f'storage{shards}.db')}"}
+    code = (
+        "from backend.benchmarks.bench_shards import storage_load\n"
+        f"storage_load({args.users}, {args.concurrency}, {args.duration})\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    writes, errors, seconds = output.strip().splitlines()[-1].split()
+    return int(writes) / float(seconds), int(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", default="1,2,4,8", help="Числа шардов через запятую")
+    parser.add_argument("--concurrency", type=int, default=32, help="Одновременно пишущих клиентов")
+    parser.add_argument("--readers", type=int, default=0, help="Одновременно читающих клиентов")
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="Длительность нагрузки на вариант, секунды")
+    parser.add_argument("--write-queue", action="store_true", help="Очередь записей в каждом шарде")
+    parser.add_argument("--port", type=int, default=8773)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    mode = "очередь записей" if args.write_queue else "прямая запись"
+    print(f"Пишущих: {args.concurrency}, пользователей: {args.users}, {mode} + WAL, {args.duration} с на вариант")
+    print(f"  {'шардов':>6} {'записей/с':>10} {'p50 записи':>11} {'p99 записи':>11} {'5xx':>6} {'locked':>7}")
+    failures = []
+    baseline = None
+    with tempfile.TemporaryDirectory(prefix="subs-shards-") as tmp_dir:
+        for shards in [int(value) for value in args.shards.split(",")]:
+            settings = {"SHARDS": str(shards), "SQLITE_WAL": "1", "WRITE_QUEUE": "1" if args.write_queue else "0"}
+            stats = run(args, f"shards{shards}", settings, tmp_dir)
+            writes = sorted(stats["writes"])
+            rate = len(writes) / stats["seconds"]
+            baseline = baseline or rate
+            print(f"  {shards:6} {rate:10.1f} {percentile(writes, 50) * 1000:8.1f} мс "
+                  f"{percentile(writes, 99) * 1000:8.1f} мс {stats['errors']:6} {stats['locked']:7}"
+                  f"  ({rate / baseline:.2f}x)")
+            if stats["errors"]:
+                failures.append(f"{shards} шардов: ответов 5xx — {stats['errors']}")
+
+        print(f"Только база: {args.concurrency} потоков, коммит на запись")
+        print(f"  {'шардов':>6} {'записей/с':>10} {'ошибок':>7}")
+        baseline = None
+        for shards in [int(value) for value in args.shards.split(",")]:
+            rate, errors = run_storage(args, shards, tmp_dir)
+            baseline = baseline or rate
+            print(f"  {shards:6} {rate:10.1f} {errors:7}  ({rate / baseline:.2f}x)")
+            if errors:
+                failures.append(f"{shards} шардов без HTTP: ошибок записи — {errors}")
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in failures]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
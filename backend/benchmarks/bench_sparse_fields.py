@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_sparse_fields.py
+"""
+Разреженные наборы полей (?fields=) против полных ответов на большом аккаунте:
+GET /api/subscriptions — полный список и только поля карточки на главном экране,
+GET /notifications/grouped — с текстом уведомлений и без него.
+
+Для каждого варианта печатается размер ответа без сжатия и с gzip и медиана
+времени ответа (TestClient в том же процессе, без сети). Заодно проверяется,
+что значения в разреженном ответе совпадают с полным.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_sparse_fields --subscriptions 1000 --notifications 10000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Поля карточки подписки на главном экране клиента
+CARD_FIELDS = "id,name,currentAmount,nextPaymentDate,category"
+# Список уведомлений в группе без текста — только заголовок и отметка о прочтении
+GROUPED_FIELDS = "id,type,title,read,created_at"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=1000)
+    parser.add_argument("--notifications", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-fields-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'fields.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.testclient import TestClient
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, init_db
+    from backend.main import app
+    from backend.utils.security import create_access_token
+
+    init_db()
+
+    user_id = seed_user(engine, "fields@example.com", subscriptions=args.subscriptions,
+                        notifications=args.notifications, read_ratio=0.7)
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+    client = TestClient(app)
+
+    def fetch(path, params, encoding="identity"):
+        response = client.get(path, params=params, headers={**headers, "Accept-Encoding": encoding})
+        assert response.status_code == 200, response.text
+        return response
+
+    variants = [
+        ("/api/subscriptions", "полный", "/api/subscriptions", {}),
+        ("/api/subscriptions", f"fields={CARD_FIELDS}", "/api/subscriptions", {"fields": CARD_FIELDS}),
+        ("/notifications/grouped", "полный", "/notifications/grouped", {}),
+        ("/notifications/grouped", f"fields={GROUPED_FIELDS}", "/notifications/grouped",
+         {"fields": GROUPED_FIELDS}),
+    ]
+
+    failures = []
+    print(f"Подписок: {args.subscriptions}, уведомлений: {args.notifications}, повторов: {args.repeat}")
+    baseline = {}
+    for endpoint, title, path, params in variants:
+        body = fetch(path, params)
+        gzipped = fetch(path, params, "gzip")
+        fetch(path, params)
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fetch(path, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        size = len(body.content)
+        gzip_size = int(gzipped.headers.get("content-length", len(gzipped.content)))
+
+        if params:
+            full = baseline[endpoint][2]
+            if endpoint == "/api/subscriptions":
+                names = params["fields"].split(",")
+                expected = [{name: item[name] for name in names} for item in full]
+                if body.json() != expected:
+                    failures.append(f"{endpoint} {title}: значения расходятся с полным ответом")
+            else:
+                names = params["fields"].split(",")
+                expected = [
+                    {**group, "notifications": [{name: n[name] for name in names} for n in group["notifications"]]}
+                    for group in full
+                ]
+                if body.json() != expected:
+                    failures.append(f"{endpoint} {title}: значения расходятся с полным ответом")
+            base_size, base_median, _ = baseline[endpoint]
+            ratio = f"  ({size / base_size:.2f}x размера, {median / base_median:.2f}x времени)"
+        else:
+            baseline[endpoint] = (size, median, body.json())
+            ratio = ""
+        print(f"  {endpoint:24} {title:52} {size:9} байт  gzip {gzip_size:8}  медиана {median:7.1f} мс{ratio}")
+
+    client.close()
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in failures]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
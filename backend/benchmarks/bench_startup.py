@@ -0,0 +1,142 @@
+# backend/benchmarks/bench_startup.py
+"""
+Холодный старт API: время импорта backend.main и время до первого ответа.
+
+    импорт             — python -c "import backend.main" в новом процессе; заодно
+                         проверяется, что импорт не трогает базу (файл не создается)
+    первый ответ       — от запуска uvicorn до первого 200 на /health, затем первые
+                         /api/subscriptions (с токеном) и /openapi.json
+Старт измеряется на новой базе (создание схемы) и на уже существующей, где
+достаточно быстрой проверки версии схемы; в существующей базе --notifications
+уведомлений — столько строк просматривал бы полный init_db.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_startup --repeat 5 --notifications 100000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMPORT_SCRIPT = (
+    "import time; started = time.perf_counter(); import backend.main; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def server_env(db_path: str) -> dict:
+    return {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "LOG_LEVEL": "WARNING"}
+
+
+def measure_import(db_path: str) -> tuple:
+    """(мс импорта в новом процессе, создан ли файл базы)"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=REPO_ROOT, env=server_env(db_path),
+        capture_output=True, text=True, check=True
+    ).stdout
+    touched = os.path.exists(db_path)
+    if touched:
+        os.remove(db_path)
+    return float(output.strip().splitlines()[-1]), touched
+
+
+def measure_first_requests(db_path: str, port: int, headers: dict) -> dict:
+    """Мс от запуска процесса до первого ответа /health и длительность первых запросов"""
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=server_env(db_path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # Один клиент на весь замер: новый httpx.Client на каждую попытку сам стоит десятки мс
+    client = httpx.Client(base_url=base)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn завершился с кодом {server.returncode}")
+            try:
+                if client.get("/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                time.sleep(0.005)
+        timings = {"health": (time.perf_counter() - started) * 1000}
+        for name, path, request_headers in (("subscriptions", "/api/subscriptions", headers),
+                                            ("openapi", "/openapi.json", {})):
+            request_started = time.perf_counter()
+            # В новой базе нет пользователя: /api/subscriptions ответит 403, важна только задержка
+            if client.get(path, headers=request_headers).status_code >= 500:
+                raise RuntimeError(f"{path}: ошибка сервера")
+            timings[name] = (time.perf_counter() - request_started) * 1000
+        return timings
+    finally:
+        client.close()
+        server.terminate()
+        server.wait()
+
+
+def seed(db_path: str, notifications: int) -> int:
+    """Существующая база с одним пользователем; возвращает его id"""
+    code = (
+        "from backend.benchmarks.common import seed_user\n"
+        "from backend.database import engine, init_db\n"
+        "init_db()\n"
+        f"print(seed_user(engine, 'startup@example.com', subscriptions=50, notifications={notifications}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=server_env(db_path),
+                            capture_output=True, text=True, check=True).stdout
+    return int(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=8771)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from backend.utils.security import create_access_token
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="subs-startup-") as tmp_dir:
+        fresh_path = os.path.join(tmp_dir, "fresh.db")
+        imports = []
+        for _ in range(args.repeat):
+            elapsed, touched = measure_import(fresh_path)
+            imports.append(elapsed)
+            if touched:
+                failures.append("импорт backend.main создал файл базы")
+        print(f"Импорт backend.main: медиана {statistics.median(imports):7.1f} мс "
+              f"(мин {min(imports):.1f}, повторов {args.repeat})")
+
+        existing_path = os.path.join(tmp_dir, "existing.db")
+        user_id = seed(existing_path, args.notifications)
+        headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+
+        print(f"  {'база':34} {'до /health':>11} {'1-й /api/subscriptions':>23} {'1-й /openapi.json':>18}")
+        for title, prepare, path in (
+            ("новая", lambda: os.path.exists(fresh_path) and os.remove(fresh_path), fresh_path),
+            (f"существующая ({args.notifications} уведомлений)", lambda: None, existing_path),
+        ):
+            runs = []
+            for _ in range(args.repeat):
+                prepare()
+                runs.append(measure_first_requests(path, args.port, headers if path == existing_path else {}))
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"  {title:34} {median['health']:8.1f} мс {median['subscriptions']:20.1f} мс "
+                  f"{median['openapi']:15.1f} мс")
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in sorted(set(failures))]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
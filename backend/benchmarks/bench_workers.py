@@ -0,0 +1,73 @@
+# backend/benchmarks/bench_workers.py
+"""
+Пропускная способность продакшн-запуска (backend.serve) с одним воркером и с N:
+те же сценарии экранов Flutter-клиента, что в load_api, против сервера на временной
+базе. Для каждого числа воркеров — запросов в секунду, p50/p95/p99 по всем
+запросам, ошибки и ускорение относительно первого варианта.
+
+Чтения масштабируются по ядрам; записи в SQLite по-прежнему идут по одной
+(блокировка файла базы), поэтому сценарии с записями растут меньше.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_workers --workers 1 4 --users 40 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from backend.benchmarks.load_api import REPO_ROOT, run_load, wait_for_server
+
+
+def run(args, workers: int, tmp_dir: str) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(args.port), "--log-level", "warning", "--no-jobs"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, f'workers{workers}.db')}",
+             "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_for_server(base_url, server)
+        return asyncio.run(run_load(argparse.Namespace(**{**vars(args), "workers": workers}), base_url))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность нагрузки, секунды")
+    parser.add_argument("--think", type=float, default=0.0, help="Средняя пауза между экранами, секунды")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Пользователей: {args.users}, {args.duration} с на вариант, CPU: {os.cpu_count()}")
+    print(f"  {'воркеров':>8} {'запросов/с':>11} {'p50':>8} {'p95':>8} {'p99':>8} {'ошибок':>7}")
+    baseline = None
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="subs-workers-") as tmp_dir:
+        for workers in args.workers:
+            report = run(args, workers, tmp_dir)
+            # Процентили по всем запросам, взвешенные числом запросов эндпоинта, недоступны
+            # из отчета — берем худший p50/p95/p99 среди эндпоинтов с заметной долей запросов
+            total = report["total"]
+            busy = [item for item in report["endpoints"].values() if item["requests"] >= total["requests"] * 0.05]
+            worst = {q: max((item[q] for item in busy), default=0.0) for q in ("p50_ms", "p95_ms", "p99_ms")}
+            baseline = baseline or total["rps"]
+            failed = failed or bool(total["errors"])
+            print(f"  {workers:8} {total['rps']:11.1f} {worst['p50_ms']:8.1f} {worst['p95_ms']:8.1f} "
+                  f"{worst['p99_ms']:8.1f} {total['errors']:7}  ({total['rps'] / baseline:.2f}x)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
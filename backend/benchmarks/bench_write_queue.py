@@ -0,0 +1,195 @@
+# backend/benchmarks/bench_write_queue.py
+"""
+Всплеск записей при высокой конкуренции: прямая запись в SQLite против очереди
+с одним потоком-писателем (WRITE_QUEUE=1, services/write_queue).
+
+Против uvicorn на временной базе --concurrency задач непрерывно пишут — создание
+и изменение подписок, продление, "прочитать все", — а --readers задач читают
+список подписок. Варианты:
+
+    прямо           — как сейчас: каждый обработчик пишет в своем соединении
+    прямо + WAL     — то же в режиме WAL (SQLITE_WAL=1)
+    очередь         — WRITE_QUEUE=1 (включает и WAL)
+
+Для каждого — записей и чтений в секунду, p50/p99 записей, p99 чтений, ответы 5xx,
+число "database is locked" в логе сервера и для очереди — записей на один коммит
+(по /metrics).
+С очередью ошибок быть не должно: иначе код возврата 1.
+
+Без очереди при конкуренции больше пула соединений (5 + 10) сервер может встать до
+таймаута пула: запросы держат соединение между get_current_user и обработчиком, пока
+ждут поток, а потоки заняты ожиданием соединения. Записи через очередь ждут в цикле
+событий и в этом не участвуют.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.bench_write_queue --concurrency 64 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from backend.benchmarks.load_api import REPO_ROOT, percentile, wait_for_server
+
+VARIANTS = [
+    ("прямо", {"WRITE_QUEUE": "0", "SQLITE_WAL": "0"}),
+    ("прямо + WAL", {"WRITE_QUEUE": "0", "SQLITE_WAL": "1"}),
+    ("очередь", {"WRITE_QUEUE": "1", "SQLITE_WAL": "1"}),
+]
+
+
+def seed(env: dict, users: int) -> list:
+    """
+    Пользователи с несколькими подписками (в шардах, если SHARDS > 1 в env);
+    возвращает [(user_id, [id подписок])]
+    """
+    code = (
+        "from backend.benchmarks.common import seed_user\n"
+        "from backend.database import engine, engine_for_user, init_db\n"
+        "from backend.models.subscription import Subscription\n"
+        "from sqlalchemy import select\n"
+        "init_db()\n"
+        f"for i in range({users}):\n"
+        "    user_id = seed_user(engine, f'writer{i}@example.com', subscriptions=5)\n"
+        "    with engine_for_user(user_id).connect() as conn:\n"
+        "        ids = conn.execute(select(Subscription.id).where(Subscription.userId == user_id)).scalars().all()\n"
+        "    print(user_id, *ids)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    rows = [line.split() for line in output.splitlines() if line and line[0].isdigit()]
+    return [(int(row[0]), [int(value) for value in row[1:]]) for row in rows]
+
+
+async def writer(client, headers: dict, subscriptions: list, rng: random.Random, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if roll < 0.3:
+            method, url, body = "POST", "/api/subscriptions", {
+                "name": f"Burst {rng.randrange(10 ** 12)}", "currentAmount": rng.randrange(99, 2000),
+                "category": "music", "billingCycle": "monthly",
+            }
+        elif roll < 0.6:
+            method, url, body = "PATCH", f"/api/subscriptions/{rng.choice(subscriptions)}", {
+                "currentAmount": rng.randrange(99, 2000)
+            }
+        elif roll < 0.8:
+            method, url, body = "PATCH", f"/api/subscriptions/{rng.choice(subscriptions)}/renew", None
+        else:
+            method, url, body = "POST", "/notifications/read-all", None
+
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=body, headers=headers)
+            failed = response.status_code >= 500
+            if response.status_code == 201:
+                subscriptions.append(response.json()["id"])
+        except httpx.HTTPError:
+            failed = True
+        stats["writes"].append(time.perf_counter() - started)
+        stats["errors"] += failed
+
+
+async def reader(client, headers: dict, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get("/api/subscriptions", headers=headers)
+            stats["errors"] += response.status_code >= 500
+        except httpx.HTTPError:
+            stats["errors"] += 1
+        stats["reads"].append(time.perf_counter() - started)
+
+
+async def run_load(args, base_url: str, users: list) -> dict:
+    from backend.utils.security import create_access_token
+
+    stats = {"writes": [], "reads": [], "errors": 0}
+    limits = httpx.Limits(max_connections=args.concurrency + args.readers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tasks = []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        for index in range(args.concurrency + args.readers):
+            user_id, subscriptions = users[index % len(users)]
+            headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+            if index < args.concurrency:
+                rng = random.Random(args.seed + index)
+                tasks.append(writer(client, headers, list(subscriptions), rng, deadline, stats))
+            else:
+                tasks.append(reader(client, headers, deadline, stats))
+        await asyncio.gather(*tasks)
+        stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def run(args, title: str, settings: dict, tmp_dir: str) -> dict:
+    name = title.replace(" ", "").replace("+", "-")
+    env = {**os.environ, **settings, "LOG_LEVEL": "WARNING", "METRICS_ENABLED": "1",
+           "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, f'{name}.db')}"}
+    users = seed(env, args.users)
+    log_path = os.path.join(tmp_dir, f"{name}.log")
+    base_url = f"http://127.0.0.1:{args.port}"
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            wait_for_server(base_url, server)
+            stats = asyncio.run(run_load(args, base_url, users))
+            metrics = httpx.get(f"{base_url}/metrics").text
+        finally:
+            server.terminate()
+            server.wait()
+    with open(log_path) as log:
+        stats["locked"] = log.read().count("database is locked")
+    jobs, commits = (re.search(rf"^{metric} (\S+)$", metrics, re.M) for metric in
+                     ("write_queue_jobs_total", "write_queue_commits_total"))
+    stats["per_commit"] = float(jobs[1]) / float(commits[1]) if jobs and commits else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64, help="Одновременно пишущих клиентов")
+    parser.add_argument("--readers", type=int, default=8, help="Одновременно читающих клиентов")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Длительность нагрузки на вариант, секунды")
+    parser.add_argument("--port", type=int, default=8772)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    print(f"Пишущих: {args.concurrency}, читающих: {args.readers}, {args.duration} с на вариант")
+    print(f"  {'вариант':12} {'записей/с':>10} {'чтений/с':>9} {'p50 записи':>11} {'p99 записи':>11} "
+          f"{'p99 чтения':>11} {'5xx':>6} {'locked':>7} {'на коммит':>10}")
+    failed = False
+    baseline = None
+    with tempfile.TemporaryDirectory(prefix="subs-write-queue-") as tmp_dir:
+        for title, settings in VARIANTS:
+            stats = run(args, title, settings, tmp_dir)
+            writes, reads = sorted(stats["writes"]), sorted(stats["reads"])
+            rate = len(writes) / stats["seconds"]
+            baseline = baseline or rate
+            per_commit = f"{stats['per_commit']:.1f}" if stats["per_commit"] else "1"
+            print(f"  {title:12} {rate:10.1f} {len(reads) / stats['seconds']:9.1f} "
+                  f"{percentile(writes, 50) * 1000:8.1f} мс {percentile(writes, 99) * 1000:8.1f} мс "
+                  f"{percentile(reads, 99) * 1000:8.1f} мс {stats['errors']:6} {stats['locked']:7} "
+                  f"{per_commit:>10}  ({rate / baseline:.2f}x записей)")
+            if settings["WRITE_QUEUE"] == "1" and (stats["errors"] or stats["locked"]):
+                failed = True
+    if failed:
+        print("Нарушения:\n  с очередью записей есть ошибки записи")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
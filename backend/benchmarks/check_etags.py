@@ -0,0 +1,162 @@
+# backend/benchmarks/check_etags.py
+"""
+Проверка условных GET: для каждого пути записи берем ETag всех кешируемых
+чтений (список, архив, подписка, история цен, сгруппированные уведомления),
+выполняем запись и проверяем, что устарели ровно те ETag, которые должны,
+а остальные по-прежнему дают 304. Ответ 304 не должен выполнять основной
+запрос: только пользователь и версия данных. Код выхода 1 при нарушении.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.check_etags
+    CHECK_DATABASE_URL=postgresql+psycopg://localhost/subs_check python -m backend.benchmarks.check_etags
+"""
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+SUBSCRIPTION_READS = {"list", "archived", "detail", "prices"}
+ALL_READS = SUBSCRIPTION_READS | {"grouped"}
+NOT_MODIFIED_QUERIES = 2  # пользователь по токену + версия данных
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp(prefix="subs-etags-")
+    # CHECK_DATABASE_URL — проверка на внешней базе (например, локальном PostgreSQL)
+    os.environ["DATABASE_URL"] = os.getenv("CHECK_DATABASE_URL") or f"sqlite:///{os.path.join(tmp_dir, 'etags.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from backend.benchmarks.common import reset_check_database
+    from backend.database import engine, init_db, user_session
+    from backend.main import app
+    from backend.models.user import User
+    from backend.services.notification_retention import RetentionPolicy, apply_retention
+    from backend.services.notifications_service import NotificationService
+    from backend.utils.query_tracker import track_queries
+    from backend.utils.security import create_access_token
+
+    reset_check_database()
+    init_db()
+
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(email="etags@example.com", password="x")).inserted_primary_key[0]
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+    client = TestClient(app)
+
+    def create(name: str) -> int:
+        response = client.post("/api/subscriptions", headers=headers,
+                               json={"name": name, "currentAmount": 100, "category": "video"})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    sub_id, spare_id = create("ETag main"), create("ETag spare")
+    reads = {
+        "list": "/api/subscriptions",
+        "archived": "/api/subscriptions?archived=true",
+        "detail": f"/api/subscriptions/{sub_id}",
+        "prices": f"/api/subscriptions/{sub_id}/price-history",
+        "grouped": "/notifications/grouped",
+    }
+
+    def service(fn):
+        def call():
+            db = user_session(user_id)
+            try:
+                fn(db)
+            finally:
+                db.close()
+        return call
+
+    def notify(db, digest=False):
+        NotificationService.create_notification(db, user_id, sub_id, "price_changed", "Проверка", "ETag", digest=digest)
+
+    pending = {}
+
+    def prepare_unread():
+        service(notify)()
+        pending["id"] = client.get("/notifications/grouped", headers=headers).json()[0]["notifications"][0]["id"]
+
+    def request(method: str, path: str, **kwargs):
+        def call():
+            url = path() if callable(path) else path
+            response = client.request(method, url, headers=headers, **kwargs)
+            assert response.status_code < 400, f"{method} {url}: {response.status_code} {response.text}"
+        return call
+
+    # (название, подготовка, запись, какие чтения должны устареть)
+    cases = [
+        ("POST /api/subscriptions", None, lambda: create("ETag new"), ALL_READS),
+        ("PATCH /api/subscriptions/{id}", None,
+         request("PATCH", f"/api/subscriptions/{sub_id}", json={"currentAmount": 250}), ALL_READS),
+        ("PATCH /api/subscriptions/{id}/renew", None,
+         request("PATCH", f"/api/subscriptions/{sub_id}/renew"), ALL_READS),
+        ("PATCH /api/subscriptions/{id}/archive", None,
+         request("PATCH", f"/api/subscriptions/{spare_id}/archive"), ALL_READS),
+        ("NotificationService.create_notification", None, service(notify), {"grouped"}),
+        ("NotificationService: дайджест", None, service(lambda db: notify(db, digest=True)), {"grouped"}),
+        ("PATCH /notifications/{id}/read", prepare_unread,
+         request("PATCH", lambda: f"/notifications/{pending['id']}/read"), {"grouped"}),
+        ("POST /notifications/read", prepare_unread,
+         lambda: request("POST", "/notifications/read", json={"ids": [int(pending["id"])]})(), {"grouped"}),
+        ("POST /notifications/read-up-to", service(notify),
+         request("POST", "/notifications/read-up-to",
+                 json={"up_to": (datetime.utcnow() + timedelta(days=1)).isoformat()}), {"grouped"}),
+        ("POST /notifications/subscription/{id}/read-all", service(notify),
+         request("POST", f"/notifications/subscription/{sub_id}/read-all"), {"grouped"}),
+        ("POST /notifications/read-all", service(notify), request("POST", "/notifications/read-all"), {"grouped"}),
+        ("POST /notifications/read-all (нечего читать)", None, request("POST", "/notifications/read-all"), set()),
+        ("Ретеншн уведомлений", None,
+         service(lambda db: apply_retention(db, RetentionPolicy(older_than_days=0, vacuum=False),
+                                            now=datetime.utcnow() + timedelta(days=1))), {"grouped"}),
+    ]
+
+    failures = []
+    for title, prepare, write, expected in cases:
+        if prepare:
+            prepare()
+        # Подготовка может сама менять версии: ETag снимаем непосредственно перед записью
+        etags = {}
+        for name, path in reads.items():
+            response = client.get(path, headers=headers)
+            etags[name] = response.headers.get("etag")
+            if not etags[name]:
+                failures.append(f"{title}: {name} без ETag")
+                continue
+            with track_queries(engine) as tracker:
+                cached = client.get(path, headers={**headers, "If-None-Match": etags[name]})
+            if cached.status_code != 304 or cached.content:
+                failures.append(f"{title}: {name} до записи вернул {cached.status_code}, ожидался 304")
+            elif tracker.count > NOT_MODIFIED_QUERIES:
+                failures.append(f"{title}: {name} 304 за {tracker.count} запросов > {NOT_MODIFIED_QUERIES}")
+
+        write()
+
+        stale = set()
+        for name, path in reads.items():
+            if etags[name] is None:
+                continue
+            status_code = client.get(path, headers={**headers, "If-None-Match": etags[name]}).status_code
+            if status_code == 200:
+                stale.add(name)
+            elif status_code != 304:
+                failures.append(f"{title}: {name} вернул {status_code}")
+        mark = "ok" if stale == expected else "ОШИБКА"
+        print(f"  {mark:6} {title:50} устарели: {', '.join(sorted(stale)) or '-'}")
+        if stale != expected:
+            failures.append(f"{title}: устарели {sorted(stale)}, ожидались {sorted(expected)}")
+
+    client.close()
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in failures]))
+        sys.exit(1)
+    print("ETag устаревают ровно при нужных записях")
+
+
+if __name__ == "__main__":
+    main()
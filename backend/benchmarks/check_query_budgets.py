@@ -0,0 +1,193 @@
+# backend/benchmarks/check_query_budgets.py
+"""
+Бюджеты SQL-запросов для всех маршрутов из backend/routes: каждый маршрут
+вызывается на временной базе с типичными данными, число запросов сравнивается
+с бюджетом. Завершается с кодом 1, если бюджет превышен или у маршрута нет бюджета.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.check_query_budgets
+    python -m backend.benchmarks.check_query_budgets --verbose   # формы повторяющихся операторов
+    CHECK_DATABASE_URL=postgresql+psycopg://localhost/subs_check python -m backend.benchmarks.check_query_budgets
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+SUBSCRIPTIONS = 10
+NOTIFICATIONS = 200
+PASSWORD = "budget-password"
+
+
+def seed(engine) -> dict:
+    from sqlalchemy import insert, select
+    from backend.benchmarks.common import seed_user
+    from backend.models.notification import Notification
+    from backend.models.subscription import PriceHistory, Subscription
+    from backend.models.user import User
+    from backend.services.unread_counters import backfill_unread_counters
+    from backend.utils.security import hash_password
+    from sqlalchemy.orm import Session
+
+    user_id = seed_user(engine, "budget@example.com", subscriptions=SUBSCRIPTIONS,
+                        notifications=NOTIFICATIONS, read_ratio=0.5)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.update().where(User.id == user_id).values(password=hash_password(PASSWORD)))
+        sub_ids = [row[0] for row in conn.execute(select(Subscription.id).where(Subscription.userId == user_id))]
+        conn.execute(insert(PriceHistory), [
+            {"subscriptionId": sub_id, "amount": 100 + i, "startDate": date(date.today().year, 1, 1)}
+            for i, sub_id in enumerate(sub_ids)
+        ])
+        notification_ids = [row[0] for row in conn.execute(
+            select(Notification.id).where(Notification.user_id == user_id, Notification.read == False).limit(5)
+        )]
+    with Session(engine) as db:
+        backfill_unread_counters(db)
+    return {"user_id": user_id, "sub_ids": sub_ids, "notification_ids": notification_ids}
+
+
+def build_cases(data: dict) -> list:
+    """(метод, шаблон маршрута, функция запроса, бюджет). Мутирующие запросы идут в конце"""
+    from backend.utils.metrics import METRICS_ENABLED
+
+    sub_id, other_sub, archived_sub = data["sub_ids"][0], data["sub_ids"][1], data["sub_ids"][-1]
+    year = date.today().year
+    login = {"email": "budget@example.com", "password": PASSWORD}
+
+    return [
+        ("GET", "/", lambda c, h: c.get("/"), 0),
+        ("GET", "/health", lambda c, h: c.get("/health"), 0),
+        # /metrics подключается только с METRICS_ENABLED=1
+        *([("GET", "/metrics", lambda c, h: c.get("/metrics"), 0)] if METRICS_ENABLED else []),
+        ("POST", "/api/login", lambda c, h: c.post("/api/login", json=login), 1),
+        ("GET", "/api/profile", lambda c, h: c.get("/api/profile", headers=h), 1),
+        ("GET", "/api/me", lambda c, h: c.get("/api/me", headers=h), 1),
+        ("POST", "/api/logout", lambda c, h: c.post("/api/logout"), 0),
+        ("POST", "/api/test-validation",
+         lambda c, h: c.post("/api/test-validation", json={"email": "x@example.com", "password": "p"}), 0),
+        ("GET", "/api/subscriptions", lambda c, h: c.get("/api/subscriptions", headers=h), 3),
+        ("GET", "/api/subscriptions",
+         lambda c, h: c.get("/api/subscriptions", params={"fields": "name,currentAmount"}, headers=h), 3),
+        ("GET", "/api/subscriptions/{subscription_id}",
+         lambda c, h: c.get(f"/api/subscriptions/{sub_id}", headers=h), 4),
+        ("GET", "/api/subscriptions/{subscription_id}/price-history",
+         lambda c, h: c.get(f"/api/subscriptions/{sub_id}/price-history", headers=h), 4),
+        ("GET", "/api/analytics",
+         lambda c, h: c.get("/api/analytics", params={"period": "year", "year": year}, headers=h), 3),
+        ("GET", "/api/analytics/{category}",
+         lambda c, h: c.get("/api/analytics/music", params={"period": "year", "year": year}, headers=h), 3),
+        ("GET", "/api/dashboard", lambda c, h: c.get("/api/dashboard", headers=h), 5),
+        ("GET", "/api/sync", lambda c, h: c.get("/api/sync", headers=h), 5),
+        ("GET", "/notifications/grouped", lambda c, h: c.get("/notifications/grouped", headers=h), 4),
+        ("GET", "/notifications/grouped",
+         lambda c, h: c.get("/notifications/grouped", params={"fields": "title,read"}, headers=h), 4),
+        ("GET", "/notifications/subscription/{subscription_id}",
+         lambda c, h: c.get(f"/notifications/subscription/{sub_id}", headers=h), 5),
+        ("GET", "/notifications/subscription/{subscription_id}/unread-count",
+         lambda c, h: c.get(f"/notifications/subscription/{sub_id}/unread-count", headers=h), 3),
+        ("GET", "/notifications/unread-counts", lambda c, h: c.get("/notifications/unread-counts", headers=h), 2),
+        ("GET", "/notifications/stream", "stream", 1),
+        # Пометка прочитанным идет в точке сохранения (SAVEPOINT и RELEASE — два оператора)
+        ("PATCH", "/notifications/{notification_id}/read",
+         lambda c, h: c.patch(f"/notifications/{data['notification_ids'][0]}/read", headers=h), 8),
+        ("POST", "/notifications/read",
+         lambda c, h: c.post("/notifications/read", json={"ids": data["notification_ids"][1:]}, headers=h), 6),
+        ("POST", "/notifications/read-up-to",
+         lambda c, h: c.post("/notifications/read-up-to", json={"up_to": "2000-01-01T00:00:00"}, headers=h), 5),
+        ("POST", "/notifications/subscription/{subscription_id}/read-all",
+         lambda c, h: c.post(f"/notifications/subscription/{sub_id}/read-all", headers=h), 8),
+        ("POST", "/notifications/read-all", lambda c, h: c.post("/notifications/read-all", headers=h), 6),
+        ("POST", "/api/subscriptions", lambda c, h: c.post("/api/subscriptions", headers=h, json={
+            "name": "Budget new", "currentAmount": 199, "category": "video"
+        }), 15),
+        # Смена цены создает уведомление (вставка, счетчик, версия, коммит и чтение строки)
+        ("PATCH", "/api/subscriptions/{subscription_id}",
+         lambda c, h: c.patch(f"/api/subscriptions/{sub_id}", json={"currentAmount": 555}, headers=h), 11),
+        ("PATCH", "/api/subscriptions/{subscription_id}/renew",
+         lambda c, h: c.patch(f"/api/subscriptions/{other_sub}/renew", headers=h), 5),
+        ("PATCH", "/api/subscriptions/{subscription_id}/archive",
+         lambda c, h: c.patch(f"/api/subscriptions/{archived_sub}/archive", headers=h), 7),
+        ("POST", "/api/batch", lambda c, h: c.post("/api/batch", headers=h, json={"operations": [
+            {"method": "PATCH", "path": f"/api/subscriptions/{other_sub}/renew"},
+            {"method": "PATCH", "path": f"/notifications/{data['notification_ids'][0]}/read"},
+        ], "atomic": True}), 15),
+        ("POST", "/api/register",
+         lambda c, h: c.post("/api/register", json={"email": "new@example.com", "password": "Long-pass-123"}), 3),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-budget-")
+    # CHECK_DATABASE_URL — проверка на внешней базе (например, локальном PostgreSQL)
+    os.environ["DATABASE_URL"] = os.getenv("CHECK_DATABASE_URL") or f"sqlite:///{os.path.join(tmp_dir, 'budget.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.routing import APIRoute, APIWebSocketRoute
+    from fastapi.testclient import TestClient
+    from backend.benchmarks.common import reset_check_database
+    from backend.database import engine, init_db
+    from backend.main import app
+    from backend.routes.notifications import authenticate_stream
+    from backend.utils.query_tracker import track_queries
+    from backend.utils.security import create_access_token
+
+    reset_check_database()
+    init_db()
+
+    data = seed(engine)
+    token = create_access_token({"user_id": data["user_id"]}, 60)
+    headers = {"Authorization": f"Bearer {token}"}
+    cases = build_cases(data)
+    client = TestClient(app)
+
+    failures = []
+    covered = set()
+    for method, template, request, budget in cases:
+        covered.add((method, template))
+        with track_queries(engine) as tracker:
+            if request == "stream":
+                # Поток бесконечный: вся работа с БД — проверка токена при подключении
+                authenticate_stream(token)
+                status_code = 200
+            else:
+                status_code = request(client, headers).status_code
+
+        over = tracker.count > budget
+        repeated = tracker.repeated()
+        mark = "ПРЕВЫШЕН" if over else "ok"
+        print(f"  {mark:8} {method:6} {template:60} {status_code} запросов {tracker.count:3} / {budget}"
+              + (f", повторов: {len(repeated)}" if repeated else ""))
+        if args.verbose:
+            for shape, count in repeated:
+                print(f"             x{count}: {shape[:150]}")
+        if status_code >= 400:
+            failures.append(f"{method} {template}: HTTP {status_code}")
+        if over:
+            failures.append(f"{method} {template}: {tracker.count} > {budget}")
+
+    for route in app.routes:
+        if isinstance(route, APIWebSocketRoute):
+            continue
+        if isinstance(route, APIRoute):
+            for method in route.methods:
+                if (method, route.path) not in covered:
+                    failures.append(f"{method} {route.path}: нет бюджета")
+
+    engine.dispose()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in failures]))
+        sys.exit(1)
+    print("Все маршруты в пределах бюджета")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# backend/benchmarks/check_sync.py
+"""
+Проверка /api/sync: клиентская реплика, собранная из полного снимка и цепочки
+дельт, после каждой серии записей должна совпадать со свежим полным снимком.
+Заодно печатается размер ответа: после первой синхронизации он должен зависеть
+от числа изменений, а не от размера аккаунта. Код выхода 1 при расхождении.
+
+Серии записей: создание, изменение цены, продление и архивация подписок,
+новые уведомления (в том числе дайджест), прочтение, ретеншн с надгробиями.
+В конце удаляются старые надгробия: токен старше них должен получить полный снимок.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.check_sync --subscriptions 1000 --notifications 5000
+    CHECK_DATABASE_URL=postgresql+psycopg://localhost/subs_check python -m backend.benchmarks.check_sync
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+ENTITIES = ("subscriptions", "price_history", "notifications")
+TOMBSTONE_ENTITIES = {"subscription": "subscriptions", "price_history": "price_history",
+                      "notification": "notifications"}
+
+
+def apply(replica: dict, payload: dict) -> dict:
+    """Применяет ответ /api/sync к реплике так, как это делает клиент"""
+    if payload["full"]:
+        replica = {entity: {} for entity in ENTITIES}
+    for entity in ENTITIES:
+        for item in payload[entity]:
+            replica[entity][item["id"]] = item
+    for tombstone in payload["deleted"]:
+        replica[TOMBSTONE_ENTITIES[tombstone["entity"]]].pop(tombstone["id"], None)
+        if tombstone["entity"] == "subscription":
+            # Архивная подписка исчезает вместе со своей историей цен
+            replica["price_history"] = {
+                key: item for key, item in replica["price_history"].items()
+                if item["subscriptionId"] != tombstone["id"]
+            }
+    return replica
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=1000)
+    parser.add_argument("--notifications", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-sync-")
+    # CHECK_DATABASE_URL — проверка на внешней базе (например, локальном PostgreSQL)
+    os.environ["DATABASE_URL"] = os.getenv("CHECK_DATABASE_URL") or f"sqlite:///{os.path.join(tmp_dir, 'sync.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert, select
+    from backend.benchmarks.common import reset_check_database, seed_user
+    from backend.database import engine, engine_for_user, init_db, user_session
+    from backend.main import app
+    from backend.models.subscription import PriceHistory, Subscription
+    from backend.services.notification_retention import RetentionPolicy, apply_retention
+    from backend.services.notifications_service import NotificationService
+    from backend.services.sync import prune_tombstones
+    from backend.services.unread_counters import backfill_unread_counters
+    from backend.utils.security import create_access_token
+
+    reset_check_database()
+    init_db()
+
+    user_id = seed_user(engine, "sync@example.com", subscriptions=args.subscriptions,
+                        notifications=args.notifications, read_ratio=0.7)
+    with engine_for_user(user_id).begin() as conn:
+        sub_ids = [row[0] for row in conn.execute(select(Subscription.id).where(Subscription.userId == user_id))]
+        conn.execute(insert(PriceHistory), [
+            {"subscriptionId": sub_id, "amount": 100, "startDate": date.today() - timedelta(days=30)}
+            for sub_id in sub_ids
+        ])
+    db = user_session(user_id)
+    backfill_unread_counters(db)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}",
+               "Accept-Encoding": "identity"}
+    client = TestClient(app)
+
+    def sync(token=None):
+        response = client.get("/api/sync", params={"since": token} if token else None, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json(), len(response.content)
+
+    def ok(response, expected=200):
+        assert response.status_code == expected, response.text
+        return response.json()
+
+    def notify(count, digest=False):
+        for i in range(count):
+            NotificationService.create_notification(db, user_id, sub_ids[i % len(sub_ids)], "price_changed",
+                                                    "Проверка", f"sync {i}", digest=digest)
+
+    created = []
+
+    def create(count):
+        for i in range(count):
+            created.append(ok(client.post("/api/subscriptions", headers=headers, json={
+                "name": f"Sync new {len(created)}", "currentAmount": 300, "category": "music"
+            }), 201)["id"])
+
+    def change_price(count):
+        for sub_id in sub_ids[:count]:
+            ok(client.patch(f"/api/subscriptions/{sub_id}", headers=headers,
+                            json={"currentAmount": 700 + count}))
+
+    def renew(count):
+        for sub_id in sub_ids[-count:]:
+            ok(client.patch(f"/api/subscriptions/{sub_id}/renew", headers=headers))
+
+    archived = []
+
+    def archive(count):
+        for _ in range(count):
+            sub_id = sub_ids.pop(len(sub_ids) // 2)
+            ok(client.patch(f"/api/subscriptions/{sub_id}/archive", headers=headers))
+            archived.append(sub_id)
+
+    def read_some(count):
+        grouped = ok(client.get("/notifications/grouped", headers=headers))
+        ids = [int(n["id"]) for group in grouped for n in group["notifications"] if not n["read"]][:count]
+        ok(client.post("/notifications/read", headers=headers, json={"ids": ids}))
+
+    def retention(_):
+        apply_retention(db, RetentionPolicy(older_than_days=0, vacuum=False), now=datetime.utcnow() + timedelta(days=1))
+
+    # (название, запись, сколько раз)
+    series = [
+        ("Без изменений", None, 0),
+        ("Новое уведомление", notify, 1),
+        ("Изменение цены подписки", change_price, 1),
+        ("Новая подписка", create, 1),
+        ("10 уведомлений + дайджест", lambda n: (notify(n), notify(3, digest=True)), 10),
+        ("10 изменений цены", change_price, 10),
+        ("10 продлений", renew, 10),
+        ("5 архиваций", archive, 5),
+        ("20 прочитанных", read_some, 20),
+        ("100 уведомлений", notify, 100),
+        ("Ретеншн (все прочитанные)", retention, 1),
+    ]
+
+    failures = []
+    full, full_size = sync()
+    replica = apply({}, full)
+    token = full["token"]
+    first_token = token
+    print(f"Подписок: {args.subscriptions}, уведомлений: {args.notifications}")
+    print(f"  {'Полный снимок':32} {full_size:9} байт  подписок {len(full['subscriptions']):5}  "
+          f"цен {len(full['price_history']):5}  уведомлений {len(full['notifications']):5}")
+
+    for title, write, count in series:
+        if write:
+            write(count)
+        delta, size = sync(token)
+        if delta["full"]:
+            failures.append(f"{title}: вместо дельты пришел полный снимок")
+        replica = apply(replica, delta)
+        token = delta["token"]
+
+        snapshot, _ = sync()
+        expected = apply({}, snapshot)
+        for entity in ENTITIES:
+            if replica[entity] != expected[entity]:
+                missing = expected[entity].keys() - replica[entity].keys()
+                extra = replica[entity].keys() - expected[entity].keys()
+                changed = [key for key in expected[entity].keys() & replica[entity].keys()
+                           if expected[entity][key] != replica[entity][key]]
+                failures.append(f"{title}: {entity} расходится (нет {len(missing)}, лишних {len(extra)}, "
+                                f"устарели {len(changed)})")
+        mark = "ok" if not any(f.startswith(title + ":") for f in failures) else "ОШИБКА"
+        print(f"  {mark:6} {title:25} {size:9} байт  подписок {len(delta['subscriptions']):5}  "
+              f"цен {len(delta['price_history']):5}  уведомлений {len(delta['notifications']):5}  "
+              f"надгробий {len(delta['deleted']):5}")
+
+    # Надгробия старше срока удалены: старый токен больше не может получить дельту
+    pruned = prune_tombstones(db, older_than_days=0, now=datetime.utcnow() + timedelta(days=1))
+    stale, _ = sync(first_token)
+    fresh, fresh_size = sync(token)
+    print(f"  Удалено надгробий: {pruned}; старый токен -> full={stale['full']}, "
+          f"актуальный -> full={fresh['full']} ({fresh_size} байт)")
+    if not stale["full"] or fresh["full"]:
+        failures.append("После удаления надгробий неверно выбран полный снимок")
+    if client.get("/api/sync", params={"since": "не-токен"}, headers=headers).status_code != 400:
+        failures.append("Некорректный токен не дал 400")
+
+    db.close()
+    client.close()
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+    if failures:
+        print("\n".join(["Нарушения:"] + [f"  {failure}" for failure in failures]))
+        sys.exit(1)
+    print("Реплика из дельт совпадает с полным снимком")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# backend/benchmarks/common.py
+"""Общие утилиты для бенчмарков: временная БД и генерация данных"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend import database
+from backend.database import Base, engine_for_user, set_sqlite_pragmas
+
+
+@contextmanager
+def temp_database():
+    """Создает временную SQLite базу со всеми таблицами и возвращает (engine, SessionLocal)"""
+    from backend.models.user import User
+    from backend.models.subscription import Subscription, PriceHistory
+    from backend.models.notification import Notification
+
+    tmp_dir = tempfile.mkdtemp(prefix="subs-bench-")
+    path = os.path.join(tmp_dir, "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+
+def reset_check_database():
+    """
+    Проверки check_* по умолчанию идут на новой временной SQLite; с CHECK_DATABASE_URL
+    (например, postgresql+psycopg://localhost/subs_check) — на внешней базе, схема
+    которой перед проверкой пересоздается
+    """
+    if not os.getenv("CHECK_DATABASE_URL"):
+        return
+    database.import_models()
+    for engine in database.all_engines():
+        Base.metadata.drop_all(bind=engine)
+
+
+def seed_user(engine, email: str = "bench@example.com", subscriptions: int = 50,
+              notifications: int = 0, read_ratio: float = 0.8, span: timedelta = None) -> int:
+    """
+    Создает пользователя, подписки и уведомления; возвращает id пользователя.
+    Уведомления идут с шагом в секунду или равномерно распределяются по span.
+    Для основной базы приложения с шардами подписки и уведомления пишутся в шард пользователя
+    """
+    from backend.models.user import User
+    from backend.models.subscription import Subscription
+    from backend.models.notification import Notification
+
+    categories = ["music", "video", "books", "games", "education", "social", "other"]
+    now = datetime.utcnow()
+    step = span / max(notifications, 1) if span else timedelta(seconds=1)
+
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(email=email, password="x")).inserted_primary_key[0]
+
+    with (engine_for_user(user_id) if engine is database.engine else engine).begin() as conn:
+        conn.execute(insert(Subscription), [
+            {
+                "userId": user_id,
+                "name": f"{email} sub {i}",
+                "currentAmount": 100 + i,
+                "nextPaymentDate": date.today() + timedelta(days=i % 30),
+                "connectedDate": date.today(),
+                "category": categories[i % len(categories)],
+                "notifyDays": 3,
+                "billingCycle": "monthly",
+                "autoRenewal": False,
+                "notificationsEnabled": True,
+                "createdAt": now,
+                "updatedAt": now,
+            }
+            for i in range(subscriptions)
+        ])
+        sub_ids = [row[0] for row in conn.execute(
+            Subscription.__table__.select().with_only_columns(Subscription.id)
+            .where(Subscription.userId == user_id)
+        )]
+
+        batch = []
+        for i in range(notifications):
+            batch.append({
+                "user_id": user_id,
+                "subscription_id": sub_ids[i % len(sub_ids)],
+                "type": "payment_reminder",
+                "title": "Скоро списание",
+                "message": f"Уведомление #{i}",
+                "read": i < notifications * read_ratio,
+                "scheduled_date": now,
+                "created_at": now - step * (notifications - i),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Notification), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Notification), batch)
+
+    return user_id
+
+
+def measure(fn, repeat: int = 5):
+    """Запускает fn repeat раз и возвращает (медиана в мс, результат последнего вызова)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def handler_context():
+    """Request и Response для прямого вызова обработчика маршрута без HTTP (без If-None-Match)"""
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    return Request({"type": "http", "method": "GET", "headers": []}), Response()
@@ -0,0 +1,334 @@
+# backend/benchmarks/load_api.py
+"""
+Нагрузочный тест всего API: N синтетических пользователей одновременно проходят
+сценарии экранов Flutter-клиента против локального uvicorn на временной базе.
+
+Каждый пользователь регистрируется и входит, а затем, пока не истечет --duration,
+выбирает экран с весами из SCREENS:
+    subscriptions — список активных и архивных подписок (SubscriptionScreen, ArchiveScreen)
+    edit          — создание подписки, просмотр, история цен, изменение цены,
+                    продление, иногда архивирование
+    analytics     — общая аналитика за месяц и детализация по категории
+    notifications — сгруппированные уведомления, лента по подписке, счетчик
+                    непрочитанных, «прочитать все»
+    profile       — /api/me
+
+Отчет JSON: пропускная способность и p50/p95/p99 по каждому эндпоинту (шаблону
+маршрута). С --baseline отчет сравнивается с сохраненным: регрессия p95 или
+пропускной способности сверх --tolerance, ошибки или пропавший эндпоинт —
+код выхода 1. Базовый отчет зависит от машины: записывайте его той же командой
+с --save-baseline на той машине, где потом сравниваете.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.load_api --users 20 --duration 30 --report /tmp/load.json
+    python -m backend.benchmarks.load_api --baseline backend/benchmarks/baselines/load_api.json
+    python -m backend.benchmarks.load_api --save-baseline backend/benchmarks/baselines/load_api.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PASSWORD = "Load-test-pass-1"
+CATEGORIES = ["music", "video", "books", "games", "education", "social", "other"]
+SCREENS = {"subscriptions": 4, "edit": 2, "analytics": 2, "notifications": 3, "profile": 1}
+
+
+def percentile(values: list, q: float) -> float:
+    """Процентиль по ближайшему рангу; values отсортированы"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = {}  # "GET /api/subscriptions" -> [секунды]
+        self.errors = {}
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            response, failed = None, True
+        self.timings.setdefault(endpoint, []).append(time.perf_counter() - started)
+        if failed:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def report(self, seconds: float, meta: dict) -> dict:
+        endpoints = {}
+        for endpoint, timings in sorted(self.timings.items()):
+            timings = sorted(timings)
+            endpoints[endpoint] = {
+                "requests": len(timings),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": round(len(timings) / seconds, 2),
+                "p50_ms": round(percentile(timings, 50) * 1000, 2),
+                "p95_ms": round(percentile(timings, 95) * 1000, 2),
+                "p99_ms": round(percentile(timings, 99) * 1000, 2),
+            }
+        total = sum(item["requests"] for item in endpoints.values())
+        return {
+            "meta": {**meta, "seconds": round(seconds, 2), "finished_at": datetime.utcnow().isoformat()},
+            "total": {
+                "requests": total,
+                "errors": sum(item["errors"] for item in endpoints.values()),
+                "rps": round(total / seconds, 2),
+            },
+            "endpoints": endpoints,
+        }
+
+
+class SyntheticUser:
+    def __init__(self, index: int, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.email = f"load{index}-{int(time.time())}@example.com"
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.headers = {}
+        self.subscriptions = []  # id активных подписок
+
+    async def call(self, endpoint: str, url: str = None, **kwargs):
+        method, template = endpoint.split(" ", 1)
+        return await self.recorder.call(self.client, endpoint, method, url or template,
+                                        headers=self.headers, **kwargs)
+
+    async def sign_in(self) -> bool:
+        credentials = {"email": self.email, "password": PASSWORD}
+        await self.call("POST /api/register", json=credentials)
+        response = await self.call("POST /api/login", json=credentials)
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def create_subscription(self):
+        response = await self.call("POST /api/subscriptions", json={
+            "name": f"Load {self.rng.randrange(10 ** 6)}",
+            "currentAmount": self.rng.randrange(99, 2000),
+            "category": self.rng.choice(CATEGORIES),
+            "billingCycle": self.rng.choice(["monthly", "yearly"]),
+        })
+        if response is not None and response.status_code == 201:
+            self.subscriptions.append(response.json()["id"])
+
+    async def screen_subscriptions(self):
+        await self.call("GET /api/subscriptions", params={"archived": "false"})
+        await self.call("GET /api/subscriptions", params={"archived": "true"})
+
+    async def screen_edit(self):
+        await self.create_subscription()
+        if not self.subscriptions:
+            return
+        sub_id = self.rng.choice(self.subscriptions)
+        await self.call("GET /api/subscriptions/{subscription_id}", f"/api/subscriptions/{sub_id}")
+        await self.call("GET /api/subscriptions/{subscription_id}/price-history",
+                        f"/api/subscriptions/{sub_id}/price-history")
+        await self.call("PATCH /api/subscriptions/{subscription_id}", f"/api/subscriptions/{sub_id}",
+                        json={"currentAmount": self.rng.randrange(99, 2000)})
+        await self.call("PATCH /api/subscriptions/{subscription_id}/renew", f"/api/subscriptions/{sub_id}/renew")
+        if len(self.subscriptions) > 5 and self.rng.random() < 0.3:
+            self.subscriptions.remove(sub_id)
+            await self.call("PATCH /api/subscriptions/{subscription_id}/archive",
+                            f"/api/subscriptions/{sub_id}/archive")
+
+    async def screen_analytics(self):
+        today = date.today()
+        params = {"period": "month", "year": today.year, "month": today.month}
+        await self.call("GET /api/analytics", params=params)
+        await self.call("GET /api/analytics/{category}", f"/api/analytics/{self.rng.choice(CATEGORIES)}",
+                        params=params)
+
+    async def screen_notifications(self):
+        await self.call("GET /notifications/grouped")
+        if not self.subscriptions:
+            return
+        sub_id = self.rng.choice(self.subscriptions)
+        await self.call("GET /notifications/subscription/{subscription_id}",
+                        f"/notifications/subscription/{sub_id}")
+        await self.call("GET /notifications/subscription/{subscription_id}/unread-count",
+                        f"/notifications/subscription/{sub_id}/unread-count")
+        if self.rng.random() < 0.5:
+            await self.call("POST /notifications/subscription/{subscription_id}/read-all",
+                            f"/notifications/subscription/{sub_id}/read-all")
+
+    async def screen_profile(self):
+        await self.call("GET /api/me")
+
+    async def run(self, window: "LoadWindow", think: float):
+        if not self.headers:
+            return
+        # Стартовый набор, как после первых минут работы с приложением
+        for _ in range(3):
+            await self.create_subscription()
+        screens, weights = zip(*SCREENS.items())
+        while time.perf_counter() < window.deadline:
+            screen = self.rng.choices(screens, weights)[0]
+            await getattr(self, f"screen_{screen}")()
+            if think:
+                await asyncio.sleep(self.rng.uniform(0, think * 2))
+
+
+class LoadWindow:
+    """
+    Окно замера открывается, когда вошли все пользователи: регистрация и вход
+    (bcrypt) занимают пул потоков сервера и иначе искажают сценарии экранов
+    """
+
+    def __init__(self, users: int, duration: float):
+        self.waiting = users
+        self.duration = duration
+        self.started = self.deadline = None
+        self._opened = asyncio.Event()
+
+    async def ready(self):
+        self.waiting -= 1
+        if self.waiting == 0:
+            self.started = time.perf_counter()
+            self.deadline = self.started + self.duration
+            self._opened.set()
+        await self._opened.wait()
+
+
+async def run_load(args, base_url: str) -> dict:
+    sign_in = Recorder()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        window = LoadWindow(args.users, args.duration)
+        users = [SyntheticUser(i, client, sign_in, random.Random(args.seed + i)) for i in range(args.users)]
+
+        async def run_user(user: SyntheticUser):
+            await user.sign_in()
+            user.recorder = recorder
+            await window.ready()
+            await user.run(window, args.think)
+
+        sign_in_started = time.perf_counter()
+        await asyncio.gather(*(run_user(user) for user in users))
+        seconds = time.perf_counter() - window.started
+    report = recorder.report(seconds, {
+        "users": args.users, "duration": args.duration, "think": args.think,
+        "workers": args.workers, "seed": args.seed,
+    })
+    # Вход замеряется отдельно и в пропускную способность сценариев не входит
+    report["sign_in"] = sign_in.report(window.started - sign_in_started, {})["endpoints"]
+    report["total"]["errors"] += sum(item["errors"] for item in report["sign_in"].values())
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float, slack_ms: float) -> list:
+    """Регрессии отчета относительно базового: список строк"""
+    problems = []
+    if report["total"]["errors"]:
+        problems.append(f"ошибок HTTP: {report['total']['errors']}")
+    if report["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        problems.append(f"пропускная способность {report['total']['rps']} < "
+                        f"{baseline['total']['rps']} запросов/с (допуск {tolerance:.0%})")
+    for endpoint, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(endpoint)
+        if current is None:
+            problems.append(f"{endpoint}: нет в отчете")
+            continue
+        # Абсолютный запас не дает быстрым эндпоинтам падать из-за шума в доли миллисекунды
+        limit = base["p95_ms"] * (1 + tolerance) + slack_ms
+        if current["p95_ms"] > limit:
+            problems.append(f"{endpoint}: p95 {current['p95_ms']} мс > {limit:.1f} мс (база {base['p95_ms']} мс)")
+    return problems
+
+
+def print_report(report: dict, baseline: dict = None):
+    meta, total = report["meta"], report["total"]
+    print(f"Пользователей: {meta['users']}, воркеров: {meta['workers']}, {meta['seconds']} с: "
+          f"{total['requests']} запросов, {total['rps']} запросов/с, ошибок: {total['errors']}")
+    print(f"  {'эндпоинт':62} {'запросов':>8} {'ошибок':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, item in list(report["endpoints"].items()) + list(report.get("sign_in", {}).items()):
+        base = (baseline or {}).get("endpoints", {}).get(endpoint)
+        delta = f"  (база p95 {base['p95_ms']})" if base else ""
+        print(f"  {endpoint:62} {item['requests']:8} {item['errors']:6} {item['p50_ms']:8.1f} "
+              f"{item['p95_ms']:8.1f} {item['p99_ms']:8.1f}{delta}")
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen):
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn завершился с кодом {server.returncode}")
+        try:
+            httpx.get(f"{base_url}/health")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("uvicorn не запустился за 30 с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность нагрузки, секунды")
+    parser.add_argument("--think", type=float, default=0.0, help="Средняя пауза между экранами, секунды")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", default=os.path.join(tempfile.gettempdir(), "subs-load-report.json"))
+    parser.add_argument("--baseline", default=None, help="Сравнить с сохраненным отчетом")
+    parser.add_argument("--save-baseline", default=None, help="Сохранить отчет как базовый")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимая регрессия, доля")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Абсолютный запас для p95, мс")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="subs-load-") as tmp_dir:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=REPO_ROOT,
+            env={**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'load.db')}",
+                 "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+                 "SLOW_QUERY_LOG": os.path.join(tmp_dir, "slow_queries.jsonl")},
+            stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_for_server(base_url, server)
+            report = asyncio.run(run_load(args, base_url))
+        finally:
+            server.terminate()
+            server.wait()
+
+    with open(args.report, "w") as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+    print(f"Отчет: {args.report}")
+
+    if baseline is not None:
+        problems = compare(report, baseline, args.tolerance, args.slack_ms)
+        if problems:
+            print("\n".join(["Регрессии относительно базового отчета:"] + [f"  {p}" for p in problems]))
+            sys.exit(1)
+        print("Без регрессий относительно базового отчета")
+    elif report["total"]["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# backend/benchmarks/load_notification_stream.py
+"""
+Нагрузочный тест /notifications/stream: держим много простаивающих SSE-соединений
+на одном воркере uvicorn и измеряем память сервера и задержку доставки события.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.load_notification_stream --connections 5000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from backend.database import Base
+from backend.utils.security import create_access_token
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed_users(db_url: str, count: int) -> list:
+    from backend.models.user import User
+    from backend.models.subscription import Subscription, PriceHistory
+    from backend.models.notification import Notification, NotificationCounter
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": f"stream{i}@example.com", "password": "x"} for i in range(count)])
+        ids = [row[0] for row in conn.execute(User.__table__.select().with_only_columns(User.id))]
+    engine.dispose()
+    return ids
+
+
+def server_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_stream(port: int, token: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /notifications/stream?token={token} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    # Соединение готово, когда пришел первый кадр потока
+    while b"retry:" not in await reader.readline():
+        pass
+    return reader, writer
+
+
+async def wait_for_event(reader, event: str = "notification") -> float:
+    marker = f"event: {event}".encode()
+    while marker not in await reader.readline():
+        pass
+    return time.perf_counter()
+
+
+async def run(args, port: int, pid: int, user_ids: list):
+    tokens = {user_id: create_access_token({"user_id": user_id}, expires_minutes=60) for user_id in user_ids}
+    rss_before = server_rss_mb(pid)
+
+    started = time.perf_counter()
+    streams = []
+    for offset in range(0, args.connections, args.batch):
+        batch = [
+            open_stream(port, tokens[user_ids[i % len(user_ids)]])
+            for i in range(offset, min(offset + args.batch, args.connections))
+        ]
+        streams.extend(await asyncio.gather(*batch))
+    connect_seconds = time.perf_counter() - started
+
+    await asyncio.sleep(args.idle)
+    rss_after = server_rss_mb(pid)
+
+    # Одно событие для первого пользователя: доставка во все его соединения
+    target = user_ids[0]
+    target_streams = [streams[i] for i in range(0, args.connections, len(user_ids))]
+    waiters = [asyncio.ensure_future(wait_for_event(reader)) for reader, _ in target_streams]
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        sent = time.perf_counter()
+        response = await client.post(
+            "/api/subscriptions",
+            json={"name": "Stream load test", "currentAmount": 199, "category": "video"},
+            headers={"Authorization": f"Bearer {tokens[target]}"}
+        )
+        response.raise_for_status()
+        delivered = await asyncio.gather(*waiters)
+
+        health_started = time.perf_counter()
+        await client.get("/health")
+        health_ms = (time.perf_counter() - health_started) * 1000
+
+    for _, writer in streams:
+        writer.close()
+
+    print(f"Соединений: {args.connections} (пользователей: {len(user_ids)}), воркер: 1")
+    print(f"  Открытие всех соединений: {connect_seconds:.2f} с")
+    print(f"  RSS сервера: {rss_before:.1f} МБ -> {rss_after:.1f} МБ "
+          f"({(rss_after - rss_before) * 1024 / args.connections:.1f} КБ на соединение)")
+    print(f"  Доставка события в {len(target_streams)} соединений: "
+          f"{(max(delivered) - sent) * 1000:.1f} мс после отправки запроса")
+    print(f"  /health под нагрузкой: {health_ms:.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=500, help="Сколько соединений открывать одновременно")
+    parser.add_argument("--idle", type=float, default=2.0, help="Пауза простоя перед замером, секунды")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Клиент и сервер на одной машине: по дескриптору на каждую сторону соединения
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.connections * 2 + 256
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    with tempfile.TemporaryDirectory(prefix="subs-stream-") as tmp_dir:
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'stream.db')}"
+        user_ids = seed_users(db_url, args.users)
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port),
+             "--workers", "1", "--log-level", "warning", "--backlog", str(args.batch * 2)],
+            cwd=REPO_ROOT,
+            env={**os.environ, "DATABASE_URL": db_url},
+            stdout=subprocess.DEVNULL
+        )
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"http://127.0.0.1:{args.port}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            asyncio.run(run(args, args.port, server.pid, user_ids))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
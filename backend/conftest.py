@@ -0,0 +1,73 @@
+# backend/conftest.py
+"""
+Общие фикстуры pytest. Тесты идут на временной SQLite, созданной на весь прогон;
+с CHECK_DATABASE_URL (например, postgresql+psycopg://localhost/subs_check) — на
+внешней базе, схема которой пересоздается, как в проверках check_*.
+
+Запуск из корня репозитория:
+    python -m pytest backend
+    CHECK_DATABASE_URL=postgresql+psycopg://localhost/subs_check python -m pytest backend
+"""
+import itertools
+import os
+import shutil
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="subs-tests-")
+# Адрес базы читается при импорте backend.database — до импорта приложения
+os.environ["DATABASE_URL"] = os.getenv("CHECK_DATABASE_URL") or f"sqlite:///{os.path.join(_tmp_dir, 'tests.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest  # noqa: E402
+
+# Фикстура бюджета SQL-запросов. Импорт, а не pytest_plugins: тот разрешен только
+# в conftest корня прогона, а тесты запускают и из корня репозитория, и из backend
+from backend.utils.query_tracker import query_budget  # noqa: E402,F401
+
+# Ручной сценарий над рабочей subscriptions.db, а не тест
+collect_ignore = ["test_simple.py"]
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from backend.benchmarks.common import reset_check_database
+    from backend.database import all_engines, init_db
+
+    reset_check_database()
+    init_db()
+    yield
+    for db_engine in all_engines():
+        db_engine.dispose()
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    # Без with: lifespan (фоновые задачи, очереди) в тестах не запускается
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user():
+    """make_user(subscriptions=3, notifications=0) -> (id пользователя, заголовки с токеном)"""
+    from backend.benchmarks.common import seed_user
+    from backend.database import engine, user_session
+    from backend.services.unread_counters import repair_unread_counters
+    from backend.utils.security import create_access_token
+
+    def make(subscriptions: int = 3, notifications: int = 0, **kwargs) -> tuple:
+        user_id = seed_user(engine, f"test{next(_emails)}@example.com", subscriptions=subscriptions,
+                            notifications=notifications, **kwargs)
+        if notifications:
+            # seed_user пишет уведомления мимо сервиса — счетчики непрочитанного пересчитываем
+            with user_session(user_id) as db:
+                repair_unread_counters(db, user_id)
+        token = create_access_token({"user_id": user_id}, 60)
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
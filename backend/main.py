@@ -1,4 +1,5 @@
 from sys import prefix
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import logging
@@ -7,18 +8,50 @@ from backend.routes.auth import router as auth_router
 from backend.routes.subs import router as subs_router
 from backend.routes.notifications import router as notifications_router
 from backend.routes.analytics import router as analytics_router
+from backend.routes.dashboard import router as dashboard_router
+from backend.routes.sync import router as sync_router
+from backend.routes.batch import router as batch_router
 import backend.database
-from backend.database import init_db
+from backend.database import ensure_schema
+from backend.utils.log import setup_logging
+from backend.utils.metrics import METRICS_ENABLED, MetricsMiddleware, RequestScopeMiddleware, instrument_engine
+from backend.utils import query_tracker
+from backend.utils.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from backend.utils.profiling import ProfilingMiddleware, profiling_enabled
+from backend.services.jobs import start_background_tasks, stop_background_tasks
+from backend.services.write_queue import WRITE_QUEUE_ENABLED, start_write_queues, stop_write_queues
+from sqlalchemy.orm import configure_mappers
+from starlette.concurrency import run_in_threadpool
 
-init_db()
-
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Логирование — в каждом воркере: поток записи логов мастера в форк не переходит
+    setup_logging()
+    # Импорт приложения не трогает базу: схема проверяется здесь, одним SELECT
+    # версии (полный init_db — только для новой базы или измененных моделей)
+    await run_in_threadpool(ensure_schema)
+    # Что иначе досталось бы первому запросу: связи моделей и схема OpenAPI
+    # (под backend.serve она уже построена в мастере до форка)
+    configure_mappers()
+    app.openapi()
+
+    # Поток-писатель и фоновые задачи (BACKGROUND_JOBS, STREAM_RELAY) живут столько же,
+    # сколько воркер; писатель останавливается последним, дописав очередь
+    if WRITE_QUEUE_ENABLED:
+        start_write_queues()
+    threads = start_background_tasks()
+    yield
+    stop_background_tasks(threads)
+    stop_write_queues()
+
+
 # ИЗМЕНЕНИЕ 1: Добавить название и docs (2 строки)
 app = FastAPI(
     title="Subscription Analyzer API",
-    docs_url="/docs"
+    docs_url="/docs",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -29,10 +62,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие gzip/brotli: снаружи CORS, внутри метрик — в метрики попадает размер после сжатия
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 app.include_router(auth_router)
 app.include_router(subs_router)
 app.include_router(notifications_router)
 app.include_router(analytics_router) 
+app.include_router(dashboard_router)
+app.include_router(sync_router)
+app.include_router(batch_router)
+
+# Журнал медленных запросов (SLOW_QUERY_MS) узнает маршрут из scope запроса;
+# MetricsMiddleware ставит его сам, без метрик нужен отдельный middleware
+if backend.database.slow_query_log is not None and not METRICS_ENABLED:
+    app.add_middleware(RequestScopeMiddleware)
+
+# Метрики Prometheus: middleware снаружи CORS, чтобы учитывать и preflight-запросы
+if METRICS_ENABLED:
+    for db_engine in backend.database.all_engines():
+        instrument_engine(db_engine)
+    app.add_middleware(MetricsMiddleware)
+    from backend.routes.metrics import router as metrics_router
+    app.include_router(metrics_router)
+
+# Отладка: число SQL-запросов и время БД в заголовках ответа, предупреждения о N+1
+if query_tracker.QUERY_DEBUG:
+    for db_engine in backend.database.all_engines():
+        query_tracker.instrument_engine(db_engine)
+    app.add_middleware(query_tracker.QueryTrackerMiddleware)
+
+# Профилирование по заголовку администратора или по выборке; выключено — не подключается
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+    from backend.routes.profiles import router as profiles_router
+    app.include_router(profiles_router)
 
 @app.get("/")
 async def root():
@@ -44,5 +109,6 @@ async def health_check():
 
 
 if __name__ == "__main__":
+    # Для разработки: один процесс с перезагрузкой; в продакшене — python -m backend.serve
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,173 @@
+# backend/manage.py
+"""
+Служебные команды обслуживания базы.
+
+Запуск из корня репозитория:
+    python -m backend.manage unread-counters            # только проверка
+    python -m backend.manage unread-counters --repair   # проверка и исправление
+    python -m backend.manage retention --days 180       # архивировать старые прочитанные уведомления
+    python -m backend.manage migrate-notification-ids   # онлайн-перевод уведомлений на целые id
+    python -m backend.manage slow-queries --top 10      # худшие операторы из журнала медленных запросов
+
+С шардами (SHARDS > 1) команды над базой выполняются во всех шардах параллельно,
+отчет — общий.
+"""
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.database import ensure_schema, map_shards, user_engines, user_session
+from backend.services.notification_retention import RETENTION_DAYS, RETENTION_MODE, RETENTION_BATCH_SIZE
+
+
+def unread_counters(args) -> int:
+    from backend.services.unread_counters import check_unread_counters, repair_unread_counters
+
+    def run(db):
+        if args.repair:
+            return repair_unread_counters(db, args.user)
+        return check_unread_counters(db, args.user)
+
+    if args.user is not None:
+        with user_session(args.user) as db:
+            mismatches = run(db)
+    else:
+        mismatches = [mismatch for shard in map_shards(run) for mismatch in shard]
+
+    for user_id, subscription_id, stored, actual in mismatches:
+        print(f"user={user_id} subscription={subscription_id}: stored={stored} actual={actual}")
+
+    if not mismatches:
+        print("Счетчики непрочитанных согласованы")
+        return 0
+    if args.repair:
+        print(f"Исправлено счетчиков: {len(mismatches)}")
+        return 0
+    print(f"Расхождений: {len(mismatches)} (запустите с --repair)")
+    return 1
+
+
+def retention(args) -> int:
+    from backend.services.notification_retention import RetentionPolicy, RetentionReport, apply_retention
+
+    policy = RetentionPolicy(
+        older_than_days=args.days,
+        mode=args.mode,
+        batch_size=args.batch_size,
+        compact=not args.no_compact,
+        vacuum=not args.no_vacuum,
+        pause_seconds=args.pause
+    )
+
+    reports = map_shards(lambda db: apply_retention(db, policy))
+    # Шарды обрабатываются одновременно: время — по самому долгому
+    report = RetentionReport(
+        processed=sum(r.processed for r in reports),
+        batches=sum(r.batches for r in reports),
+        summaries=sum(r.summaries for r in reports),
+        freed_pages=sum(r.freed_pages for r in reports),
+        tombstones_pruned=sum(r.tombstones_pruned for r in reports),
+        seconds=max(r.seconds for r in reports),
+        errors=[error for r in reports for error in r.errors],
+    )
+
+    action = "перенесено в архив" if policy.mode == "archive" else "удалено"
+    print(f"Уведомлений {action}: {report.processed} за {report.seconds:.2f} с "
+          f"({report.rows_per_second:.0f} строк/с, пакетов: {report.batches})")
+    if policy.compact:
+        print(f"Обновлено итоговых записей истории: {report.summaries}")
+    if policy.vacuum:
+        print(f"Освобождено страниц: {report.freed_pages}")
+    if report.tombstones_pruned:
+        print(f"Удалено надгробий синхронизации: {report.tombstones_pruned}")
+    for error in report.errors:
+        print(f"Ошибка: {error}")
+    return 1 if report.errors else 0
+
+
+def migrate_notification_ids(args) -> int:
+    from backend.migrations import notification_int_ids
+
+    engines = [engine for engine in user_engines() if notification_int_ids.needs_migration(engine)]
+    if not engines:
+        print("Уведомления уже используют целочисленные ключи")
+        return 0
+
+    with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+        results = list(pool.map(
+            lambda engine: notification_int_ids.migrate(engine, chunk_size=args.chunk_size, pause=args.pause),
+            engines
+        ))
+    print(f"Перенесено уведомлений: {sum(r['notifications'] for r in results)}, "
+          f"в архиве: {sum(r['archive'] for r in results)} за {max(r['seconds'] for r in results):.2f} с")
+    return 0
+
+
+def slow_queries(args) -> int:
+    from backend.utils.slow_queries import read_entries, summarize
+
+    entries = read_entries(args.file)
+    if not entries:
+        print("Журнал медленных запросов пуст")
+        return 0
+
+    summary = summarize(entries, args.order_by)
+    print(f"Медленных запросов: {len(entries)}, форм операторов: {len(summary)}")
+    for item in summary[:args.top]:
+        routes = ", ".join(f"{route} x{count}" for route, count in
+                           sorted(item["routes"].items(), key=lambda pair: pair[1], reverse=True))
+        print(f"\n[{item['shape_id']}] раз: {item['count']}, всего {item['total_ms']:.1f} мс, "
+              f"p95 {item['p95_ms']:.1f} мс, макс {item['max_ms']:.1f} мс")
+        print(f"  маршруты: {routes}")
+        print(f"  {item['sql'][:args.width]}")
+        for step in item["plan"] or []:
+            print(f"    план: {step}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.manage", description="Обслуживание базы")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    counters = commands.add_parser("unread-counters", help="Проверить счетчики непрочитанных")
+    counters.add_argument("--repair", action="store_true", help="Пересчитать расходящиеся счетчики")
+    counters.add_argument("--user", type=int, default=None, help="Только для одного пользователя")
+    counters.set_defaults(handler=unread_counters)
+
+    retention_parser = commands.add_parser("retention", help="Архивировать или удалить старые прочитанные уведомления")
+    retention_parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="Возраст уведомлений в днях")
+    retention_parser.add_argument("--mode", choices=["archive", "delete"], default=RETENTION_MODE)
+    retention_parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    retention_parser.add_argument("--pause", type=float, default=0.0, help="Пауза между пакетами, секунды")
+    retention_parser.add_argument("--no-compact", action="store_true", help="Не сворачивать историю в итоговые записи")
+    retention_parser.add_argument("--no-vacuum", action="store_true", help="Не запускать incremental VACUUM")
+    retention_parser.set_defaults(handler=retention)
+
+    migrate_parser = commands.add_parser(
+        "migrate-notification-ids",
+        help="Перевести notifications на целочисленные ключи, пока работает старая версия"
+    )
+    migrate_parser.add_argument("--chunk-size", type=int, default=5000)
+    migrate_parser.add_argument("--pause", type=float, default=0.0, help="Пауза между пакетами, секунды")
+    # init_db выполнил бы миграцию сам с параметрами по умолчанию
+    migrate_parser.set_defaults(handler=migrate_notification_ids, init_db=False)
+
+    slow_parser = commands.add_parser("slow-queries", help="Сводка журнала медленных SQL-запросов")
+    slow_parser.add_argument("--file", default=None, help="Путь к журналу (по умолчанию SLOW_QUERY_LOG)")
+    slow_parser.add_argument("--top", type=int, default=10)
+    slow_parser.add_argument("--order-by", choices=["total", "max", "p95", "count"], default="total")
+    slow_parser.add_argument("--width", type=int, default=300, help="Сколько символов SQL показывать")
+    slow_parser.set_defaults(handler=slow_queries, init_db=False)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "init_db", True):
+        ensure_schema()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
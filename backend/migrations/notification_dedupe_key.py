@@ -0,0 +1,18 @@
+# backend/migrations/notification_dedupe_key.py
+"""
+Добавляет в notifications колонку dedupe_key для режима дайджеста.
+create_all не добавляет колонки в существующие таблицы; уникальный индекс
+по колонке создает init_db вместе с остальными индексами.
+"""
+from sqlalchemy import inspect, text
+
+
+def needs_migration(engine) -> bool:
+    columns = {column["name"] for column in inspect(engine).get_columns("notifications")}
+    return "dedupe_key" not in columns
+
+
+def migrate(engine):
+    # ADD COLUMN с NULL по умолчанию в SQLite меняет только схему, таблица не перезаписывается
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE notifications ADD COLUMN dedupe_key VARCHAR"))
@@ -0,0 +1,169 @@
+# backend/migrations/notification_int_ids.py
+"""
+Онлайн-миграция уведомлений со строковых uuid4-ключей на целочисленные.
+
+Старая схема: notifications.id — случайный uuid4 (TEXT), user_id — TEXT.
+Новая схема: id — INTEGER PRIMARY KEY AUTOINCREMENT (порядок id = порядок создания),
+user_id — INTEGER, как users.id.
+
+Строки копируются в notifications_new короткими транзакциями в порядке created_at,
+так что старая версия приложения может продолжать писать в notifications.
+В финальной короткой транзакции докопируются новые строки, переносятся флаги
+прочтения, изменившиеся за время копирования, и таблицы меняются местами.
+"""
+import re
+import sqlite3
+import time
+
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from backend.models.notification import Notification, NotificationArchive
+# Цели внешних ключей должны быть в метаданных, чтобы скомпилировать DDL
+from backend.models.subscription import Subscription
+from backend.models.user import User
+
+COLUMNS = "user_id, subscription_id, type, title, message, read, scheduled_date, created_at"
+LEGACY_COLUMNS = "CAST(user_id AS INTEGER), subscription_id, type, title, message, read, scheduled_date, created_at"
+
+
+def _column_type(conn: sqlite3.Connection, table: str, column: str):
+    for _, name, column_type, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        if name == column:
+            return column_type.upper()
+    return None
+
+
+def _is_legacy(conn: sqlite3.Connection, table: str) -> bool:
+    column_type = _column_type(conn, table, "id")
+    return column_type is not None and column_type != "INTEGER"
+
+
+def _create_table_sql(table, name: str) -> str:
+    ddl = str(CreateTable(table).compile(dialect=sqlite_dialect.dialect()))
+    return re.sub(rf"CREATE TABLE {table.name}\b", f"CREATE TABLE {name}", ddl, count=1)
+
+
+def _create_index_sql(table) -> list:
+    return [str(CreateIndex(index).compile(dialect=sqlite_dialect.dialect())) for index in table.indexes]
+
+
+def needs_migration(engine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as connection:
+        conn = connection.connection.driver_connection
+        return _is_legacy(conn, "notifications") or _is_legacy(conn, "notifications_archive")
+
+
+def _migrate_archive(conn: sqlite3.Connection) -> int:
+    """
+    Архив холодный и в него не пишут обработчики: переносим одной транзакцией.
+    Возвращает количество перенесенных строк (им выданы id 1..N)
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("DROP TABLE IF EXISTS notifications_archive_new")
+    conn.execute(_create_table_sql(NotificationArchive.__table__, "notifications_archive_new"))
+    conn.execute(
+        f"INSERT INTO notifications_archive_new (id, {COLUMNS}, archived_at) "
+        f"SELECT row_number() OVER (ORDER BY created_at, id), {LEGACY_COLUMNS}, archived_at "
+        f"FROM notifications_archive"
+    )
+    count = conn.execute("SELECT count(*) FROM notifications_archive_new").fetchone()[0]
+    conn.execute("DROP TABLE notifications_archive")
+    conn.execute("ALTER TABLE notifications_archive_new RENAME TO notifications_archive")
+    for statement in _create_index_sql(NotificationArchive.__table__):
+        conn.execute(statement)
+    conn.execute("COMMIT")
+    return count
+
+
+def _migrate_notifications(conn: sqlite3.Connection, first_id: int, chunk_size: int, pause: float) -> int:
+    conn.execute("DROP TABLE IF EXISTS notifications_new")
+    conn.execute("DROP TABLE IF EXISTS notification_id_map")
+    conn.execute(_create_table_sql(Notification.__table__, "notifications_new"))
+    conn.execute("CREATE TABLE notification_id_map (legacy_id TEXT PRIMARY KEY, new_id INTEGER NOT NULL)")
+    # Временный индекс для обхода по времени; исчезнет вместе со старой таблицей
+    conn.execute("CREATE INDEX IF NOT EXISTS tmp_ix_notifications_created ON notifications (created_at, id)")
+
+    next_id = first_id
+    last_created_at, last_id = "", ""
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            f"SELECT id, {LEGACY_COLUMNS} FROM notifications "
+            f"WHERE (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?",
+            (last_created_at, last_id, chunk_size)
+        ).fetchall()
+
+        if not rows:
+            conn.execute("COMMIT")
+            break
+
+        new_rows = []
+        mapping = []
+        for legacy_id, *values in rows:
+            next_id += 1
+            new_rows.append((next_id, *values))
+            mapping.append((legacy_id, next_id))
+
+        conn.executemany(f"INSERT INTO notifications_new (id, {COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", new_rows)
+        conn.executemany("INSERT INTO notification_id_map (legacy_id, new_id) VALUES (?, ?)", mapping)
+        conn.execute("COMMIT")
+
+        last_created_at, last_id = rows[-1][8], rows[-1][0]
+        if pause:
+            time.sleep(pause)
+
+    # Финальная транзакция: докопировать, синхронизировать, поменять таблицы местами
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        f"INSERT INTO notifications_new ({COLUMNS}) SELECT {LEGACY_COLUMNS} FROM notifications o "
+        f"WHERE NOT EXISTS (SELECT 1 FROM notification_id_map m WHERE m.legacy_id = o.id) "
+        f"ORDER BY created_at, id"
+    )
+    conn.execute(
+        "UPDATE notifications_new SET read = 1 WHERE read = 0 AND id IN ("
+        "SELECT m.new_id FROM notification_id_map m JOIN notifications o ON o.id = m.legacy_id WHERE o.read = 1)"
+    )
+    conn.execute(
+        "DELETE FROM notifications_new WHERE id IN ("
+        "SELECT m.new_id FROM notification_id_map m "
+        "WHERE NOT EXISTS (SELECT 1 FROM notifications o WHERE o.id = m.legacy_id))"
+    )
+    count = conn.execute("SELECT count(*) FROM notifications_new").fetchone()[0]
+    conn.execute("DROP TABLE notifications")
+    conn.execute("DROP TABLE notification_id_map")
+    conn.execute("ALTER TABLE notifications_new RENAME TO notifications")
+    for statement in _create_index_sql(Notification.__table__):
+        conn.execute(statement)
+
+    # Новые id не должны пересекаться с id, уже выданными строкам архива
+    updated = conn.execute(
+        "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'notifications'", (first_id,)
+    ).rowcount
+    if not updated:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('notifications', ?)", (first_id,))
+    conn.execute("COMMIT")
+    return count
+
+
+def migrate(engine, chunk_size: int = 5000, pause: float = 0.0) -> dict:
+    """Переводит notifications и notifications_archive на целочисленные ключи"""
+    started = time.perf_counter()
+    conn = sqlite3.connect(engine.url.database, isolation_level=None, timeout=30)
+    try:
+        archived = _migrate_archive(conn) if _is_legacy(conn, "notifications_archive") else 0
+        first_id = conn.execute("SELECT coalesce(max(id), 0) FROM notifications_archive").fetchone()[0] \
+            if _column_type(conn, "notifications_archive", "id") else 0
+        migrated = _migrate_notifications(conn, first_id, chunk_size, pause) \
+            if _is_legacy(conn, "notifications") else 0
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return {"notifications": migrated, "archive": archived, "seconds": time.perf_counter() - started}
@@ -0,0 +1,36 @@
+# backend/migrations/sync_seq.py
+"""
+Добавляет колонки для /api/sync: последовательность изменений пользователя
+(user_data_versions.change_seq, sync_floor) и номер последнего изменения строки
+(subscriptions."syncSeq", price_history."syncSeq", notifications.sync_seq).
+Существующие строки получают 0 и попадают в первую полную синхронизацию.
+"""
+from sqlalchemy import inspect, text
+
+COLUMNS = (
+    ("user_data_versions", "change_seq"),
+    ("user_data_versions", "sync_floor"),
+    ("subscriptions", "syncSeq"),
+    ("price_history", "syncSeq"),
+    ("notifications", "sync_seq"),
+)
+
+
+def _missing(engine) -> list:
+    inspector = inspect(engine)
+    existing = {}
+    for table, column in COLUMNS:
+        if table not in existing:
+            existing[table] = {c["name"] for c in inspector.get_columns(table)}
+    return [(table, column) for table, column in COLUMNS if column not in existing[table]]
+
+
+def needs_migration(engine) -> bool:
+    return bool(_missing(engine))
+
+
+def migrate(engine):
+    # ADD COLUMN с константой по умолчанию в SQLite меняет только схему, таблица не перезаписывается
+    with engine.begin() as conn:
+        for table, column in _missing(engine):
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" INTEGER NOT NULL DEFAULT 0'))
@@ -0,0 +1,17 @@
+# models/jobs.py
+from sqlalchemy import Column, String, DateTime
+from backend.database import Base
+
+
+class JobLease(Base):
+    """
+    Аренда фоновой задачи: пока expires_at не наступил, задачу выполняет только owner.
+    Срок аренды — интервал задачи, поэтому строка заодно служит расписанием:
+    следующий запуск возможен не раньше expires_at, в каком бы воркере он ни случился
+    """
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)  # "<хост>:<pid>" воркера
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
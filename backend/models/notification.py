@@ -1,16 +1,30 @@
 # models/notification.py
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
-import uuid
 from backend.database import Base
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Лента уведомлений: группировка по подписке и выборка последних сообщений
+        Index("ix_notifications_user_sub_created", "user_id", "subscription_id", "created_at", "read"),
+        # Частичный индекс только по непрочитанным: массовые "прочитать все" не трогают историю
+        Index(
+            "ix_notifications_user_unread", "user_id", "created_at",
+            sqlite_where=text("read = 0"), postgresql_where=text("read = false")
+        ),
+        # Ключ дайджеста: не больше одной строки на (пользователь, подписка, окно); NULL не участвует
+        Index("ux_notifications_dedupe_key", "dedupe_key", unique=True),
+        # Дельта-синхронизация: изменения пользователя после токена
+        Index("ix_notifications_user_sync_seq", "user_id", "sync_seq"),
+        # AUTOINCREMENT: id не переиспользуются после удаления, порядок id совпадает с порядком создания
+        {"sqlite_autoincrement": True},
+    )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
     type = Column(String, nullable=False)  # "subscription_created", "price_changed", etc.
     title = Column(String, nullable=False)
@@ -18,7 +32,44 @@ class Notification(Base):
     read = Column(Boolean, default=False)
     scheduled_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
+    dedupe_key = Column(String, nullable=True)  # окно дайджеста или событие фоновой задачи (напоминание)
+    sync_seq = Column(Integer, nullable=False, default=0, server_default="0")  # change_seq последнего изменения
 
     # Связи
     user = relationship("User", back_populates="notifications")
-    subscription = relationship("Subscription")
\ No newline at end of file
+    subscription = relationship("Subscription")
+
+class NotificationCounter(Base):
+    """Счетчик непрочитанных уведомлений по паре (пользователь, подписка)"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+
+class NotificationArchive(Base):
+    """Холодное хранилище прочитанных уведомлений, вынесенных задачей ретеншна"""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    subscription_id = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    read = Column(Boolean, default=True)
+    scheduled_date = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, server_default=func.now())
+
+
+class NotificationHistorySummary(Base):
+    """Свертка старой истории подписки: сколько уведомлений убрано из горячей таблицы"""
+    __tablename__ = "notification_history_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), primary_key=True)
+    collapsed_count = Column(Integer, nullable=False, default=0)
+    first_created_at = Column(DateTime, nullable=True)
+    last_created_at = Column(DateTime, nullable=True)
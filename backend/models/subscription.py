@@ -29,6 +29,7 @@ class PriceHistory(Base):
     startDate = Column(Date, nullable=False, default=date.today())
     endDate = Column(Date)
     createdAt = Column(DateTime, default=datetime.utcnow)
+    syncSeq = Column(Integer, nullable=False, default=0, server_default="0")  # change_seq последнего изменения
     
     # Связь с подпиской
     subscription = relationship("Subscription", back_populates="price_history")
@@ -50,6 +51,7 @@ class Subscription(Base):
     notificationsEnabled = Column(Boolean, default=True)
     createdAt = Column(DateTime, default=datetime.utcnow)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    syncSeq = Column(Integer, nullable=False, default=0, server_default="0")  # change_seq последнего изменения
     
     # Связи
     user = relationship("User", back_populates="subscriptions")
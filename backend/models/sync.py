@@ -0,0 +1,24 @@
+# models/sync.py
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Index
+from sqlalchemy.sql import func
+from backend.database import Base
+
+
+class SyncTombstone(Base):
+    """
+    Надгробие для /api/sync: строка удалена (или подписка архивирована)
+    и должна исчезнуть с клиента. seq — из UserDataVersion.change_seq
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_seq", "user_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # "subscription", "price_history", "notification"
+    entity_id = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)  # "deleted" или "archived"
+    created_at = Column(DateTime, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -11,4 +11,21 @@ class User(Base):
 
      # Добавляем связь с подписками
     subscriptions = relationship("Subscription", back_populates="user", cascade="all, delete-orphan")
-    notifications = relationship( "Notification", back_populates="user", cascade="all, delete-orphan" )
\ No newline at end of file
+    notifications = relationship( "Notification", back_populates="user", cascade="all, delete-orphan" )
+
+
+class UserDataVersion(Base):
+    """
+    Версии данных пользователя для ETag: растут на 1 при каждой записи
+    в той же транзакции, что и сама запись.
+    change_seq — сквозная последовательность изменений для /api/sync: ею
+    помечаются измененные строки и надгробия удаленных
+    """
+    __tablename__ = "user_data_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    subscriptions = Column(Integer, nullable=False, default=0)
+    notifications = Column(Integer, nullable=False, default=0)
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
+    # Надгробия с seq не больше sync_floor удалены: более старый токен требует полной синхронизации
+    sync_floor = Column(Integer, nullable=False, default=0, server_default="0")
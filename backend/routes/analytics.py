@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime, date
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -18,6 +19,7 @@ from backend.schemas.analytics import (
 from backend.routes.auth import get_current_user
 
 router = APIRouter(prefix="/api", tags=["analytics"])
+logger = logging.getLogger(__name__)
 
 def calculate_period_dates(period_type: PeriodType, year: int, month: Optional[int] = None, quarter: Optional[int] = None) -> tuple[date, date]:
     """Рассчитывает даты начала и конца периода для аналитики"""
@@ -55,6 +57,36 @@ def get_category_name(category_value: str) -> str:
     except:
         return category_value
 
+def summarize_by_category(active_subscriptions, price_history_records) -> tuple[int, list]:
+    """
+    Суммы по категориям и общая сумма. price_history_records — строки
+    с subscriptionId и amount (объекты PriceHistory или кортежи запроса)
+    """
+    # Группируем по категориям
+    category_totals = {}
+    subscription_category_map = {sub.id: sub.category for sub in active_subscriptions}
+    
+    for record in price_history_records:
+        category = subscription_category_map.get(record.subscriptionId)
+        if category:
+            category_totals[category] = category_totals.get(category, 0) + record.amount
+    
+    # Вычисляем общую сумму
+    total_amount = sum(category_totals.values())
+    
+    # Формируем список категорий с процентами
+    categories_list = []
+    for category_value, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
+        percentage = (amount / total_amount * 100) if total_amount > 0 else 0
+        
+        categories_list.append(CategoryAnalytics(
+            category=get_category_name(category_value),
+            total=amount,
+            percentage=round(percentage, 2)
+        ))
+    
+    return total_amount, categories_list
+
 @router.get("/analytics", response_model=OverallAnalyticsResponse)
 def get_overall_analytics(
     period: PeriodType = Query(..., description="Тип периода: month, quarter, year"),
@@ -85,7 +117,7 @@ def get_overall_analytics(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date parameters: {str(e)}")
     
-    print(f"📊 Рассчет аналитики за период: {period_start} - {period_end}")
+    logger.debug("Расчет аналитики за период: %s - %s", period_start, period_end)
     
     # Получаем активные подписки пользователя
     active_subscriptions = db.query(Subscription).filter(
@@ -116,28 +148,7 @@ def get_overall_analytics(
         PriceHistory.startDate >= period_start
     ).all()
     
-    # Группируем по категориям
-    category_totals = {}
-    subscription_category_map = {sub.id: sub.category for sub in active_subscriptions}
-    
-    for record in price_history_records:
-        category = subscription_category_map.get(record.subscriptionId)
-        if category:
-            category_totals[category] = category_totals.get(category, 0) + record.amount
-    
-    # Вычисляем общую сумму
-    total_amount = sum(category_totals.values())
-    
-    # Формируем список категорий с процентами
-    categories_list = []
-    for category_value, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
-        percentage = (amount / total_amount * 100) if total_amount > 0 else 0
-        
-        categories_list.append(CategoryAnalytics(
-            category=get_category_name(category_value),
-            total=amount,
-            percentage=round(percentage, 2)
-        ))
+    total_amount, categories_list = summarize_by_category(active_subscriptions, price_history_records)
     
     # Создаем информацию о периоде
     period_info = PeriodInfo(
@@ -188,7 +199,7 @@ def get_category_analytics(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date parameters: {str(e)}")
     
-    print(f"📊 Рассчет аналитики для категории '{category}' за период: {period_start} - {period_end}")
+    logger.debug("Расчет аналитики для категории %s за период: %s - %s", category, period_start, period_end)
     
     # Получаем активные подписки пользователя в указанной категории
     category_subscriptions = db.query(Subscription).filter(
@@ -1,6 +1,8 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Security, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal
+from backend.database import SessionLocal, bind_user
 from backend.models.user import User
 from backend.utils.security import  hash_password, verify_password, create_access_token, create_refresh_token,decode_refresh_token, decode_token
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordRequestForm
@@ -8,6 +10,7 @@ from ..schemas.user import UserRegister, UserLogin
 from backend.models.notification import Notification
 from backend.database import get_db
 security = HTTPBearer()
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api",
@@ -23,11 +26,7 @@ ALGORITHM = "HS256"
 # ---------------------------------------
 @router.post("/register")
 def register(user: UserRegister, db: Session = Depends(get_db)):
-    print("=" * 50)
-    print("✅ UserRegister model successfully validated!")
-    print(f"   Email: {user.email}")
-    print(f"   Password: {'*' * len(user.password)} (length: {len(user.password)})")
-    print("=" * 50)
+    logger.debug("Регистрация", extra={"email": user.email})
     # Проверяем существование пользователя
     existing_user = db.query(User).filter(User.email == user.email).first()
     if existing_user:
@@ -62,6 +61,7 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        logger.info("Пользователь зарегистрирован", extra={"user_id": new_user.id})
 
         return {
             "message": "User registered successfully",
@@ -72,8 +72,7 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
     except Exception as e:
         db.rollback()
         # Логируем ошибку для администратора
-        import logging
-        logger = logging.getLogger(__name__)
+        logger.exception("Ошибка регистрации", extra={"email": user.email})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed, please try again"
@@ -85,61 +84,28 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
 # ---------------------------------------
 @router.post("/login")
 def login(data: UserLogin, db: Session = Depends(get_db)):
-    print("=" * 60)
-    print(f"🔍 LOGIN ATTEMPT for email: {data.email}")
-    print(f"   Password length: {len(data.password)}")
+    logger.debug("Попытка входа", extra={"email": data.email})
 
     # 1. ОЧИСТКА КЕША СЕССИИ
     db.expire_all()
-    print("   ✅ Session cache cleared")
 
-    # 2. ДИАГНОСТИКА: проверяем ВСЕХ пользователей
-    all_users = db.query(User).all()
-    print(f"   📊 Total users in current session: {len(all_users)}")
+    # 2. ДИАГНОСТИКА: лишний запрос по всей таблице только при уровне DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Пользователей в базе: %s", db.query(func.count(User.id)).scalar())
 
-    if all_users:
-        for u in all_users:
-            print(f"     - ID: {u.id}, Email: {u.email}")
-    else:
-        print("     ❌ No users found in session!")
-
-    # 3. RAW SQL запрос (обход кеша SQLAlchemy)
-    from sqlalchemy import text
-    try:
-        sql_result = db.execute(
-            text("SELECT id, email, password FROM users WHERE email = :email"),
-            {"email": data.email}
-        ).first()
-
-        if sql_result:
-            print(f"   🔍 User FOUND via raw SQL: ID={sql_result[0]}, Email={sql_result[1]}")
-            print(f"   🔍 Hashed password from SQL: {sql_result[2][:30]}...")
-        else:
-            print(f"   🔍 User NOT FOUND via raw SQL")
-    except Exception as e:
-        print(f"   ⚠️ Raw SQL error: {e}")
-
-    # 4. ORM запрос (может быть закешировано)
+    # 3. ORM запрос
     user = db.query(User).filter(User.email == data.email).first()
 
     if user:
-        print(f"   ✅ User found via ORM: ID={user.id}, Email={user.email}")
-        print(f"   🔑 Hashed password from ORM: {user.password[:30]}...")
-
-        # 5. ПРОВЕРКА ПАРОЛЯ
-        is_password_valid = verify_password(data.password, user.password)
-        print(f"   🔐 Password verification: {is_password_valid}")
-
-        if not is_password_valid:
-            print("   ❌ Password verification FAILED")
-            print("=" * 60)
+        # 4. ПРОВЕРКА ПАРОЛЯ
+        if not verify_password(data.password, user.password):
+            logger.info("Неверный пароль при входе", extra={"user_id": user.id})
             raise HTTPException(status_code=400, detail="Invalid email or password")
     else:
-        print(f"   ❌ User NOT FOUND via ORM")
-        print("=" * 60)
+        logger.info("Вход с неизвестным email", extra={"email": data.email})
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    # 6. СОЗДАНИЕ ТОКЕНОВ (ИСПРАВЛЕННАЯ ЧАСТЬ)
+    # 5. СОЗДАНИЕ ТОКЕНОВ (ИСПРАВЛЕННАЯ ЧАСТЬ)
     try:
         # Указываем время жизни для access токена (24 часа)
         access_token = create_access_token(
@@ -153,17 +119,12 @@ def login(data: UserLogin, db: Session = Depends(get_db)):
             expires_days=REFRESH_TOKEN_EXPIRE_DAYS  # ← ДЛЯ REFRESH ТОКЕНА
         )
 
-        print(f"   🎫 Access token created: {access_token[:30]}...")
-        print(f"   🎫 Token expires in: {ACCESS_TOKEN_EXPIRE_MINUTES} minutes")
-        print(f"   🎫 Refresh token expires in: {REFRESH_TOKEN_EXPIRE_DAYS} minutes")
-        print(f"   ✅ LOGIN SUCCESSFUL for user ID: {user.id}")
+        logger.info("Успешный вход", extra={"user_id": user.id})
 
     except Exception as e:
-        print(f"   ❌ Token creation error: {e}")
+        logger.exception("Ошибка создания токенов", extra={"user_id": user.id})
         raise HTTPException(status_code=500, detail="Token creation failed")
 
-    print("=" * 60)
-
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -195,6 +156,8 @@ def get_current_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Дальше в запросе сессия (общая с обработчиком) ходит в шард пользователя
+    bind_user(db, user.id)
     return user
 
 # ---------------------------------------
@@ -232,7 +195,7 @@ def get_me(user: User = Depends(get_current_user)):
 async def test_validation(request: Request):
     try:
         raw_data = await request.json()
-        print("📦 Raw data received:", raw_data)
+        logger.debug("Raw data received: %s", raw_data)
 
         user = UserRegister(**raw_data)
 
@@ -247,9 +210,7 @@ async def test_validation(request: Request):
         }
 
     except Exception as e:
-        print("❌ Validation error:", str(e))
-        import traceback
-        traceback.print_exc()
+        logger.info("Validation error: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
 
         return {
             "success": False,
@@ -0,0 +1,193 @@
+# backend/routes/batch.py
+"""
+Пакет записей одним запросом: POST /api/batch.
+
+Каждая операция — метод и путь существующего маршрута из routes/subs.py или
+routes/notifications.py с телом запроса; она вызывает тот же обработчик, что и
+отдельный HTTP-запрос, с теми же проверками и ответом. Токен проверяется и
+пользователь загружается один раз на весь пакет, все операции идут в одной сессии.
+
+atomic=false — операции независимы, каждая коммитится сама, ошибка одной не
+мешает остальным. atomic=true — пакет выполняется в одной внешней транзакции:
+коммиты обработчиков становятся точками сохранения, первая ошибка откатывает всё,
+оставшиеся операции не выполняются (статус 424). События SSE/WebSocket такого
+пакета публикуются только после общего коммита.
+"""
+import inspect
+import logging
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.fields import FieldInfo
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import engine_for_user, get_db
+from backend.models.user import User
+from backend.routes.auth import get_current_user
+from backend.routes.notifications import router as notifications_router
+from backend.routes.subs import router as subs_router
+from backend.schemas.batch import BatchItemResult, BatchRequest, BatchResponse
+from backend.services.notification_events import broker
+
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "50"))
+
+# Маршруты, доступные в пакете: только записи; чтения с ETag остаются отдельными запросами
+BATCH_ROUTES = {
+    ("POST", "/api/subscriptions"),
+    ("PATCH", "/api/subscriptions/{subscription_id}"),
+    ("PATCH", "/api/subscriptions/{subscription_id}/archive"),
+    ("PATCH", "/api/subscriptions/{subscription_id}/renew"),
+    ("POST", "/notifications/read"),
+    ("POST", "/notifications/read-all"),
+    ("POST", "/notifications/read-up-to"),
+    ("POST", "/notifications/subscription/{subscription_id}/read-all"),
+    ("PATCH", "/notifications/{notification_id}/read"),
+}
+
+router = APIRouter(prefix="/api", tags=["batch"])
+logger = logging.getLogger(__name__)
+
+# В порядке объявления, как их перебирает роутер приложения
+_routes = [
+    (method, route)
+    for route in subs_router.routes + notifications_router.routes
+    if isinstance(route, APIRoute)
+    for method in route.methods
+    if (method, route.path) in BATCH_ROUTES
+]
+
+
+class BatchOperationError(Exception):
+    def __init__(self, status_code: int, detail):
+        self.status_code = status_code
+        self.detail = detail
+
+
+def resolve(method: str, path: str):
+    """(маршрут, параметры пути) для операции пакета"""
+    path = path.split("?", 1)[0]
+    for route_method, route in _routes:
+        match = route.path_regex.match(path)
+        if match and route_method == method.upper():
+            return route, match.groupdict()
+    raise BatchOperationError(status.HTTP_404_NOT_FOUND, f"Операция {method} {path} недоступна в пакете")
+
+
+def build_arguments(route: APIRoute, path_params: dict, body, user: User, db: Session) -> dict:
+    """Аргументы обработчика: параметры пути, модель тела, пользователь и сессия пакета"""
+    arguments = {}
+    for name, parameter in inspect.signature(route.endpoint).parameters.items():
+        annotation = parameter.annotation
+        if name in path_params:
+            arguments[name] = TypeAdapter(annotation).validate_python(path_params[name])
+        elif name == "current_user":
+            arguments[name] = user
+        elif name == "db":
+            arguments[name] = db
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            arguments[name] = annotation.model_validate(body or {})
+        elif isinstance(parameter.default, FieldInfo):
+            arguments[name] = parameter.default.get_default(call_default_factory=True)
+        elif parameter.default is inspect.Parameter.empty:
+            raise BatchOperationError(status.HTTP_400_BAD_REQUEST, f"Параметр {name} недоступен в пакете")
+    return arguments
+
+
+async def run_operation(operation, user: User, db: Session) -> BatchItemResult:
+    try:
+        route, path_params = resolve(operation.method, operation.path)
+        try:
+            arguments = build_arguments(route, path_params, operation.body, user, db)
+        except ValidationError as e:
+            raise BatchOperationError(
+                status.HTTP_422_UNPROCESSABLE_ENTITY, jsonable_encoder(e.errors(include_url=False))
+            )
+
+        if inspect.iscoroutinefunction(route.endpoint):
+            result = await route.endpoint(**arguments)
+        else:
+            result = await run_in_threadpool(route.endpoint, **arguments)
+
+        if route.response_model is not None:
+            result = TypeAdapter(route.response_model).validate_python(result, from_attributes=True)
+        return BatchItemResult(id=operation.id, status=route.status_code or status.HTTP_200_OK,
+                               body=jsonable_encoder(result))
+    except BatchOperationError as e:
+        return BatchItemResult(id=operation.id, status=e.status_code, body={"detail": e.detail})
+    except HTTPException as e:
+        return BatchItemResult(id=operation.id, status=e.status_code, body={"detail": e.detail})
+    except Exception:
+        logger.exception("Ошибка операции пакета", extra={"user_id": user.id})
+        if not isinstance(db.bind, Connection):
+            # Без atomic сессия общая: после упавшего flush без отката обработчика
+            # остальные операции получили бы PendingRollbackError
+            await run_in_threadpool(db.rollback)
+        return BatchItemResult(id=operation.id, status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                               body={"detail": "Internal error"})
+
+
+async def run_atomic(operations, user: User) -> tuple:
+    """
+    Одна внешняя транзакция на соединении; сессия обработчиков создает в ней точку
+    сохранения на каждый свой коммит (join_transaction_mode="create_savepoint")
+    """
+    results = []
+    connection = await run_in_threadpool(engine_for_user(user.id).connect)
+    try:
+        transaction = connection.begin()
+        if connection.dialect.name == "sqlite":
+            # pysqlite сам не открывает транзакцию до первой записи, и RELEASE первой
+            # точки сохранения закоммитил бы ее; блокировка записи берется сразу
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        db = Session(bind=connection, join_transaction_mode="create_savepoint",
+                     autocommit=False, autoflush=False)
+
+        with broker.hold() as events:
+            for operation in operations:
+                if results and results[-1].status >= 400:
+                    results.append(BatchItemResult(id=operation.id, status=status.HTTP_424_FAILED_DEPENDENCY,
+                                                   body={"detail": "Пакет отменен предыдущей ошибкой"}))
+                    continue
+                results.append(await run_operation(operation, user, db))
+
+        committed = all(result.status < 400 for result in results)
+        db.close()
+        if committed:
+            await run_in_threadpool(transaction.commit)
+            for event in events:
+                broker.publish(*event)
+        else:
+            await run_in_threadpool(transaction.rollback)
+    finally:
+        await run_in_threadpool(connection.close)
+    return committed, results
+
+
+@router.post("/batch", response_model=BatchResponse, summary="Несколько записей одним запросом")
+async def run_batch(
+    request: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if len(request.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {BATCH_MAX_OPERATIONS} операций в пакете"
+        )
+
+    # Пользователь загружен один раз: отвязываем его от сессии, чтобы коммиты
+    # обработчиков не сбрасывали его атрибуты и не вызывали повторный SELECT
+    db.expunge(current_user)
+
+    if request.atomic:
+        committed, results = await run_atomic(request.operations, current_user)
+    else:
+        results = [await run_operation(operation, current_user, db) for operation in request.operations]
+        committed = True
+
+    return BatchResponse(atomic=request.atomic, committed=committed, results=results)
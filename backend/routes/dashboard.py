@@ -0,0 +1,123 @@
+# backend/routes/dashboard.py
+"""
+Главный экран одним запросом: вместо /api/subscriptions, /notifications/grouped,
+/api/analytics и unread-count по каждой подписке.
+
+Пользователь проверяется один раз, подписки загружаются один раз. Независимые
+чтения (подписки, суммы за месяц, бейджи) выполняются параллельно в пуле потоков,
+каждое в своей сессии: SQLite допускает одновременное чтение из разных соединений.
+DASHBOARD_CONCURRENT=0 выполняет их последовательно в одном потоке.
+"""
+import asyncio
+import os
+from datetime import date, timedelta
+from functools import partial
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import get_db, user_session
+from backend.models.user import User
+from backend.models.subscription import Subscription, PriceHistory
+from backend.routes.auth import get_current_user
+from backend.routes.analytics import calculate_period_dates, summarize_by_category
+from backend.schemas.analytics import OverallAnalyticsResponse, PeriodInfo, PeriodType
+from backend.schemas.dashboard import DashboardResponse, UpcomingPayment
+from backend.schemas.sub import SubscriptionResponse
+from backend.services.data_versions import get_versions
+from backend.services.unread_counters import get_unread_counts
+from backend.utils.etag import weak_etag, etag_matches, set_etag, not_modified
+
+DASHBOARD_CONCURRENT = os.getenv("DASHBOARD_CONCURRENT", "1") == "1"
+UPCOMING_DAYS = int(os.getenv("DASHBOARD_UPCOMING_DAYS", "7"))
+
+router = APIRouter(prefix="/api", tags=["dashboard"])
+
+
+def load_active_subscriptions(user_id: int) -> list:
+    with user_session(user_id) as db:
+        subscriptions = db.query(Subscription).filter(
+            Subscription.userId == user_id,
+            Subscription.archivedDate.is_(None)
+        ).order_by(Subscription.nextPaymentDate.asc()).all()
+        return [SubscriptionResponse.model_validate(sub, from_attributes=True) for sub in subscriptions]
+
+
+def load_period_prices(user_id: int, period_start: date) -> list:
+    """Записи истории цен активных подписок за период — без списка id, параллельно с подписками"""
+    with user_session(user_id) as db:
+        return db.query(
+            PriceHistory.subscriptionId, PriceHistory.amount
+        ).join(
+            Subscription, Subscription.id == PriceHistory.subscriptionId
+        ).filter(
+            Subscription.userId == user_id,
+            Subscription.archivedDate.is_(None),
+            PriceHistory.startDate >= period_start
+        ).all()
+
+
+def load_unread_counts(user_id: int) -> dict:
+    """Бейджи активных подписок: архивные на главном экране не показываются"""
+    with user_session(user_id) as db:
+        return get_unread_counts(db, user_id, active_only=True)
+
+
+@router.get("/dashboard", response_model=DashboardResponse, summary="Данные главного экрана одним запросом")
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user_id = current_user.id
+    today = date.today()
+
+    # Сроки платежей зависят от даты, поэтому она входит в ETag вместе с версиями данных
+    versions = await run_in_threadpool(get_versions, db, user_id)
+    etag = weak_etag(user_id, versions.subscriptions, versions.notifications, "dashboard", today.isoformat())
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    period_start, _ = calculate_period_dates(PeriodType.month, today.year, today.month)
+    loaders = (
+        partial(load_active_subscriptions, user_id),
+        partial(load_period_prices, user_id, period_start),
+        partial(load_unread_counts, user_id),
+    )
+    if DASHBOARD_CONCURRENT:
+        subscriptions, prices, unread_counts = await asyncio.gather(
+            *(run_in_threadpool(loader) for loader in loaders)
+        )
+    else:
+        subscriptions, prices, unread_counts = await run_in_threadpool(lambda: [loader() for loader in loaders])
+
+    total, categories = summarize_by_category(subscriptions, prices)
+
+    horizon = today + timedelta(days=UPCOMING_DAYS)
+    upcoming = [
+        UpcomingPayment(
+            subscription_id=sub.id,
+            name=sub.name,
+            amount=sub.currentAmount,
+            category=sub.category,
+            nextPaymentDate=sub.nextPaymentDate,
+            days_left=(sub.nextPaymentDate - today).days
+        )
+        for sub in subscriptions
+        if sub.nextPaymentDate and today <= sub.nextPaymentDate <= horizon
+    ]
+
+    return DashboardResponse(
+        subscriptions=subscriptions,
+        unread_counts=unread_counts,
+        total_unread=sum(unread_counts.values()),
+        analytics=OverallAnalyticsResponse(
+            total=total,
+            period=PeriodInfo(type=PeriodType.month, month=today.month, year=today.year),
+            categories=categories
+        ),
+        upcoming_payments=upcoming
+    )
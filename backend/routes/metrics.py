@@ -0,0 +1,26 @@
+# backend/routes/metrics.py
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from backend.utils.metrics import METRICS_DIR, METRICS_TOKEN, registry, render_snapshots
+
+router = APIRouter(tags=["metrics"])
+
+
+def require_metrics_token(authorization: str = Header(None)):
+    """С METRICS_TOKEN — только Authorization: Bearer <токен>; без него /metrics открыт"""
+    if not METRICS_TOKEN:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Metrics token required")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """Метрики в текстовом формате Prometheus; под backend.serve — сумма по всем воркерам"""
+    body = render_snapshots() if METRICS_DIR else registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,21 +1,106 @@
 # backend/routes/notification.py
+import base64
+import json
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, or_, desc, func, case, type_coerce, String
 
-from backend.database import get_db
+from backend.database import get_db, SessionLocal
+from backend.models.user import User
 from backend.routes.auth import get_current_user
-from backend.schemas.notification import NotificationResponse
-from backend.models.notification import Notification
+from backend.utils.security import decode_token
+from backend.schemas.notification import (
+    NotificationResponse,
+    NotificationHistoryPage,
+    NotificationIdsReadRequest,
+    NotificationReadUpToRequest,
+    ReadAllResponse
+)
+from backend.models.notification import Notification, NotificationHistorySummary
 from backend.models.subscription import Subscription
+from backend.services.unread_counters import get_unread_count, get_unread_counts
+from backend.services.notifications_service import NotificationService
+from backend.services.notification_events import broker
+from backend.services.data_versions import get_versions
+from backend.services.write_queue import serialized_write
+from backend.utils.etag import weak_etag, etag_matches, set_etag, not_modified
+from backend.utils.fields import fields_key, parse_fields
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+# Интервал keep-alive для долгоживущих соединений, секунды
+STREAM_HEARTBEAT_SECONDS = 25
+
+stream_security = HTTPBearer(auto_error=False)
+
+# Поля уведомления в группах /grouped, доступные для ?fields=
+GROUPED_NOTIFICATION_FIELDS = ("id", "type", "title", "message", "read", "created_at")
+
+
+def get_notification_group_stats(db: Session, user_id: int):
+    """
+    Агрегаты по группам одним запросом: количество непрочитанных
+    и дата последнего уведомления для каждой подписки пользователя
+    """
+    last_date = func.max(Notification.created_at).label("last_notification_date")
+
+    return db.query(
+        Subscription.id,
+        Subscription.name,
+        Subscription.currentAmount,
+        Subscription.category,
+        func.sum(case((Notification.read == False, 1), else_=0)).label("unread_count"),
+        last_date
+    ).join(
+        Subscription, Subscription.id == Notification.subscription_id
+    ).filter(
+        Notification.user_id == user_id,
+        Subscription.userId == user_id
+    ).group_by(
+        Subscription.id
+    ).order_by(desc(last_date)).all()
+
+
+def get_latest_notifications_per_group(db: Session, user_id: int, limit: int, fields=GROUPED_NOTIFICATION_FIELDS):
+    """
+    Последние limit уведомлений в каждой группе (оконная функция row_number).
+    fields — какие колонки читать из строк уведомлений (subscription_id читается всегда)
+    """
+    row_number = func.row_number().over(
+        partition_by=Notification.subscription_id,
+        order_by=(desc(Notification.created_at), desc(Notification.id))
+    ).label("rn")
+
+    # Ранжируем только по индексу, полные строки читаем лишь для первых limit
+    ranked = db.query(
+        Notification.id.label("notification_id"),
+        row_number
+    ).filter(
+        Notification.user_id == user_id
+    ).subquery()
+
+    return db.query(
+        Notification.subscription_id,
+        *(getattr(Notification, name) for name in fields)
+    ).join(
+        ranked, ranked.c.notification_id == Notification.id
+    ).filter(
+        ranked.c.rn <= limit
+    ).order_by(
+        Notification.subscription_id, ranked.c.rn
+    ).all()
+
 
 @router.get("/grouped")
 async def get_notifications_grouped_by_subscription(
+        request: Request,
+        response: Response,
+        limit: int = Query(20, ge=1, le=100, description="Сколько последних уведомлений вернуть в каждой группе"),
+        fields: Optional[str] = Query(None, description="Поля уведомлений в группах через запятую, например id,title,read"),
         current_user=Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
@@ -23,96 +108,83 @@ async def get_notifications_grouped_by_subscription(
     Главный endpoint: получить уведомления, сгруппированные как чаты
     Используется для главного экрана со списком подписок
     """
-    # Получаем все уведомления пользователя
-    notifications = db.query(Notification).filter(
-        Notification.user_id == str(current_user.id)
-    ).order_by(desc(Notification.created_at)).all()
-
-    # Получаем все подписки пользователя
-    subscriptions = db.query(Subscription).filter(
-        Subscription.userId == str(current_user.id)
-    ).all()
-
-    # Создаем словарь для быстрого доступа к подпискам
-    sub_dict = {sub.id: sub for sub in subscriptions}
-
-    # Группируем уведомления по subscription_id
-    grouped = {}
-    for notification in notifications:
-        sub_id = notification.subscription_id
-
-        # Если подписка не найдена (архивированная), пропускаем
-        if sub_id not in sub_dict:
-            continue
-
-        subscription = sub_dict[sub_id]
-
-        # Создаем группу если ее еще нет
-        if sub_id not in grouped:
-            grouped[sub_id] = {
-                "subscription_id": sub_id,
-                "subscription_name": subscription.name,
-                "subscription_amount": float(subscription.currentAmount),
-                "subscription_category": subscription.category,
-                "notifications": [],
-                "unread_count": 0,
-                "last_notification_date": None
-            }
-
-        # Добавляем уведомление в группу
-        notification_data = {
-            "id": notification.id,
-            "type": notification.type,
-            "title": notification.title,
-            "message": notification.message,
-            "read": notification.read,
-            "created_at": notification.created_at.isoformat() if notification.created_at else None
+    fields = parse_fields(fields, GROUPED_NOTIFICATION_FIELDS) or GROUPED_NOTIFICATION_FIELDS
+
+    # В группах есть имя и цена подписки, поэтому ETag зависит от обеих версий
+    versions = get_versions(db, current_user.id)
+    etag = weak_etag(current_user.id, versions.subscriptions, versions.notifications, limit,
+                     fields_key(None if fields == GROUPED_NOTIFICATION_FIELDS else fields))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # Счетчики и даты считаются в БД, а не по всем загруженным уведомлениям
+    groups = get_notification_group_stats(db, current_user.id)
+
+    if not groups:
+        return []
+
+    latest = {}
+    for row in get_latest_notifications_per_group(db, current_user.id, limit, fields):
+        item = dict(zip(fields, row[1:]))
+        item["id"] = str(row.id)
+        if "created_at" in item:
+            item["created_at"] = row.created_at.isoformat() if row.created_at else None
+        latest.setdefault(row.subscription_id, []).append(item)
+
+    # Группы уже отсортированы по дате последнего уведомления (новые сверху)
+    return [
+        {
+            "subscription_id": group.id,
+            "subscription_name": group.name,
+            "subscription_amount": float(group.currentAmount),
+            "subscription_category": group.category,
+            "notifications": latest.get(group.id, []),
+            "unread_count": group.unread_count or 0,
+            "last_notification_date": group.last_notification_date.isoformat()
+            if group.last_notification_date else None
         }
+        for group in groups
+    ]
 
-        grouped[sub_id]["notifications"].append(notification_data)
-
-        # Считаем непрочитанные
-        if not notification.read:
-            grouped[sub_id]["unread_count"] += 1
-
-        # Обновляем дату последнего уведомления
-        if (not grouped[sub_id]["last_notification_date"] or
-                notification.created_at > grouped[sub_id]["last_notification_date"]):
-            grouped[sub_id]["last_notification_date"] = notification.created_at
-
-    # Преобразуем словарь в список
-    result = []
-    for sub_id, data in grouped.items():
-        # Сортируем уведомления внутри группы (новые сверху)
-        data["notifications"].sort(key=lambda x: x["created_at"], reverse=True)
-
-        # Преобразуем datetime в строку
-        if data["last_notification_date"]:
-            data["last_notification_date"] = data["last_notification_date"].isoformat()
 
-        result.append(data)
+def encode_cursor(created_at_raw: str, notification_id: int) -> str:
+    """Непрозрачный курсор из ключа сортировки (created_at, id)"""
+    # SQLite отдает хранимую строку, PostgreSQL — datetime; str() сохраняет микросекунды
+    payload = json.dumps([str(created_at_raw), notification_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
 
-    # Сортируем группы по дате последнего уведомления (новые сверху)
-    result.sort(key=lambda x: x["last_notification_date"] or "", reverse=True)
 
-    return result
+def decode_cursor(cursor: str):
+    """Разбирает курсор обратно в (created_at, id); 400 при неверном формате"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_raw, notification_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at_raw), int(notification_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
 
 
 @router.get("/subscription/{subscription_id}")
 async def get_subscription_notifications(
         subscription_id: int,
+        before: Optional[str] = Query(None, description="Курсор next_cursor предыдущей страницы"),
+        limit: int = Query(50, ge=1, le=200, description="Размер страницы"),
         current_user=Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     """
-    Получить все уведомления конкретной подписки
+    Получить уведомления конкретной подписки постранично (новые сверху)
     Используется при открытии "чата" с подпиской
     """
     # Проверяем, существует ли подписка у пользователя
     subscription = db.query(Subscription).filter(
         and_(
             Subscription.id == subscription_id,
-            Subscription.userId == str(current_user.id)
+            Subscription.userId == current_user.id
         )
     ).first()
 
@@ -122,31 +194,77 @@ async def get_subscription_notifications(
             detail="Подписка не найдена"
         )
 
-    # Получаем все уведомления для этой подписки
-    notifications = db.query(Notification).filter(
-        and_(
-            Notification.user_id == str(current_user.id),
-            Notification.subscription_id == subscription_id
-        )
-    ).order_by(desc(Notification.created_at)).all()
-
-    # Используем существующую схему
-    notification_responses = [NotificationResponse.from_orm(n) for n in notifications]
+    scope = and_(
+        Notification.user_id == current_user.id,
+        Notification.subscription_id == subscription_id
+    )
+
+    # Счетчики отдельным запросом: покрываются индексом, строки не читаются
+    total_count, unread_count = db.query(
+        func.count(),
+        func.sum(case((Notification.read == False, 1), else_=0))
+    ).filter(scope).one()
+
+    # Сравниваем created_at в том виде, в котором он хранится в БД,
+    # иначе форматы с микросекундами и без них дают дубли на границе страниц
+    created_at_raw = type_coerce(Notification.created_at, String)
+
+    query = db.query(
+        Notification.id,
+        Notification.user_id,
+        Notification.subscription_id,
+        Notification.type,
+        Notification.title,
+        Notification.message,
+        Notification.scheduled_date,
+        Notification.read,
+        Notification.created_at,
+        created_at_raw.label("created_at_raw")
+    ).filter(scope)
+
+    if before:
+        cursor_created_at, cursor_id = decode_cursor(before)
+        query = query.filter(or_(
+            created_at_raw < cursor_created_at,
+            and_(created_at_raw == cursor_created_at, Notification.id < cursor_id)
+        ))
+
+    rows = query.order_by(
+        desc(Notification.created_at), desc(Notification.id)
+    ).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # На последней странице сообщаем, сколько старых уведомлений убрано в архив
+    history_summary = None
+    if not has_more:
+        summary = db.get(NotificationHistorySummary, (current_user.id, subscription_id))
+        if summary and summary.collapsed_count:
+            history_summary = {
+                "collapsed_count": summary.collapsed_count,
+                "first_created_at": summary.first_created_at,
+                "last_created_at": summary.last_created_at
+            }
 
-    return {
-        "subscription": {
+    return NotificationHistoryPage.model_construct(
+        subscription={
             "id": subscription.id,
             "name": subscription.name,
             "amount": float(subscription.currentAmount),
             "category": subscription.category
         },
-        "notifications": notification_responses,
-        "total_count": len(notifications),
-        "unread_count": len([n for n in notifications if not n.read])
-    }
+        notifications=[NotificationResponse.from_row(row) for row in rows],
+        total_count=total_count,
+        unread_count=unread_count or 0,
+        next_cursor=encode_cursor(rows[-1].created_at_raw, rows[-1].id) if has_more else None,
+        has_more=has_more,
+        history_summary=history_summary
+    )
 
 
 @router.post("/subscription/{subscription_id}/read-all")
+@serialized_write
 async def mark_subscription_notifications_read(
         subscription_id: int,
         current_user=Depends(get_current_user),
@@ -160,7 +278,7 @@ async def mark_subscription_notifications_read(
     subscription = db.query(Subscription).filter(
         and_(
             Subscription.id == subscription_id,
-            Subscription.userId == str(current_user.id)
+            Subscription.userId == current_user.id
         )
     ).first()
 
@@ -171,15 +289,10 @@ async def mark_subscription_notifications_read(
         )
 
     # Помечаем все уведомления этой подписки как прочитанные
-    result = db.query(Notification).filter(
-        and_(
-            Notification.user_id == str(current_user.id),
-            Notification.subscription_id == subscription_id,
-            Notification.read == False
-        )
-    ).update({"read": True})
-
-    db.commit()
+    changed = NotificationService.mark_read(
+        db, current_user.id, Notification.subscription_id == subscription_id
+    )
+    result = changed.get(subscription_id, 0)
 
     return {
         "message": f"Все уведомления по подписке '{subscription.name}' помечены как прочитанные",
@@ -189,6 +302,94 @@ async def mark_subscription_notifications_read(
     }
 
 
+@router.post("/read-all", response_model=ReadAllResponse)
+@serialized_write
+async def mark_all_notifications_read(
+        current_user=Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Пометить все уведомления пользователя как прочитанные
+    Один UPDATE вместо запроса на каждую подписку
+    """
+    changed = NotificationService.mark_read(db, current_user.id)
+
+    return ReadAllResponse(
+        message="Все уведомления помечены как прочитанные",
+        count=sum(changed.values())
+    )
+
+
+@router.post("/read", response_model=ReadAllResponse)
+@serialized_write
+async def mark_notifications_read(
+        request: NotificationIdsReadRequest,
+        current_user=Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Пометить прочитанными уведомления из списка id
+    Чужие и уже прочитанные id пропускаются
+    """
+    changed = NotificationService.mark_read(db, current_user.id, Notification.id.in_(request.ids))
+
+    return ReadAllResponse(
+        message="Уведомления помечены как прочитанные",
+        count=sum(changed.values())
+    )
+
+
+@router.post("/read-up-to", response_model=ReadAllResponse)
+@serialized_write
+async def mark_notifications_read_up_to(
+        request: NotificationReadUpToRequest,
+        current_user=Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Пометить прочитанными все уведомления не новее указанного момента
+    (для всех подписок или для одной) — "прочитано до" как в мессенджерах
+    """
+    criteria = [Notification.created_at <= request.up_to]
+    if request.subscription_id is not None:
+        criteria.append(Notification.subscription_id == request.subscription_id)
+
+    changed = NotificationService.mark_read(db, current_user.id, *criteria)
+
+    return ReadAllResponse(
+        message="Уведомления помечены как прочитанные",
+        count=sum(changed.values())
+    )
+
+
+@router.patch("/{notification_id}/read", response_model=NotificationResponse)
+@serialized_write
+async def mark_notification_read(
+        notification_id: int,
+        current_user=Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Пометить одно уведомление как прочитанное
+    """
+    NotificationService.mark_read(db, current_user.id, Notification.id == notification_id)
+
+    notification = db.query(Notification).filter(
+        and_(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id
+        )
+    ).first()
+
+    if not notification:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Уведомление не найдено"
+        )
+
+    return notification
+
+
 @router.get("/subscription/{subscription_id}/unread-count")
 async def get_subscription_unread_count(
         subscription_id: int,
@@ -203,7 +404,7 @@ async def get_subscription_unread_count(
     subscription = db.query(Subscription).filter(
         and_(
             Subscription.id == subscription_id,
-            Subscription.userId == str(current_user.id)
+            Subscription.userId == current_user.id
         )
     ).first()
 
@@ -213,16 +414,109 @@ async def get_subscription_unread_count(
             detail="Подписка не найдена"
         )
 
-    count = db.query(Notification).filter(
-        and_(
-            Notification.user_id == str(current_user.id),
-            Notification.subscription_id == subscription_id,
-            Notification.read == False
-        )
-    ).count()
+    count = get_unread_count(db, current_user.id, subscription_id)
 
     return {
         "subscription_id": subscription_id,
         "subscription_name": subscription.name,
         "unread_count": count
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/unread-counts")
+async def get_unread_counts_for_user(
+        current_user=Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Получить бейджи непрочитанных по всем подпискам одним запросом
+    Заменяет опрос /subscription/{id}/unread-count для каждой подписки
+    """
+    counts = get_unread_counts(db, current_user.id)
+
+    return {
+        "total_unread": sum(counts.values()),
+        "subscriptions": [
+            {"subscription_id": subscription_id, "unread_count": count}
+            for subscription_id, count in counts.items()
+        ]
+    }
+
+
+def authenticate_stream(token: Optional[str]) -> int:
+    """
+    Проверка токена для долгоживущего соединения.
+    Сессия БД закрывается сразу: соединение не должно держать подключение из пула
+    """
+    payload = decode_token(token) if token else None
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+
+    db = SessionLocal()
+    try:
+        user_exists = db.query(User.id).filter(User.id == payload["user_id"]).first()
+    finally:
+        db.close()
+
+    if not user_exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return payload["user_id"]
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def stream_notifications(
+        token: Optional[str] = Query(None, description="Токен для EventSource, который не умеет передавать заголовки"),
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(stream_security)
+):
+    """
+    Server-Sent Events: новые уведомления и изменения счетчиков непрочитанных
+    Заменяет периодический опрос /grouped и /unread-count
+    """
+    user_id = authenticate_stream(credentials.credentials if credentials else token)
+
+    async def event_stream():
+        subscriber = broker.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscriber.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                # Отправка блокируется, пока клиент не прочитает предыдущие данные,
+                # поэтому медленный клиент упирается в ограниченную очередь подписчика
+                yield format_sse(event) if event else ": ping\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """WebSocket-вариант потока /stream для клиентов, где SSE недоступен"""
+    try:
+        user_id = authenticate_stream(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscriber = broker.subscribe(user_id)
+    try:
+        while True:
+            event = await subscriber.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            await websocket.send_json(event or {"event": "ping", "data": {}})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broker.unsubscribe(subscriber)
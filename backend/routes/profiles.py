@@ -0,0 +1,27 @@
+# backend/routes/profiles.py
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from backend.utils.profiling import is_admin_token, list_profiles, profile_path
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+def get_profiles():
+    """Сохраненные профили запросов, от новых к старым"""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/{name}", dependencies=[Depends(require_admin)])
+def download_profile(name: str):
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if name.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
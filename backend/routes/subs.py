@@ -1,11 +1,12 @@
+import logging
 from datetime import datetime, date
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import and_, select
 from typing import List, Optional
 from dateutil.relativedelta import relativedelta  # Добавляем импорт
 
-from backend.database import get_db
+from backend.database import get_db, shard_engines, shard_session
 from backend.models.user import User
 from backend.models.subscription import Subscription, PriceHistory, Sub_category, Sub_period
 from backend.schemas.sub import (
@@ -19,8 +20,14 @@ from backend.schemas.sub import (
 )
 from backend.routes.auth import get_current_user
 from backend.services.notifications_service import NotificationService
+from backend.services.data_versions import SUBSCRIPTIONS, bump_versions, get_versions
+from backend.services.sync import ARCHIVED, SUBSCRIPTION, add_tombstones, stamp, stamp_session, stamp_subscription
+from backend.services.write_queue import serialized_write
+from backend.utils.etag import weak_etag, etag_matches, set_etag, not_modified
+from backend.utils.fields import dump_sparse_rows, fields_key, parse_fields
 
 router = APIRouter(prefix="/api", tags=["subscriptions"])
+logger = logging.getLogger(__name__)
 
 def update_price_history(db: Session, subscription_id: int, new_amount: int):
     """
@@ -28,7 +35,7 @@ def update_price_history(db: Session, subscription_id: int, new_amount: int):
     Закрывает текущую активную запись и создает новую.
     Гарантирует отсутствие пересекающихся периодов.
     """
-    print(f"🔄 Обновление истории цен для подписки ID: {subscription_id}, новая сумма: {new_amount}")
+    logger.debug("Обновление истории цен: subscription=%s amount=%s", subscription_id, new_amount)
     
     # Находим текущую активную запись в истории цен (без endDate)
     current_price = db.query(PriceHistory).filter(
@@ -43,12 +50,13 @@ def update_price_history(db: Session, subscription_id: int, new_amount: int):
     if current_price:
         # Проверяем, не является ли дата начала сегодняшним днем
         if current_price.startDate == today and current_price.amount == new_amount:
-            print(f"⚠️  Активная запись уже существует с сегодняшней датой и той же суммой, пропускаем создание")
+            logger.debug("Активная запись истории цен с той же суммой уже есть: subscription=%s", subscription_id)
             return current_price
         
         # Закрываем текущую запись
         current_price.endDate = today
-        print(f"📅 Закрыта запись истории цен ID {current_price.id} (сумма: {current_price.amount}) с {current_price.startDate} по {today}")
+        logger.debug("Закрыта запись истории цен %s (%s) с %s по %s",
+                     current_price.id, current_price.amount, current_price.startDate, today)
     
     # Создаем новую запись
     new_price = PriceHistory(
@@ -59,7 +67,7 @@ def update_price_history(db: Session, subscription_id: int, new_amount: int):
     )
     db.add(new_price)
     
-    print(f"💰 Создана новая запись истории цен для подписки {subscription_id} с суммой {new_amount} с {today}")
+    logger.debug("Новая запись истории цен: subscription=%s amount=%s start=%s", subscription_id, new_amount, today)
     
     return new_price
 
@@ -68,7 +76,7 @@ def update_subscription_price_history(db: Session, subscription: Subscription, n
     Обновляет последнюю запись в истории цен при изменении стоимости подписки.
     Не создает новую запись, а обновляет существующую.
     """
-    print(f"💰 Обновление цены подписки '{subscription.name}' (ID: {subscription.id}): {subscription.currentAmount} → {new_amount}")
+    logger.debug("Обновление цены: subscription=%s %s -> %s", subscription.id, subscription.currentAmount, new_amount)
     
     # Ищем последнюю запись в истории цен для этой подписки
     last_price_record = db.query(PriceHistory).filter(
@@ -82,19 +90,21 @@ def update_subscription_price_history(db: Session, subscription: Subscription, n
         if last_price_record.endDate is None:
             # Если дата начала сегодняшняя или в прошлом - просто обновляем сумму
             if last_price_record.startDate <= today:
-                print(f"🔄 Обновляем существующую запись ID {last_price_record.id}: {last_price_record.amount} → {new_amount}")
+                logger.debug("Обновление записи истории цен %s: %s -> %s",
+                             last_price_record.id, last_price_record.amount, new_amount)
                 last_price_record.amount = new_amount
                 last_price_record.createdAt = datetime.utcnow()
                 return last_price_record
             else:
                 # Если дата начала в будущем (что странно), удаляем ее и создаем новую с сегодняшней датой
-                print(f"⚠️  Запись с датой в будущем {last_price_record.startDate}, удаляем")
+                logger.warning("Запись истории цен %s с датой в будущем %s удалена",
+                               last_price_record.id, last_price_record.startDate)
                 db.delete(last_price_record)
         else:
             # Если последняя запись закрыта, проверяем дату окончания
             if last_price_record.endDate >= today:
                 # Если период еще активен, обновляем сумму
-                print(f"🔄 Обновляем закрытую запись ID {last_price_record.id} в активном периоде")
+                logger.debug("Обновление закрытой записи истории цен %s в активном периоде", last_price_record.id)
                 last_price_record.amount = new_amount
                 last_price_record.createdAt = datetime.utcnow()
                 return last_price_record
@@ -107,9 +117,26 @@ def update_subscription_price_history(db: Session, subscription: Subscription, n
         createdAt=datetime.utcnow()
     )
     db.add(new_record)
-    print(f"📝 Создана новая запись истории цен: сумма {new_amount} с {today}")
+    logger.debug("Новая запись истории цен: subscription=%s amount=%s start=%s", subscription.id, new_amount, today)
     return new_record
 
+def subscription_name_exists(db: Session, name: str) -> bool:
+    """
+    Имя подписки уникально во всей базе (unique на колонке). С шардами ограничение
+    базы действует только внутри шарда, поэтому остальные шарды проверяем запросом.
+    Две одновременные записи в разных шардах эта проверка не разведет
+    """
+    if db.query(Subscription.id).filter(Subscription.name == name).first():
+        return True
+    own = db.info.get("shard")
+    for index in range(len(shard_engines)):
+        if index == own:
+            continue
+        with shard_session(index) as other:
+            if other.query(Subscription.id).filter(Subscription.name == name).first():
+                return True
+    return False
+
 def calculate_initial_payment_date(connected_date: date, billing_cycle: str) -> date:
     """Рассчитывает начальную дату следующего платежа"""
     if billing_cycle == Sub_period.monthly:
@@ -126,26 +153,18 @@ def calculate_initial_payment_date(connected_date: date, billing_cycle: str) ->
              status_code=status.HTTP_201_CREATED,
              summary="Создать подписку",
              description="При создании подписки автоматически добавляется первая запись в историю цен и создается уведомление")
+@serialized_write
 def create_subscription(
         subscription_data: CreateSubscriptionRequest,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    print("=" * 50)
-    print("✅ CreateSubscriptionRequest model successfully validated!")
-    print(f"   User ID: {current_user.id}")
-    print(f"   Subscription name: {subscription_data.name}")
-    print(f"   Category: {subscription_data.category}")
-    print(f"   Amount: {subscription_data.currentAmount}")
-    print(f"   Billing cycle: {subscription_data.billingCycle}")
-    print("=" * 50)
-
-    # Проверяем уникальность имени подписки
-    existing_subscription = db.query(Subscription).filter(
-        Subscription.name == subscription_data.name
-    ).first()
+    # После коммитов объект пользователя истекает: id берем заранее, без повторного SELECT
+    user_id = current_user.id
+    logger.debug("Создание подписки: %s", subscription_data, extra={"user_id": user_id})
 
-    if existing_subscription:
+    # Проверяем уникальность имени подписки (во всех шардах)
+    if subscription_name_exists(db, subscription_data.name):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Subscription with this name already exists"
@@ -186,11 +205,11 @@ def create_subscription(
     
     if not next_payment_date:
         next_payment_date = calculate_initial_payment_date(connected_date, billing_cycle_str)
-        print(f"📅 Рассчитана дата следующего платежа: {next_payment_date}")
+        logger.debug("Рассчитана дата следующего платежа: %s", next_payment_date)
 
     # Создаем новую подписку
     new_subscription = Subscription(
-        userId=current_user.id,
+        userId=user_id,
         name=subscription_data.name,
         currentAmount=subscription_data.currentAmount,
         nextPaymentDate=next_payment_date,
@@ -209,31 +228,33 @@ def create_subscription(
         db.add(new_subscription)
         db.commit()
         db.refresh(new_subscription)
+        subscription_id = new_subscription.id
 
-        print(f"✅ Подписка создана с ID: {new_subscription.id}")
+        logger.info("Подписка создана", extra={"user_id": user_id, "subscription_id": subscription_id})
 
         # 1. Создаем первую запись в истории цен
         price_history_item = None
         if new_subscription.currentAmount > 0:
-            price_history_item = update_price_history(db, new_subscription.id, new_subscription.currentAmount)
+            price_history_item = update_price_history(db, subscription_id, new_subscription.currentAmount)
 
         # 2. ✅ СОЗДАЕМ УВЕДОМЛЕНИЕ О ПОДКЛЮЧЕНИИ
-        print(f"📨 Создаю уведомление для подписки {new_subscription.id}...")
         NotificationService.for_subscription_created(
             db=db,
-            user_id=str(current_user.id),
-            subscription_id=new_subscription.id,
+            user_id=user_id,
+            subscription_id=subscription_id,
             subscription_name=new_subscription.name,
             amount=new_subscription.currentAmount,
             next_payment_date=new_subscription.nextPaymentDate
         )
-        print("✅ Уведомление создано!")
 
+        # Версия растет последней записью: ETag, выданный между коммитами, устареет,
+        # а подписка и первая цена попадут в /api/sync с номером этой записи
+        stamp_subscription(db, bump_versions(db, user_id, SUBSCRIPTIONS), subscription_id)
         db.commit()
 
         # Получаем актуальную историю цен
         price_history = db.query(PriceHistory).filter(
-            PriceHistory.subscriptionId == new_subscription.id
+            PriceHistory.subscriptionId == subscription_id
         ).order_by(PriceHistory.startDate.asc()).all()
         
         price_history_list = [
@@ -268,9 +289,7 @@ def create_subscription(
 
     except Exception as e:
         db.rollback()
-        print(f"❌ Ошибка при создании подписки: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при создании подписки", extra={"user_id": user_id})
 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -281,20 +300,39 @@ def create_subscription(
             response_model=List[SubscriptionResponse],
             summary="Получить подписки пользователя")
 def get_user_subscriptions(
+    request: Request,
+    response: Response,
     archived: bool = Query(False, description="Включить архивные подписки"),
+    fields: Optional[str] = Query(None, description="Только эти поля через запятую, например id,name,currentAmount"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Subscription).filter(Subscription.userId == current_user.id)
-    
-    if not archived:
-        query = query.filter(Subscription.archivedDate.is_(None))
-    else:
-        query = query.filter(Subscription.archivedDate.is_not(None))
+    fields = parse_fields(fields, SubscriptionResponse.model_fields)
+
+    # Версия данных читается до основного запроса: неизмененный список — сразу 304
+    etag = weak_etag(current_user.id, get_versions(db, current_user.id).subscriptions, int(archived),
+                     fields_key(fields))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    archived_filter = Subscription.archivedDate.is_not(None) if archived else Subscription.archivedDate.is_(None)
+
+    if fields:
+        # Только запрошенные колонки, без ORM-объектов и полной модели ответа
+        rows = db.execute(
+            select(*(getattr(Subscription, name) for name in fields)).where(
+                Subscription.userId == current_user.id, archived_filter
+            ).order_by(Subscription.nextPaymentDate.asc())
+        ).all()
+        sparse = Response(dump_sparse_rows(SubscriptionResponse, fields, rows), media_type="application/json")
+        set_etag(sparse, etag)
+        return sparse
+
+    query = db.query(Subscription).filter(Subscription.userId == current_user.id, archived_filter)
     
     subscriptions = query.order_by(Subscription.nextPaymentDate.asc()).all()
-    
-    print(f"🔍 Запрос подписок: archived={archived}, найдено: {len(subscriptions)}")
+    logger.debug("Запрос подписок: archived=%s, найдено: %s", archived, len(subscriptions))
     
     return [
         SubscriptionResponse(
@@ -321,10 +359,15 @@ def get_user_subscriptions(
             summary="Получить подписку по ID с историей цен")
 def get_subscription_by_id(
     subscription_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    
+    etag = weak_etag(current_user.id, get_versions(db, current_user.id).subscriptions, subscription_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
     subscription = db.query(Subscription).filter(
         and_(
             Subscription.id == subscription_id,
@@ -353,6 +396,7 @@ def get_subscription_by_id(
         for ph in price_history
     ]
     
+    set_etag(response, etag)
     return SubscriptionWithPriceHistory(
         id=subscription.id,
         userId=subscription.userId,
@@ -376,9 +420,14 @@ def get_subscription_by_id(
             summary="Получить историю цен подписки")
 def get_subscription_price_history(
     subscription_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    etag = weak_etag(current_user.id, get_versions(db, current_user.id).subscriptions, subscription_id, "prices")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
 
     subscription = db.query(Subscription).filter(
         and_(
@@ -397,6 +446,7 @@ def get_subscription_price_history(
         PriceHistory.subscriptionId == subscription_id
     ).order_by(PriceHistory.startDate.desc()).all()
     
+    set_etag(response, etag)
     return [
         PriceHistoryItem(
             id=ph.id,
@@ -411,6 +461,7 @@ def get_subscription_price_history(
               response_model=SubscriptionResponse,
               summary="Обновить подписку",
               description="Обновляет данные подписки. Если изменяется цена, обновляется последняя запись в истории цен")
+@serialized_write
 def update_subscription(
     subscription_id: int,
     update_data: UpdateSubscriptionRequest,
@@ -461,9 +512,11 @@ def update_subscription(
             detail="Next payment date cannot be in the past"
         )
     
-    # Запоминаем старую цену
+    # Запоминаем старые значения: по изменениям создаются уведомления
     old_amount = subscription.currentAmount
     old_billing_cycle = subscription.billingCycle
+    old_payment_date = subscription.nextPaymentDate
+    old_auto_renewal = subscription.autoRenewal
     
     # Обновляем поля
     update_dict = update_data.dict(exclude_none=True)
@@ -490,27 +543,45 @@ def update_subscription(
     try:
         # Если цена изменилась, обновляем историю цен
         if 'currentAmount' in update_dict and update_data.currentAmount != old_amount:
-            print(f"💸 Цена изменилась: {old_amount} → {update_data.currentAmount}")
+            logger.debug("Цена изменилась: %s -> %s", old_amount, update_data.currentAmount)
             update_subscription_price_history(db, subscription, update_data.currentAmount)
         
         # Если изменился период оплаты, пересчитываем дату следующего платежа
         if 'billingCycle' in update_dict and update_dict['billingCycle'] != old_billing_cycle:
-            print(f"📅 Период оплаты изменился: {old_billing_cycle} → {update_dict['billingCycle']}")
+            logger.debug("Период оплаты изменился: %s -> %s", old_billing_cycle, update_dict['billingCycle'])
             if subscription.nextPaymentDate:
                 subscription.nextPaymentDate = subscription.calculate_next_payment_date()
-                print(f"📅 Обновлена дата следующего платежа: {subscription.nextPaymentDate}")
+                logger.debug("Обновлена дата следующего платежа: %s", subscription.nextPaymentDate)
         
+        user_id = current_user.id
+        stamp_session(db, user_id, bump_versions(db, user_id, SUBSCRIPTIONS))
+        # После коммита объект истекает: новые значения для уведомлений берем заранее
+        name = subscription.name
+        new_amount = subscription.currentAmount
+        new_payment_date = subscription.nextPaymentDate
+        new_auto_renewal = subscription.autoRenewal
         db.commit()
+
+        # Уведомления об изменениях; с NOTIFICATION_DIGEST=1 они сливаются в дайджест подписки
+        if new_amount != old_amount:
+            NotificationService.for_price_changed(db, user_id, subscription_id, name, old_amount, new_amount)
+        if old_payment_date and new_payment_date and new_payment_date != old_payment_date:
+            NotificationService.for_payment_date_changed(
+                db, user_id, subscription_id, name, old_payment_date, new_payment_date
+            )
+        if new_auto_renewal != old_auto_renewal:
+            NotificationService.for_auto_renewal_changed(db, user_id, subscription_id, name, new_auto_renewal)
         db.refresh(subscription)
         
-        # Отладочная информация
-        price_history = db.query(PriceHistory).filter(
-            PriceHistory.subscriptionId == subscription_id
-        ).order_by(PriceHistory.startDate.desc()).all()
-        
-        print(f"📊 История цен после обновления ({len(price_history)} записей):")
-        for ph in price_history:
-            print(f"  - ID {ph.id}: {ph.amount} руб с {ph.startDate} по {ph.endDate or 'настоящее время'}")
+        # Отладочная информация: лишний запрос выполняется только при уровне DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            price_history = db.query(PriceHistory).filter(
+                PriceHistory.subscriptionId == subscription_id
+            ).order_by(PriceHistory.startDate.desc()).all()
+            logger.debug("История цен после обновления: %s", [
+                (ph.id, ph.amount, str(ph.startDate), str(ph.endDate) if ph.endDate else None)
+                for ph in price_history
+            ], extra={"subscription_id": subscription_id})
         
         # Создаем ответ
         return SubscriptionResponse(
@@ -532,9 +603,7 @@ def update_subscription(
         
     except Exception as e:
         db.rollback()
-        print(f"❌ Ошибка при обновлении подписки: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при обновлении подписки", extra={"subscription_id": subscription_id})
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -545,13 +614,13 @@ def update_subscription(
               response_model=SubscriptionResponse,
               summary="Архивировать подписку",
               description="Устанавливает текущую дату в поле archivedDate и отключает уведомления")
+@serialized_write
 def archive_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    
-    print(f"🔍 Архивация подписки ID: {subscription_id} для пользователя ID: {current_user.id}")
+    logger.debug("Архивация подписки", extra={"user_id": current_user.id, "subscription_id": subscription_id})
     
     # Находим подписку
     subscription = db.query(Subscription).filter(
@@ -580,10 +649,14 @@ def archive_subscription(
     subscription.updatedAt = datetime.utcnow()
     
     try:
+        # Для /api/sync архивная подписка исчезает из списка: надгробие вместо строки
+        seq = bump_versions(db, current_user.id, SUBSCRIPTIONS)
+        stamp(seq, subscription)
+        add_tombstones(db, current_user.id, seq, SUBSCRIPTION, [subscription.id], reason=ARCHIVED)
         db.commit()
         db.refresh(subscription)
         
-        print(f"✅ Подписка '{subscription.name}' успешно архивирована (уведомления отключены)")
+        logger.info("Подписка архивирована", extra={"user_id": current_user.id, "subscription_id": subscription_id})
         
         # Возвращаем обновленную подписку
         return SubscriptionResponse(
@@ -605,9 +678,7 @@ def archive_subscription(
         
     except Exception as e:
         db.rollback()
-        print(f"❌ Ошибка при архивации: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при архивации подписки", extra={"subscription_id": subscription_id})
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -618,6 +689,7 @@ def archive_subscription(
               response_model=SubscriptionResponse,
               summary="Обновить дату следующего платежа",
               description="Пересчитывает дату следующего платежа на основе текущей даты и периода оплаты")
+@serialized_write
 def renew_subscription_payment_date(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
@@ -654,10 +726,11 @@ def renew_subscription_payment_date(
     subscription.updatedAt = datetime.utcnow()
     
     try:
+        stamp(bump_versions(db, current_user.id, SUBSCRIPTIONS), subscription)
         db.commit()
         db.refresh(subscription)
         
-        print(f"✅ Дата следующего платежа обновлена: {new_date}")
+        logger.debug("Дата следующего платежа обновлена: %s", new_date, extra={"subscription_id": subscription_id})
         
         return SubscriptionResponse(
             id=subscription.id,
@@ -678,7 +751,7 @@ def renew_subscription_payment_date(
         
     except Exception as e:
         db.rollback()
-        print(f"❌ Ошибка при обновлении даты платежа: {str(e)}")
+        logger.exception("Ошибка при обновлении даты платежа", extra={"subscription_id": subscription_id})
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,80 @@
+# backend/routes/sync.py
+"""
+Дельта-синхронизация для офлайн-клиентов.
+
+Первый запрос без since возвращает полный снимок (full=true) и токен; следующие
+с since=<токен> — только подписки, записи истории цен и уведомления, измененные
+после него, и надгробия (deleted) удаленных строк и архивированных подписок.
+Клиент применяет строки как upsert по id, затем надгробия (с архивной подпиской
+уходит и ее история цен), и сохраняет новый токен. full=true — локальные данные
+заменяются целиком: так бывает и со старым токеном, если его надгробия уже удалены.
+"""
+import base64
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from backend.database import get_db
+from backend.models.user import User
+from backend.routes.auth import get_current_user
+from backend.schemas.notification import NotificationResponse
+from backend.schemas.sub import SubscriptionResponse
+from backend.schemas.sync import SyncPriceHistoryItem, SyncResponse, SyncTombstoneItem
+from backend.services.sync import NOTIFICATION, collect_changes
+
+# Меняется при несовместимом изменении ответа: старые токены получат полный снимок
+TOKEN_REVISION = 1
+
+router = APIRouter(prefix="/api", tags=["sync"])
+
+
+def encode_sync_token(user_id: int, seq: int) -> str:
+    """Непрозрачный токен из номера последнего изменения"""
+    payload = json.dumps([TOKEN_REVISION, user_id, seq]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_sync_token(token: str, user_id: int) -> Optional[int]:
+    """Номер изменения из токена; None — токен устарел или выдан другому пользователю"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        revision, token_user_id, seq = json.loads(base64.urlsafe_b64decode(padded))
+        revision, token_user_id, seq = int(revision), int(token_user_id), int(seq)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный токен синхронизации"
+        )
+    if revision != TOKEN_REVISION or token_user_id != user_id:
+        return None
+    return seq
+
+
+@router.get("/sync", response_model=SyncResponse, summary="Изменения после токена синхронизации")
+def sync_changes(
+    since: Optional[str] = Query(None, description="Токен из предыдущего ответа; без него — полный снимок"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user_id = current_user.id
+    changes = collect_changes(db, user_id, decode_sync_token(since, user_id) if since else None)
+
+    return SyncResponse(
+        token=encode_sync_token(user_id, changes["seq"]),
+        full=changes["full"],
+        subscriptions=[
+            SubscriptionResponse.model_validate(sub, from_attributes=True) for sub in changes["subscriptions"]
+        ],
+        price_history=[
+            SyncPriceHistoryItem.model_validate(ph, from_attributes=True) for ph in changes["price_history"]
+        ],
+        notifications=[NotificationResponse.from_row(row) for row in changes["notifications"]],
+        deleted=[
+            SyncTombstoneItem(
+                entity=entity, id=str(entity_id) if entity == NOTIFICATION else entity_id, reason=reason, seq=seq
+            )
+            for entity, entity_id, reason, seq in changes["deleted"]
+        ]
+    )
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class BatchOperation(BaseModel):
+    id: Optional[str] = Field(None, description="Метка операции от клиента, возвращается в результате")
+    method: str = Field(..., description="HTTP-метод исходного маршрута")
+    path: str = Field(..., description="Путь исходного маршрута, например /api/subscriptions/5/archive")
+    body: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+    atomic: bool = Field(False, description="Все операции в одной транзакции: ошибка отменяет весь пакет")
+
+class BatchItemResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    atomic: bool
+    committed: bool  # False — пакет atomic отменен, ни одна запись не сохранена
+    results: List[BatchItemResult]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List, Dict
+from datetime import date
+
+from backend.schemas.sub import SubscriptionResponse
+from backend.schemas.analytics import OverallAnalyticsResponse
+
+class UpcomingPayment(BaseModel):
+    subscription_id: int
+    name: str
+    amount: int
+    category: str
+    nextPaymentDate: date
+    days_left: int
+
+class DashboardResponse(BaseModel):
+    subscriptions: List[SubscriptionResponse]
+    unread_counts: Dict[int, int]
+    total_unread: int
+    analytics: OverallAnalyticsResponse
+    upcoming_payments: List[UpcomingPayment]
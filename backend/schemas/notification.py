@@ -1,5 +1,5 @@
 # schemas/notification.py
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 import uuid
@@ -42,6 +42,22 @@ class NotificationResponse(BaseModel):
         # Для любых других типов преобразуем в строку
         return str(v)
 
+    @classmethod
+    def from_row(cls, row):
+        """Собирает ответ из строки запроса без ORM-объекта и повторной валидации"""
+        values = row._mapping
+        return cls.model_construct(
+            id=str(values["id"]),
+            user_id=str(values["user_id"]),
+            subscription_id=values["subscription_id"],
+            type=values["type"],
+            title=values["title"],
+            message=values["message"],
+            scheduled_date=values["scheduled_date"],
+            read=values["read"],
+            created_at=values["created_at"]
+        )
+
 
 class NotificationGroup(BaseModel):
     """Схема для группировки уведомлений по подпискам (для фронтенда)"""
@@ -54,11 +70,33 @@ class NotificationGroup(BaseModel):
     last_notification_date: Optional[datetime] = None
 
 
+class NotificationHistoryPage(BaseModel):
+    """Страница истории уведомлений подписки (keyset-пагинация)"""
+    subscription: dict
+    notifications: List[NotificationResponse]
+    total_count: int
+    unread_count: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    history_summary: Optional[dict] = None  # свернутая задачей ретеншна старая история
+
+
 class NotificationReadRequest(BaseModel):
     """Схема для запроса на прочтение уведомления"""
     read: bool = True
 
 
+class NotificationIdsReadRequest(BaseModel):
+    """Схема для пометки прочитанными нескольких уведомлений"""
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+
+
+class NotificationReadUpToRequest(BaseModel):
+    """Схема для пометки прочитанными всех уведомлений до момента up_to"""
+    up_to: datetime
+    subscription_id: Optional[int] = None
+
+
 class ReadAllResponse(BaseModel):
     """Схема для ответа при прочтении всех уведомлений"""
     message: str
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import List, Optional, Union
+from datetime import date, datetime
+
+from backend.schemas.sub import SubscriptionResponse
+from backend.schemas.notification import NotificationResponse
+
+class SyncPriceHistoryItem(BaseModel):
+    id: int
+    subscriptionId: int
+    amount: int
+    startDate: date
+    endDate: Optional[date] = None
+    createdAt: Optional[datetime] = None
+
+class SyncTombstoneItem(BaseModel):
+    entity: str  # "subscription", "price_history", "notification"
+    id: Union[int, str]  # как в строках сущности: у уведомлений id — строка
+    reason: str  # "deleted" или "archived"
+    seq: int
+
+class SyncResponse(BaseModel):
+    token: str
+    full: bool  # True — полный снимок: клиент заменяет локальные данные целиком
+    subscriptions: List[SubscriptionResponse]
+    price_history: List[SyncPriceHistoryItem]
+    notifications: List[NotificationResponse]
+    deleted: List[SyncTombstoneItem]
@@ -0,0 +1,281 @@
+# backend/serve.py
+"""
+Продакшн-запуск API: несколько воркеров uvicorn на одном сокете.
+
+Мастер один раз импортирует приложение и готовит его (preload): проверка схемы,
+init_db и миграции выполняются один раз, а не наперегонки в каждом воркере, а
+воркеры стартуют форком уже загруженного процесса со схемой OpenAPI в памяти.
+Затем мастер открывает сокет и форкает воркеров; соединения между ними
+распределяет ядро. Цикл событий — uvloop, разбор HTTP — httptools,
+если они установлены (uvicorn[standard]), иначе asyncio и h11.
+
+Сигналы мастеру:
+    SIGTERM, SIGINT — плавная остановка: воркеры перестают принимать соединения и
+                      дообслуживают начатые запросы не дольше --graceful-timeout
+    SIGHUP          — плавный перезапуск воркеров по одному: новый воркер начинает
+                      принимать соединения раньше, чем останавливается старый.
+                      Код приложения не перечитывается (он загружен в мастере) —
+                      для выкладки новой версии перезапускается весь процесс
+Упавший воркер запускается заново; --max-requests перезапускает воркер после
+стольких запросов (против медленного роста памяти).
+
+С METRICS_ENABLED=1 воркеры пишут снимки метрик в общий каталог METRICS_DIR
+(по умолчанию мастер создает временный), /metrics любого воркера отдает их сумму;
+снимок завершившегося воркера мастер переносит в архив (см. utils/metrics).
+
+Фоновые задачи (services/jobs) включаются в каждом воркере, но каждую выполняет
+один процесс — по аренде в таблице job_leases. Автопродление подписок среди них
+только при AUTO_RENEWALS=1. Под несколькими воркерами включается
+и StreamRelay для /notifications/stream.
+
+Запуск из корня репозитория:
+    python -m backend.serve                          # воркеров по числу CPU
+    python -m backend.serve --workers 4 --port 8000
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+from backend.utils.log import setup_logging, stop_logging
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 — по числу доступных процессу CPU
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+WORKER_BOOT_TIMEOUT = 60
+# Воркер, упавший быстрее этого после старта, перезапускается с паузой: не крутим форки впустую
+CRASH_BACKOFF_SECONDS = 1.0
+
+logger = logging.getLogger("backend.serve")
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class Master:
+    """Мастер-процесс: держит сокет, запускает, перезапускает и останавливает воркеров"""
+
+    def __init__(self, config, sock, workers: int, graceful_timeout: int):
+        self.config = config
+        self.sock = sock
+        self.count = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}  # pid -> время старта
+        self.retiring = set()  # pid, остановленные мастером намеренно
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self, wait: bool = False) -> int:
+        """Форкает воркера; wait=True — дождаться, пока он начнет принимать соединения"""
+        # Воркер пишет байт в канал, когда начал принимать соединения
+        ready_r, ready_w = os.pipe() if wait else (None, None)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                if wait:
+                    os.close(ready_r)
+                self.run_worker(ready_w)
+            except BaseException:
+                logger.exception("Воркер %s завершился с ошибкой", os.getpid())
+                code = 1
+            finally:
+                stop_logging()
+                os._exit(code)
+
+        self.workers[pid] = time.monotonic()
+        if wait:
+            os.close(ready_w)
+            try:
+                readable, _, _ = select.select([ready_r], [], [], WORKER_BOOT_TIMEOUT)
+                if not readable or not os.read(ready_r, 1):
+                    logger.error("Воркер %s не запустился", pid)
+            finally:
+                os.close(ready_r)
+        return pid
+
+    def run_worker(self, ready_fd: int = None):
+        import uvicorn
+
+        # Обработчики мастера воркеру не нужны: uvicorn ставит свои на SIGINT/SIGTERM
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+
+        class WorkerServer(uvicorn.Server):
+            async def startup(self, sockets=None):
+                await super().startup(sockets=sockets)
+                if ready_fd is not None:
+                    if self.started:
+                        os.write(ready_fd, b"1")
+                    os.close(ready_fd)
+
+        WorkerServer(self.config).run(sockets=[self.sock])
+
+    def reap(self):
+        """Забирает завершившихся воркеров; неожиданно упавших — отмечает для перезапуска"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            self.forget(pid)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif started is not None and not self.stopping:
+                code = os.waitstatus_to_exitcode(status)
+                if code:
+                    logger.error("Воркер %s завершился с кодом %s", pid, code)
+                if time.monotonic() - started < CRASH_BACKOFF_SECONDS:
+                    time.sleep(CRASH_BACKOFF_SECONDS)
+
+    def stop_workers(self, pids, timeout: float):
+        """SIGTERM воркерам и ожидание; не успевшие за timeout получают SIGKILL"""
+        pids = set(pids)
+        self.retiring.update(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while pids & self.workers.keys() and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in pids & self.workers.keys():
+            logger.warning("Воркер %s не остановился за %s с", pid, timeout)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.pop(pid, None)
+            self.retiring.discard(pid)
+            self.forget(pid)
+
+    @staticmethod
+    def forget(pid: int):
+        """Счетчики завершившегося воркера остаются в сумме /metrics через архив снимков"""
+        from backend.utils.metrics import METRICS_DIR, archive_snapshot
+
+        if METRICS_DIR:
+            archive_snapshot(pid)
+
+    def rolling_restart(self):
+        for pid in list(self.workers):
+            if self.stopping:
+                return
+            self.spawn(wait=True)
+            self.stop_workers([pid], self.graceful_timeout + 5)
+        logger.info("Воркеры перезапущены")
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def handle_reload(self, signum, frame):
+        self.reloading = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        logger.info("Мастер %s: воркеров %s", os.getpid(), self.count)
+        while not self.stopping:
+            self.reap()
+            if self.reloading:
+                self.reloading = False
+                self.rolling_restart()
+            while len(self.workers) < self.count and not self.stopping:
+                self.spawn()
+            time.sleep(0.2)
+
+        # uvicorn сам ограничивает ожидание timeout_graceful_shutdown; запас — на lifespan
+        self.stop_workers(list(self.workers), self.graceful_timeout + 5)
+        self.sock.close()
+        logger.info("Мастер остановлен")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WORKERS, help="0 — по числу CPU")
+    parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_TIMEOUT,
+                        help="Сколько секунд воркер дообслуживает запросы при остановке")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS,
+                        help="Перезапуск воркера после стольких запросов, 0 — без ограничения")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO").lower())
+    parser.add_argument("--no-jobs", action="store_true", help="Не запускать фоновые задачи")
+    args = parser.parse_args()
+
+    # Без fork (Windows) — один процесс без мастера
+    workers = args.workers or cpu_count() if hasattr(os, "fork") else 1
+
+    # Мастер пишет логи без фонового потока: он форкает воркеров, а те настраивают свое в lifespan
+    setup_logging(args.log_level.upper(), background=False)
+
+    # До импорта приложения: services/jobs читает настройки при импорте
+    os.environ.setdefault("BACKGROUND_JOBS", "0" if args.no_jobs else "1")
+    if workers > 1:
+        os.environ.setdefault("STREAM_RELAY", "1")
+    metrics_dir = None
+    if workers > 1 and os.getenv("METRICS_ENABLED", "0") == "1":
+        if not os.getenv("METRICS_DIR"):
+            metrics_dir = os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="subs-metrics-")
+        else:
+            # Снимки прошлого запуска: их воркеров уже нет, а счетчики начинаются заново
+            os.makedirs(os.environ["METRICS_DIR"], exist_ok=True)
+            for name in os.listdir(os.environ["METRICS_DIR"]):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(os.environ["METRICS_DIR"], name))
+
+    import uvicorn
+    from backend.database import all_engines, ensure_schema
+    from backend.main import app
+
+    # Один раз до форка: lifespan воркеров найдет схему готовой, а OpenAPI — построенной
+    ensure_schema()
+    app.openapi()
+
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        loop="uvloop" if installed("uvloop") else "asyncio",
+        http="httptools" if installed("httptools") else "h11",
+        log_level=args.log_level,
+        proxy_headers=True,
+        limit_max_requests=args.max_requests or None,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+    if not hasattr(os, "fork"):
+        uvicorn.Server(config).run()
+        return
+
+    config.load()
+    sock = config.bind_socket()
+    # Соединения, открытые при проверке схемы, не должны достаться воркерам по наследству
+    for db_engine in all_engines():
+        db_engine.dispose()
+    Master(config, sock, workers, args.graceful_timeout).run()
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# backend/services/data_versions.py
+"""
+Версии данных пользователя для условных GET (ETag / If-None-Match).
+
+subscriptions — подписки и история цен, notifications — уведомления.
+Запись увеличивает версию в своей транзакции, поэтому чтение версии
+одним запросом по первичному ключу достаточно, чтобы ответить 304.
+
+Каждый вызов bump_versions также выдает следующий номер change_seq —
+сквозной последовательности изменений пользователя для /api/sync.
+"""
+from collections import namedtuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.user import UserDataVersion
+from backend.utils.dialects import dialect_of, upsert_insert
+
+SUBSCRIPTIONS = "subscriptions"
+NOTIFICATIONS = "notifications"
+
+DataVersions = namedtuple("DataVersions", [SUBSCRIPTIONS, NOTIFICATIONS])
+
+
+def bump_versions(db: Session, user_id: int, *scopes: str) -> int:
+    """
+    Увеличивает версии scopes в текущей транзакции (upsert); коммит за вызывающим кодом.
+    Возвращает новый change_seq: им помечаются строки, измененные в этой транзакции
+    """
+    user_id = int(user_id)
+    increments = {
+        "change_seq": UserDataVersion.change_seq + 1,
+        **{scope: getattr(UserDataVersion, scope) + 1 for scope in scopes}
+    }
+    upsert = upsert_insert(db, UserDataVersion)
+    if upsert is not None and dialect_of(db).insert_returning:
+        # Один оператор: INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+        return db.execute(upsert.values(
+            user_id=user_id, change_seq=1, **{scope: 1 for scope in scopes}
+        ).on_conflict_do_update(
+            index_elements=[UserDataVersion.user_id], set_=increments
+        ).returning(UserDataVersion.change_seq)).scalar_one()
+
+    updated = db.execute(
+        update(UserDataVersion).where(UserDataVersion.user_id == user_id).values(**increments)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.execute(insert(UserDataVersion).values(user_id=user_id, change_seq=1, **{scope: 1 for scope in scopes}))
+    return db.execute(select(UserDataVersion.change_seq).where(UserDataVersion.user_id == user_id)).scalar_one()
+
+
+def get_versions(db: Session, user_id: int) -> DataVersions:
+    # Столбцы, а не объект: identity map сессии не вернет устаревшие значения
+    row = db.query(
+        UserDataVersion.subscriptions, UserDataVersion.notifications
+    ).filter(UserDataVersion.user_id == int(user_id)).first()
+    return DataVersions(*row) if row else DataVersions(0, 0)
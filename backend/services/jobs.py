@@ -0,0 +1,260 @@
+# backend/services/jobs.py
+"""
+Фоновые задачи воркеров: напоминания о скором списании и автопродление подписок.
+Автопродление меняет даты платежей без действия пользователя, поэтому включается
+отдельно (AUTO_RENEWALS=1), а не вместе с остальными задачами.
+
+Потоки задач запускаются в каждом воркере (lifespan приложения), но каждую задачу
+выполняет один процесс: перед запуском воркер берет ее аренду в job_leases условным
+UPDATE по expires_at. Это атомарно в любой БД и работает и между контейнерами.
+Срок аренды равен интервалу задачи, поэтому следующий запуск будет не раньше, чем
+через интервал, в каком бы воркере он ни случился; воркер, упавший посреди задачи,
+держит ее не дольше срока аренды. Сами задачи идемпотентны: повторный запуск
+не создаст второго напоминания и не продлит подписку дважды.
+
+StreamRelay нужен только под несколькими воркерами (см. notification_events).
+
+Включаются переменными BACKGROUND_JOBS=1 и STREAM_RELAY=1; backend.serve
+выставляет их сам. AUTO_RENEWALS он не трогает.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal, map_shards
+from backend.models.jobs import JobLease
+from backend.models.notification import Notification
+from backend.models.subscription import Subscription
+from backend.models.user import UserDataVersion
+from backend.services.data_versions import SUBSCRIPTIONS, bump_versions
+from backend.services.notification_events import broker
+from backend.services.notifications_service import NotificationService
+from backend.services.sync import stamp
+from backend.utils.metrics import METRICS_DIR, METRICS_ENABLED, METRICS_FLUSH_SECONDS, write_snapshot
+
+JOBS_ENABLED = os.getenv("BACKGROUND_JOBS", "0") == "1"
+JOB_TICK_SECONDS = float(os.getenv("JOB_TICK_SECONDS", "30"))
+REMINDERS_INTERVAL_SECONDS = int(os.getenv("REMINDERS_INTERVAL_SECONDS", "3600"))
+AUTO_RENEWALS_ENABLED = os.getenv("AUTO_RENEWALS", "0") == "1"
+RENEWALS_INTERVAL_SECONDS = int(os.getenv("RENEWALS_INTERVAL_SECONDS", "3600"))
+
+STREAM_RELAY_ENABLED = os.getenv("STREAM_RELAY", "0") == "1"
+STREAM_RELAY_SECONDS = float(os.getenv("STREAM_RELAY_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    """Владелец аренды; pid берется при вызове — мастер импортирует модуль до форка"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(db: Session, name: str, seconds: float, owner: str = None, now: datetime = None) -> bool:
+    """Берет аренду задачи name на seconds, если она свободна или истекла"""
+    now = now or datetime.utcnow()
+    values = {"owner": owner or worker_id(), "acquired_at": now, "expires_at": now + timedelta(seconds=seconds)}
+
+    taken = db.execute(
+        update(JobLease).where(JobLease.name == name, JobLease.expires_at <= now).values(**values)
+    ).rowcount
+    if not taken and db.execute(select(JobLease.name).where(JobLease.name == name)).first() is None:
+        # Первый запуск задачи: при гонке вставку выиграет только один воркер
+        try:
+            db.execute(insert(JobLease).values(name=name, **values))
+            taken = 1
+        except IntegrityError:
+            db.rollback()
+            return False
+    db.commit()
+    return bool(taken)
+
+
+def reminder_key(subscription_id: int, payment_date: date) -> str:
+    return f"reminder:{subscription_id}:{payment_date.isoformat()}"
+
+
+def send_payment_reminders(db: Session, today: date = None) -> int:
+    """
+    Напоминание «Скоро списание», когда до платежа осталось notifyDays дней или меньше.
+    Одно на подписку и дату платежа: ключ напоминания — dedupe_key уведомления
+    """
+    today = today or date.today()
+    horizon = db.query(func.max(Subscription.notifyDays)).scalar() or 0
+    due = [
+        row for row in db.query(
+            Subscription.id, Subscription.userId, Subscription.name, Subscription.currentAmount,
+            Subscription.nextPaymentDate, Subscription.notifyDays
+        ).filter(
+            Subscription.archivedDate.is_(None),
+            Subscription.notificationsEnabled == True,
+            Subscription.nextPaymentDate > today,
+            Subscription.nextPaymentDate <= today + timedelta(days=horizon)
+        )
+        if (row.nextPaymentDate - today).days <= row.notifyDays
+    ]
+
+    sent = {
+        key for (key,) in db.query(Notification.dedupe_key).filter(
+            Notification.dedupe_key.in_([reminder_key(row.id, row.nextPaymentDate) for row in due])
+        )
+    }
+    created = 0
+    for row in due:
+        key = reminder_key(row.id, row.nextPaymentDate)
+        if key in sent:
+            continue
+        if NotificationService.for_payment_soon(
+            db, row.userId, row.id, row.name, row.nextPaymentDate, row.currentAmount,
+            (row.nextPaymentDate - today).days, dedupe_key=key
+        ):
+            created += 1
+    return created
+
+
+def renew_overdue_subscriptions(db: Session, today: date = None) -> int:
+    """
+    Автопродление: прошедшая дата платежа подписки с autoRenewal сдвигается
+    на целое число периодов — до ближайшей даты не раньше сегодняшней
+    """
+    today = today or date.today()
+    overdue = db.query(Subscription).filter(
+        Subscription.autoRenewal == True,
+        Subscription.archivedDate.is_(None),
+        Subscription.nextPaymentDate < today
+    ).order_by(Subscription.userId).all()
+
+    for user_id, subscriptions in groupby(overdue, key=lambda sub: sub.userId):
+        seq = bump_versions(db, user_id, SUBSCRIPTIONS)
+        for subscription in subscriptions:
+            next_date = subscription.nextPaymentDate
+            while next_date < today:
+                next_date = subscription.calculate_next_payment_date(next_date)
+            subscription.nextPaymentDate = next_date
+            subscription.updatedAt = datetime.utcnow()
+            stamp(seq, subscription)
+    db.commit()
+    return len(overdue)
+
+
+# (имя аренды, интервал в секундах, задача)
+JOBS = (
+    ("payment_reminders", REMINDERS_INTERVAL_SECONDS, send_payment_reminders),
+)
+if AUTO_RENEWALS_ENABLED:
+    JOBS += (("auto_renewals", RENEWALS_INTERVAL_SECONDS, renew_overdue_subscriptions),)
+
+
+def run_due_jobs(jobs=JOBS) -> list:
+    """
+    Выполняет задачи, аренду которых удалось взять; возвращает их имена.
+    Аренда — в основной базе, сама задача — во всех шардах параллельно
+    """
+    executed = []
+    for name, interval, job in jobs:
+        db = SessionLocal()
+        try:
+            if not acquire_lease(db, name, interval):
+                continue
+            started = time.perf_counter()
+            result = sum(map_shards(job))
+            executed.append(name)
+            logger.info("Фоновая задача %s: %s за %.2f с", name, result, time.perf_counter() - started)
+        except Exception:
+            # Аренда не снимается: следующая попытка — через интервал, а не на каждом тике
+            db.rollback()
+            logger.exception("Ошибка фоновой задачи %s", name)
+        finally:
+            db.close()
+    return executed
+
+
+class StreamRelay:
+    """
+    Соединения /stream и /ws этого процесса получают resync, когда версия уведомлений
+    их пользователя изменилась с прошлого прохода. Собственные публикации процесса
+    не в счет: по ним нельзя понять, не было ли рядом записи в другом воркере, поэтому
+    после своей записи клиент тоже перечитает ленту — не чаще раза за проход.
+    Один запрос по первичному ключу за проход (с шардами — по одному в каждом)
+    """
+
+    def __init__(self):
+        self._versions = {}
+
+    def poll(self) -> int:
+        users = broker.connected_users()
+        if not users:
+            self._versions = {}
+            return 0
+
+        def load(db):
+            return db.query(UserDataVersion.user_id, UserDataVersion.notifications).filter(
+                UserDataVersion.user_id.in_(users)
+            ).all()
+
+        rows = {}
+        for shard_rows in map_shards(load):
+            rows.update(shard_rows)
+
+        versions = {user_id: rows.get(user_id, 0) for user_id in users}
+        resynced = 0
+        for user_id, version in versions.items():
+            previous = self._versions.get(user_id)
+            if previous is not None and version != previous:
+                broker.resync(user_id)
+                resynced += 1
+        self._versions = versions
+        return resynced
+
+
+class PeriodicThread:
+    """Поток-демон, вызывающий fn каждые interval секунд до stop()"""
+
+    def __init__(self, name: str, interval: float, fn):
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.fn()
+            except Exception:
+                logger.exception("Ошибка в потоке %s", self._thread.name)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "PeriodicThread":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+def start_background_tasks() -> list:
+    """Потоки фоновых задач процесса по настройкам; останавливаются stop_background_tasks"""
+    threads = []
+    if JOBS_ENABLED:
+        threads.append(PeriodicThread("background-jobs", JOB_TICK_SECONDS, run_due_jobs).start())
+    if STREAM_RELAY_ENABLED:
+        threads.append(PeriodicThread("stream-relay", STREAM_RELAY_SECONDS, StreamRelay().poll).start())
+    if METRICS_ENABLED and METRICS_DIR:
+        threads.append(PeriodicThread("metrics-snapshots", METRICS_FLUSH_SECONDS, write_snapshot).start())
+    return threads
+
+
+def stop_background_tasks(threads: list):
+    for thread in threads:
+        thread.stop()
+    if METRICS_ENABLED and METRICS_DIR:
+        # Последний снимок: мастер перенесет его в архив, когда заберет воркера
+        write_snapshot()
@@ -0,0 +1,129 @@
+# backend/services/notification_events.py
+"""
+Внутрипроцессная рассылка событий уведомлений подключенным клиентам (SSE / WebSocket).
+
+NotificationService публикует события после коммита, а каждое открытое соединение
+читает их из собственной ограниченной очереди. Медленный клиент не копит память:
+при переполнении его очередь сбрасывается и он получает событие "resync",
+после которого клиент перезагружает ленту обычным запросом.
+
+Под несколькими воркерами (backend.serve) событие доходит только до соединений
+своего процесса; о записях в других воркерах соединения узнают тем же "resync"
+от services/jobs.StreamRelay, который следит за версиями уведомлений в БД.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+QUEUE_SIZE = 100
+RESYNC_EVENT = {"event": "resync", "data": {}}
+
+# Отложенные события текущего запроса (см. NotificationBroker.hold); пул потоков копирует контекст
+_held_events: ContextVar[Optional[list]] = ContextVar("held_notification_events", default=None)
+
+
+class Subscriber:
+    """Одно подключение клиента: очередь событий и цикл событий, в котором ее читают"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        """Кладет событие в очередь; вызывается только из self.loop"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: вместо накопления отдаем один сигнал пересинхронизации
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Следующее событие или None, если за timeout ничего не пришло"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class NotificationBroker:
+    """Реестр подписчиков по user_id с потокобезопасной публикацией"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(int(user_id), asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[subscriber.user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def publish(self, user_id: int, event: str, data: dict):
+        """
+        Отправляет событие всем соединениям пользователя.
+        Можно вызывать из синхронных обработчиков (пул потоков) и из event loop
+        """
+        held = _held_events.get()
+        if held is not None:
+            held.append((user_id, event, data))
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(user_id), ()))
+        self._deliver(subscribers, {"event": event, "data": data})
+
+    def resync(self, user_id: int):
+        """Событие resync всем соединениям пользователя"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(user_id), ()))
+        self._deliver(subscribers, RESYNC_EVENT)
+
+    def _deliver(self, subscribers: list, message: dict):
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+            except RuntimeError:
+                # Цикл событий уже закрыт: соединение умерло вместе с ним
+                self.unsubscribe(subscriber)
+
+    @contextmanager
+    def hold(self):
+        """
+        Придерживает события, опубликованные внутри блока, и возвращает их списком
+        (user_id, event, data). Нужен, когда коммит откладывается до конца блока:
+        вызывающий код публикует события только после коммита, при откате — отбрасывает
+        """
+        events = []
+        token = _held_events.set(events)
+        try:
+            yield events
+        finally:
+            _held_events.reset(token)
+
+    def connected_users(self) -> set:
+        with self._lock:
+            return set(self._subscribers)
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = NotificationBroker()
@@ -0,0 +1,159 @@
+# backend/services/notification_retention.py
+"""
+Ретеншн уведомлений: перенос старых прочитанных уведомлений в архив (или удаление),
+свертка истории подписки в итоговые записи и инкрементальный VACUUM.
+Удаленные уведомления оставляют надгробия для /api/sync; надгробия старше
+SYNC_TOMBSTONE_DAYS удаляются в конце прогона.
+
+Работает короткими пакетами: каждая транзакция затрагивает не больше batch_size строк,
+поэтому блокировка записи SQLite не мешает обработчикам запросов.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, insert, delete, select, text
+from sqlalchemy.orm import Session
+
+from backend.models.notification import Notification, NotificationArchive, NotificationHistorySummary
+from backend.services.data_versions import NOTIFICATIONS, bump_versions
+from backend.services.sync import NOTIFICATION, TOMBSTONE_DAYS, add_tombstones, prune_tombstones
+
+RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "180"))
+RETENTION_MODE = os.getenv("NOTIFICATION_RETENTION_MODE", "archive")
+RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "1000"))
+
+ARCHIVED_COLUMNS = ("id", "user_id", "subscription_id", "type", "title", "message",
+                    "read", "scheduled_date", "created_at")
+
+
+@dataclass
+class RetentionPolicy:
+    older_than_days: int = RETENTION_DAYS
+    mode: str = RETENTION_MODE  # "archive" — перенести в notifications_archive, "delete" — удалить
+    batch_size: int = RETENTION_BATCH_SIZE
+    compact: bool = True
+    vacuum: bool = True
+    pause_seconds: float = 0.0  # пауза между пакетами, чтобы дать дорогу обработчикам запросов
+    tombstone_days: int = TOMBSTONE_DAYS
+
+    def __post_init__(self):
+        if self.mode not in ("archive", "delete"):
+            raise ValueError(f"Unknown retention mode: {self.mode}")
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+
+@dataclass
+class RetentionReport:
+    processed: int = 0
+    batches: int = 0
+    summaries: int = 0
+    freed_pages: int = 0
+    tombstones_pruned: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.processed / self.seconds if self.seconds else 0.0
+
+
+def _collapse_into_summaries(db: Session, rows) -> int:
+    """Добавляет строки пакета в итоговые записи по (user_id, subscription_id)"""
+    groups = {}
+    for row in rows:
+        key = (row.user_id, row.subscription_id)
+        count, first, last = groups.get(key, (0, row.created_at, row.created_at))
+        groups[key] = (count + 1, min(first, row.created_at), max(last, row.created_at))
+
+    for (user_id, subscription_id), (count, first, last) in groups.items():
+        summary = db.get(NotificationHistorySummary, (user_id, subscription_id))
+        if summary is None:
+            db.add(NotificationHistorySummary(
+                user_id=user_id,
+                subscription_id=subscription_id,
+                collapsed_count=count,
+                first_created_at=first,
+                last_created_at=last
+            ))
+        else:
+            summary.collapsed_count += count
+            summary.first_created_at = min(summary.first_created_at or first, first)
+            summary.last_created_at = max(summary.last_created_at or last, last)
+    return len(groups)
+
+
+def run_incremental_vacuum(db: Session) -> int:
+    """Возвращает свободные страницы файлу SQLite; работает при auto_vacuum=INCREMENTAL"""
+    if db.get_bind().dialect.name != "sqlite":
+        return 0
+    free_before = db.execute(text("PRAGMA freelist_count")).scalar()
+    if db.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+        db.commit()
+        # Каждый шаг оператора освобождает одну страницу; executescript (sqlite3_exec)
+        # выполняет его до конца, а обычный execute остановился бы после первой
+        db.connection().connection.executescript("PRAGMA incremental_vacuum;")
+    return free_before - db.execute(text("PRAGMA freelist_count")).scalar()
+
+
+def apply_retention(db: Session, policy: RetentionPolicy = None, now: datetime = None) -> RetentionReport:
+    """Применяет политику ретеншна к таблице notifications"""
+    policy = policy or RetentionPolicy()
+    cutoff = (now or datetime.utcnow()) - timedelta(days=policy.older_than_days)
+    report = RetentionReport()
+    started = time.perf_counter()
+
+    columns = [getattr(Notification, name) for name in ARCHIVED_COLUMNS]
+    last_id = 0
+
+    while True:
+        # Возобновляемый обход по первичному ключу: каждый пакет продолжает с места,
+        # где остановился предыдущий, без повторного сканирования обработанного
+        rows = db.execute(
+            select(*columns).where(and_(
+                Notification.id > last_id,
+                Notification.read == True,
+                Notification.created_at < cutoff
+            )).order_by(Notification.id).limit(policy.batch_size)
+        ).all()
+
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        last_id = ids[-1]
+
+        try:
+            if policy.mode == "archive":
+                db.execute(insert(NotificationArchive), [dict(row._mapping) for row in rows])
+            if policy.compact:
+                report.summaries += _collapse_into_summaries(db, rows)
+            db.execute(delete(Notification).where(Notification.id.in_(ids)))
+            # Удаленные прочитанные уведомления пропадают из ленты: ETag пользователей устаревает,
+            # а клиенты /api/sync получают надгробия
+            by_user = {}
+            for row in rows:
+                by_user.setdefault(row.user_id, []).append(row.id)
+            for user_id, notification_ids in by_user.items():
+                add_tombstones(db, user_id, bump_versions(db, user_id, NOTIFICATIONS), NOTIFICATION, notification_ids)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            report.errors.append(str(e))
+            break
+
+        report.processed += len(rows)
+        report.batches += 1
+        if policy.pause_seconds:
+            time.sleep(policy.pause_seconds)
+
+    if not report.errors:
+        report.tombstones_pruned = prune_tombstones(db, policy.tombstone_days, now=now)
+
+    if policy.vacuum and report.processed:
+        report.freed_pages = run_incremental_vacuum(db)
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -1,8 +1,29 @@
 # backend/services/notification_service.py
+import os
+import time
 from datetime import datetime, date
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import uuid
 from backend.models.notification import Notification
+from backend.services.unread_counters import increment_unread, reset_unread
+from backend.services.data_versions import NOTIFICATIONS, bump_versions
+from backend.services.notification_events import broker
+from backend.utils.dialects import upsert_insert
+
+# Режим дайджеста: изменения одной подписки за окно сливаются в одно уведомление
+DIGEST_ENABLED = os.getenv("NOTIFICATION_DIGEST", "0") == "1"
+DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "86400"))
+DIGEST_TYPES = ("price_changed", "payment_date_changed", "auto_renewal_changed")
+DIGEST_TYPE = "subscription_digest"
+DIGEST_TITLE = "Несколько изменений"
+
+
+def digest_key(user_id: int, subscription_id: int, window_seconds: int = None, now: float = None) -> str:
+    """Ключ окна дайджеста; окна выровнены по эпохе (для суток — календарный день UTC)"""
+    window = window_seconds or DIGEST_WINDOW_SECONDS
+    bucket = int(now if now is not None else time.time()) // window
+    return f"{user_id}:{subscription_id}:{bucket}"
 
 
 class NotificationService:
@@ -11,42 +32,219 @@ class NotificationService:
     @staticmethod
     def create_notification(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             notification_type: str,
             title: str,
-            message: str
+            message: str,
+            digest: bool = None,
+            dedupe_key: str = None
     ) -> dict:
-        """Базовая функция создания уведомления"""
+        """
+        Базовая функция создания уведомления.
+        digest — сливать ли событие в дайджест подписки (по умолчанию NOTIFICATION_DIGEST).
+        dedupe_key — не больше одного уведомления с таким ключом: если оно уже есть,
+        ничего не меняется и возвращается None
+        """
+        if digest is None:
+            digest = DIGEST_ENABLED
+        if digest and notification_type in DIGEST_TYPES:
+            return NotificationService._merge_into_digest(
+                db, user_id, subscription_id, notification_type, title, message
+            )
 
         notification = Notification(
-            id=str(uuid.uuid4()),
             user_id=user_id,
             subscription_id=subscription_id,
             type=notification_type,
             title=title,
             message=message,
             read=False,
-            scheduled_date=datetime.now()
+            scheduled_date=datetime.now(),
+            dedupe_key=dedupe_key
         )
 
         db.add(notification)
-        db.commit()
+        # Счетчик бейджа меняется в той же транзакции, что и само уведомление
+        increment_unread(db, user_id, subscription_id)
+        notification.sync_seq = bump_versions(db, user_id, NOTIFICATIONS)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Ключ занят: то же событие уже записал другой процесс, счетчик откатывается вместе с ним
+            db.rollback()
+            if dedupe_key is None:
+                raise
+            return None
         db.refresh(notification)
 
+        # Подключенные клиенты получают уведомление сразу, без опроса
+        broker.publish(user_id, "notification", {
+            "id": str(notification.id),
+            "subscription_id": notification.subscription_id,
+            "type": notification.type,
+            "title": notification.title,
+            "message": notification.message,
+            "read": False,
+            "created_at": notification.created_at.isoformat() if notification.created_at else None,
+            "unread_delta": 1
+        })
+
         return {
-            "id": notification.id,
+            "id": str(notification.id),
             "type": notification.type,
             "title": notification.title,
             "message": notification.message
         }
 
+    @staticmethod
+    def _merge_into_digest(
+            db: Session,
+            user_id: int,
+            subscription_id: int,
+            notification_type: str,
+            title: str,
+            message: str
+    ) -> dict:
+        """
+        Upsert по dedupe_key: одна строка на (пользователь, подписка, окно).
+        Непрочитанный дайджест дополняется новой строкой сообщения, счетчик не меняется.
+        Прочитанный (или отсутствующий) заменяется новым событием и снова становится
+        непрочитанным: бейдж растет на 1, как при обычном создании уведомления
+        """
+        key = digest_key(user_id, subscription_id)
+        now = datetime.now()
+
+        # Номер изменения нужен до записи строки; upsert версии берет блокировку записи,
+        # поэтому между ним, UPDATE и INSERT строку дайджеста никто не изменит
+        seq = bump_versions(db, user_id, NOTIFICATIONS)
+        merged = db.execute(
+            update(Notification).where(and_(
+                Notification.dedupe_key == key,
+                Notification.read == False
+            )).values(
+                type=DIGEST_TYPE,
+                title=DIGEST_TITLE,
+                message=Notification.message + "\n" + message,
+                scheduled_date=now,
+                created_at=func.now(),
+                sync_seq=seq
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+        if not merged:
+            # Прочитанный дайджест окна заменяется новым событием, иначе — новая строка
+            replacement = {
+                "type": notification_type,
+                "title": title,
+                "message": message,
+                "read": False,
+                "scheduled_date": now,
+                "sync_seq": seq
+            }
+            upsert = upsert_insert(db, Notification)
+            if upsert is not None:
+                db.execute(upsert.values(
+                    user_id=user_id, subscription_id=subscription_id, dedupe_key=key, **replacement
+                ).on_conflict_do_update(
+                    index_elements=[Notification.dedupe_key],
+                    set_={**replacement, "created_at": func.now()}
+                ))
+            elif not db.execute(
+                update(Notification).where(Notification.dedupe_key == key)
+                .values(**replacement, created_at=func.now())
+                .execution_options(synchronize_session=False)
+            ).rowcount:
+                db.execute(insert(Notification).values(
+                    user_id=user_id, subscription_id=subscription_id, dedupe_key=key, **replacement
+                ))
+            increment_unread(db, user_id, subscription_id)
+
+        db.commit()
+        notification = db.query(Notification).filter(Notification.dedupe_key == key).one()
+
+        broker.publish(user_id, "notification", {
+            "id": str(notification.id),
+            "subscription_id": notification.subscription_id,
+            "type": notification.type,
+            "title": notification.title,
+            "message": notification.message,
+            "read": False,
+            "created_at": notification.created_at.isoformat() if notification.created_at else None,
+            "unread_delta": 0 if merged else 1
+        })
+
+        return {
+            "id": str(notification.id),
+            "type": notification.type,
+            "title": notification.title,
+            "message": notification.message
+        }
+
+    @staticmethod
+    def mark_read(db: Session, user_id: int, *criteria) -> dict:
+        """
+        Помечает непрочитанные уведомления пользователя прочитанными одним UPDATE
+        и в той же транзакции уменьшает счетчики бейджей.
+        criteria — дополнительные условия (список id, подписка, дата).
+        Возвращает {subscription_id: сколько помечено}
+        """
+        condition = and_(
+            Notification.user_id == user_id,
+            Notification.read == False,
+            *criteria
+        )
+        # Номер изменения для /api/sync выдается заранее в точке сохранения; если
+        # помечать нечего, откатывается только она, и версии не меняются. Остальное
+        # в сессии вызывающего кода (например, операции атомарного пакета) не трогаем
+        savepoint = db.begin_nested()
+        seq = bump_versions(db, user_id, NOTIFICATIONS)
+
+        if db.get_bind().dialect.update_returning:
+            # UPDATE ... RETURNING: затронутые подписки без отдельного SELECT
+            rows = db.execute(
+                update(Notification).where(condition).values(read=True, sync_seq=seq)
+                .returning(Notification.subscription_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            changed = {}
+            for (subscription_id,) in rows:
+                changed[subscription_id] = changed.get(subscription_id, 0) + 1
+        else:
+            changed = dict(db.query(
+                Notification.subscription_id, func.count()
+            ).filter(condition).group_by(Notification.subscription_id).all())
+            db.execute(
+                update(Notification).where(condition).values(read=True, sync_seq=seq)
+                .execution_options(synchronize_session=False)
+            )
+
+        if not changed:
+            savepoint.rollback()
+            return changed
+
+        if criteria:
+            for subscription_id, count in changed.items():
+                increment_unread(db, user_id, subscription_id, -count)
+        else:
+            reset_unread(db, user_id)
+
+        db.commit()
+
+        for subscription_id, count in changed.items():
+            broker.publish(user_id, "unread", {
+                "subscription_id": subscription_id,
+                "unread_delta": -count
+            })
+
+        return changed
+
     # ===== СПЕЦИФИЧНЫЕ УВЕДОМЛЕНИЯ =====
 
     @staticmethod
     def for_subscription_created(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             subscription_name: str,
             amount: float,
@@ -71,7 +269,7 @@ class NotificationService:
     @staticmethod
     def for_price_changed(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             subscription_name: str,
             old_amount: float,
@@ -100,7 +298,7 @@ class NotificationService:
     @staticmethod
     def for_payment_date_changed(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             subscription_name: str,
             old_date: date,
@@ -120,12 +318,13 @@ class NotificationService:
     @staticmethod
     def for_payment_soon(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             subscription_name: str,
             payment_date: date,
             amount: float,
-            days_left: int
+            days_left: int,
+            dedupe_key: str = None
     ):
         """Уведомление о скором платеже (заранее)"""
         days_text = "день" if days_left == 1 else "дня" if 2 <= days_left <= 4 else "дней"
@@ -137,13 +336,14 @@ class NotificationService:
             notification_type="payment_reminder",
             title="Скоро списание",
             message=f"Через {days_left} {days_text} ({payment_date.strftime('%d.%m.%Y')}) "
-                    f"спишется {amount} руб. за '{subscription_name}'"
+                    f"спишется {amount} руб. за '{subscription_name}'",
+            dedupe_key=dedupe_key
         )
 
     @staticmethod
     def for_auto_renewal_changed(
             db: Session,
-            user_id: str,
+            user_id: int,
             subscription_id: int,
             subscription_name: str,
             auto_renewal: bool
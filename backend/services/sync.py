@@ -0,0 +1,165 @@
+# backend/services/sync.py
+"""
+Дельта-синхронизация для офлайн-клиентов (GET /api/sync).
+
+Каждая запись данных пользователя получает номер из UserDataVersion.change_seq
+(его выдает bump_versions) и помечает им измененные строки: "syncSeq" подписок
+и истории цен, sync_seq уведомлений. Удаленные строки и архивированные подписки
+оставляют надгробия в sync_tombstones с тем же номером. Токен синхронизации —
+последний выданный номер: ответ на since=<токен> содержит только строки и
+надгробия с большим номером, поэтому его размер зависит от числа изменений,
+а не от размера аккаунта.
+
+Номера, а не updatedAt/createdAt: created_at уведомлений ставит сервер БД с
+точностью до секунды, а смена read и закрытие периода цены не меняют ни одной
+временной метки. Сами метки клиент получает в строках как раньше.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.notification import Notification
+from backend.models.subscription import PriceHistory, Subscription
+from backend.models.sync import SyncTombstone
+from backend.models.user import UserDataVersion
+
+TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "90"))
+
+SUBSCRIPTION = "subscription"
+PRICE_HISTORY = "price_history"
+NOTIFICATION = "notification"
+
+DELETED = "deleted"
+ARCHIVED = "archived"
+
+# Модель -> (имя сущности в ответе, колонка номера изменения)
+SYNCED_MODELS = {
+    Subscription: (SUBSCRIPTION, "syncSeq"),
+    PriceHistory: (PRICE_HISTORY, "syncSeq"),
+    Notification: (NOTIFICATION, "sync_seq"),
+}
+
+
+def stamp(seq: int, *objects):
+    """Помечает ORM-объекты номером изменения; None пропускаются"""
+    for obj in objects:
+        if obj is not None:
+            setattr(obj, SYNCED_MODELS[type(obj)][1], seq)
+
+
+def stamp_subscription(db: Session, seq: int, subscription_id: int):
+    """
+    Помечает подписку и всю ее историю цен одним номером без загрузки объектов —
+    для строк, записанных в предыдущих транзакциях той же операции
+    """
+    for model, column in ((Subscription, Subscription.id), (PriceHistory, PriceHistory.subscriptionId)):
+        db.execute(
+            update(model).where(column == subscription_id).values(syncSeq=seq)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def add_tombstones(db: Session, user_id: int, seq: int, entity: str, ids, reason: str = DELETED):
+    rows = [
+        {"user_id": int(user_id), "seq": seq, "entity": entity, "entity_id": int(entity_id), "reason": reason}
+        for entity_id in ids
+    ]
+    if rows:
+        db.execute(insert(SyncTombstone), rows)
+
+
+def stamp_session(db: Session, user_id: int, seq: int):
+    """
+    Помечает номером seq все новые и измененные синхронизируемые объекты сессии,
+    для удаленных добавляет надгробия. Вызывается перед коммитом записи
+    """
+    for obj in list(db.new) + list(db.dirty):
+        if type(obj) in SYNCED_MODELS:
+            stamp(seq, obj)
+    deleted = {}
+    for obj in db.deleted:
+        if type(obj) in SYNCED_MODELS and obj.id is not None:
+            deleted.setdefault(SYNCED_MODELS[type(obj)][0], []).append(obj.id)
+    for entity, ids in deleted.items():
+        add_tombstones(db, user_id, seq, entity, ids)
+
+
+def collect_changes(db: Session, user_id: int, since: int = None) -> dict:
+    """
+    Изменения пользователя после номера since; since=None — полный снимок.
+    Токен читается первым: все изменения с номером не больше него уже закоммичены
+    и попадут в ответ, более поздние могут попасть повторно — клиент применяет их идемпотентно
+    """
+    row = db.query(
+        UserDataVersion.change_seq, UserDataVersion.sync_floor
+    ).filter(UserDataVersion.user_id == user_id).first()
+    seq, floor = row if row else (0, 0)
+
+    # Надгробия старше since уже удалены или токен от другой базы: только полный снимок
+    full = since is None or since < floor or since > seq
+
+    subscriptions = db.query(Subscription).filter(
+        Subscription.userId == user_id,
+        Subscription.archivedDate.is_(None)
+    )
+    # Запись истории цен всегда меняется вместе с подпиской и тем же номером,
+    # поэтому условие по подписке отсекает неизменившиеся подписки по индексу userId
+    prices = db.query(PriceHistory).join(
+        Subscription, Subscription.id == PriceHistory.subscriptionId
+    ).filter(
+        Subscription.userId == user_id,
+        Subscription.archivedDate.is_(None)
+    )
+    notifications = select(
+        Notification.id, Notification.user_id, Notification.subscription_id, Notification.type,
+        Notification.title, Notification.message, Notification.scheduled_date, Notification.read,
+        Notification.created_at
+    ).where(Notification.user_id == user_id)
+
+    if not full:
+        subscriptions = subscriptions.filter(Subscription.syncSeq > since)
+        prices = prices.filter(Subscription.syncSeq > since, PriceHistory.syncSeq > since)
+        notifications = notifications.where(Notification.sync_seq > since)
+
+    deleted = []
+    if not full:
+        deleted = db.query(
+            SyncTombstone.entity, SyncTombstone.entity_id, SyncTombstone.reason, SyncTombstone.seq
+        ).filter(
+            SyncTombstone.user_id == user_id,
+            SyncTombstone.seq > since
+        ).order_by(SyncTombstone.seq).all()
+
+    return {
+        "seq": seq,
+        "full": full,
+        "subscriptions": subscriptions.order_by(Subscription.id).all(),
+        "price_history": prices.order_by(PriceHistory.id).all(),
+        "notifications": db.execute(notifications.order_by(Notification.id)).all(),
+        "deleted": deleted,
+    }
+
+
+def prune_tombstones(db: Session, older_than_days: int = TOMBSTONE_DAYS, now: datetime = None) -> int:
+    """
+    Удаляет надгробия старше older_than_days. Номер последнего удаленного
+    надгробия пользователя становится sync_floor: токены старше него получат полный снимок
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    old = SyncTombstone.created_at < cutoff
+
+    floors = db.query(SyncTombstone.user_id, func.max(SyncTombstone.seq)).filter(old).group_by(
+        SyncTombstone.user_id
+    ).all()
+    for user_id, seq in floors:
+        db.execute(
+            update(UserDataVersion).where(and_(
+                UserDataVersion.user_id == user_id,
+                UserDataVersion.sync_floor < seq
+            )).values(sync_floor=seq)
+        )
+    deleted = db.execute(delete(SyncTombstone).where(old)).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,121 @@
+# backend/services/unread_counters.py
+"""Поддержка таблицы счетчиков непрочитанных уведомлений"""
+from sqlalchemy import func, case, insert, update
+from sqlalchemy.orm import Session
+
+from backend.models.notification import Notification, NotificationCounter
+from backend.models.subscription import Subscription
+from backend.utils.dialects import greatest, upsert_insert
+
+
+def increment_unread(db: Session, user_id: int, subscription_id: int, delta: int = 1):
+    """
+    Изменяет счетчик на delta в текущей транзакции (upsert).
+    Коммит остается за вызывающим кодом, чтобы счетчик и уведомления менялись атомарно
+    """
+    unread_count = greatest(NotificationCounter.unread_count + delta, 0)
+    upsert = upsert_insert(db, NotificationCounter)
+    if upsert is not None:
+        db.execute(upsert.values(
+            user_id=int(user_id),
+            subscription_id=subscription_id,
+            unread_count=max(delta, 0)
+        ).on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id, NotificationCounter.subscription_id],
+            set_={"unread_count": unread_count}
+        ))
+        return
+
+    updated = db.execute(
+        update(NotificationCounter).where(
+            NotificationCounter.user_id == int(user_id),
+            NotificationCounter.subscription_id == subscription_id
+        ).values(unread_count=unread_count).execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.execute(insert(NotificationCounter).values(
+            user_id=int(user_id), subscription_id=subscription_id, unread_count=max(delta, 0)
+        ))
+
+
+def reset_unread(db: Session, user_id: int, subscription_id: int = None):
+    """Обнуляет счетчики пользователя (всех подписок или одной) в текущей транзакции"""
+    query = db.query(NotificationCounter).filter(NotificationCounter.user_id == int(user_id))
+    if subscription_id is not None:
+        query = query.filter(NotificationCounter.subscription_id == subscription_id)
+    query.update({"unread_count": 0}, synchronize_session=False)
+
+
+def get_unread_count(db: Session, user_id: int, subscription_id: int) -> int:
+    """Бейдж одной подписки: чтение по первичному ключу"""
+    counter = db.get(NotificationCounter, (int(user_id), subscription_id))
+    return counter.unread_count if counter else 0
+
+
+def get_unread_counts(db: Session, user_id: int, active_only: bool = False) -> dict:
+    """
+    Все бейджи пользователя одним чтением по первичному ключу: {subscription_id: count}.
+    active_only — только подписки, которые не в архиве (и не удалены)
+    """
+    query = db.query(
+        NotificationCounter.subscription_id,
+        NotificationCounter.unread_count
+    ).filter(NotificationCounter.user_id == int(user_id))
+    if active_only:
+        query = query.join(Subscription, Subscription.id == NotificationCounter.subscription_id).filter(
+            Subscription.archivedDate.is_(None)
+        )
+    return {subscription_id: count for subscription_id, count in query.all()}
+
+
+def _actual_unread_counts(db: Session, user_id: int = None) -> dict:
+    """Фактические значения из таблицы notifications: {(user_id, subscription_id): count}"""
+    query = db.query(
+        Notification.user_id,
+        Notification.subscription_id,
+        func.sum(case((Notification.read == False, 1), else_=0))
+    )
+    if user_id is not None:
+        query = query.filter(Notification.user_id == user_id)
+    rows = query.group_by(Notification.user_id, Notification.subscription_id).all()
+    return {(uid, sub_id): count or 0 for uid, sub_id, count in rows}
+
+
+def check_unread_counters(db: Session, user_id: int = None) -> list:
+    """
+    Сверяет счетчики с таблицей notifications.
+    Возвращает список расхождений (user_id, subscription_id, stored, actual)
+    """
+    actual = _actual_unread_counts(db, user_id)
+
+    query = db.query(NotificationCounter)
+    if user_id is not None:
+        query = query.filter(NotificationCounter.user_id == int(user_id))
+    stored = {(c.user_id, c.subscription_id): c.unread_count for c in query.all()}
+
+    mismatches = []
+    for key in sorted(set(actual) | set(stored)):
+        stored_count = stored.get(key, 0)
+        actual_count = actual.get(key, 0)
+        if stored_count != actual_count:
+            mismatches.append((key[0], key[1], stored_count, actual_count))
+    return mismatches
+
+
+def repair_unread_counters(db: Session, user_id: int = None) -> list:
+    """Исправляет расхождения и коммитит; возвращает исправленные записи"""
+    mismatches = check_unread_counters(db, user_id)
+    for uid, subscription_id, _, actual_count in mismatches:
+        db.merge(NotificationCounter(
+            user_id=uid,
+            subscription_id=subscription_id,
+            unread_count=actual_count
+        ))
+    db.commit()
+    return mismatches
+
+
+def backfill_unread_counters(db: Session):
+    """Заполняет пустую таблицу счетчиков для существующей базы"""
+    if db.query(NotificationCounter).first() is None and db.query(Notification).first() is not None:
+        repair_unread_counters(db)
@@ -0,0 +1,238 @@
+# backend/services/write_queue.py
+"""
+Очередь записей с одним потоком-писателем (WRITE_QUEUE=1, по умолчанию выключена).
+
+SQLite пропускает одного писателя за раз: при всплеске записей обработчики в пуле
+потоков ждут блокировку файла каждый в своем соединении, а не дождавшиеся за
+таймаут падают с "database is locked". С очередью записывающие обработчики
+(декоратор serialized_write) не ходят в базу сами, а отдают свое тело потоку-
+писателю. Тот забирает из очереди всё накопившееся и выполняет одной транзакцией
+(BEGIN IMMEDIATE): каждая запись — в своей точке сохранения, коммиты обработчика
+становятся вложенными точками сохранения (как в атомарном /api/batch), а на всю
+пачку — один COMMIT и один fsync. Ошибка одной записи откатывает только ее точку
+сохранения; события SSE/WebSocket публикуются после общего коммита.
+
+Чтения идут мимо очереди в своих соединениях; с очередью база переводится в режим
+WAL (см. database.SQLITE_WAL), и чтения не ждут писателя.
+
+С шардами (database.SHARDS) у каждого шарда своя очередь и свой писатель: записи
+разных шардов идут параллельно.
+
+Очередь своя у каждого процесса: под несколькими воркерами (backend.serve) писатели
+разных процессов по-прежнему делят блокировку файла, но их не больше числа воркеров.
+Атомарный /api/batch, регистрация и фоновые задачи пишут в обход очереди: они ждут
+блокировку в своем соединении, под непрерывным потоком записей — паузы между
+пачками писателя (не дольше таймаута SQLite, 5 с).
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from contextvars import copy_context
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import user_engines
+from backend.services.notification_events import broker
+from backend.utils.metrics import WRITE_QUEUE_COMMITS, WRITE_QUEUE_JOBS
+
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE", "0") == "1"
+# Больше записей в одной транзакции — меньше fsync, но дольше ждет первая из них
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+# Окно сбора пачки после первой записи, мс; 0 — брать только то, что уже в очереди
+WRITE_QUEUE_WAIT_MS = float(os.getenv("WRITE_QUEUE_WAIT_MS", "0"))
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteJob:
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+        # Контекст запроса (лог, учет запросов) переезжает вместе с записью в поток-писатель
+        self.context = copy_context()
+
+
+class WriteQueue:
+    """Поток-писатель: выполняет fn(session) из очереди пачками, одним коммитом на пачку"""
+
+    def __init__(self, engine: Engine, max_batch: int = WRITE_QUEUE_MAX_BATCH,
+                 wait_ms: float = WRITE_QUEUE_WAIT_MS):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_writer(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def start(self) -> "WriteQueue":
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10):
+        """Дописывает то, что уже в очереди, и останавливает поток"""
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, fn) -> Future:
+        """Ставит fn(session) в очередь; результат или исключение fn — в Future"""
+        job = WriteJob(fn)
+        self._queue.put(job)
+        return job.future
+
+    def _run(self):
+        # Свое соединение на всё время работы, взятое до первых запросов: писатель
+        # не ждет пул наравне с запросами
+        connection = self.engine.connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            if self.wait and batch[0] is not _STOP:
+                try:
+                    batch.append(self._queue.get(timeout=self.wait))
+                except queue.Empty:
+                    pass
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [job for job in batch if job is not _STOP]
+            if not batch:
+                continue
+            try:
+                connection = connection or self.engine.connect()
+                self._execute(connection, batch)
+            except BaseException as e:
+                logger.exception("Ошибка пачки записей")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                if connection is not None:
+                    connection.close()
+                    connection = None
+        if connection is not None:
+            connection.close()
+
+    def _execute(self, connection, batch: list):
+        done = []
+        transaction = connection.begin()
+        if connection.dialect.name == "sqlite":
+            # Как в атомарном /api/batch: pysqlite не открывает транзакцию до первой
+            # записи, и RELEASE первой точки сохранения закоммитил бы ее
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        for job in batch:
+            savepoint = connection.begin_nested()
+            db = Session(bind=connection, join_transaction_mode="create_savepoint",
+                         autocommit=False, autoflush=False)
+            try:
+                result, events = job.context.run(self._call, job.fn, db)
+            except BaseException as e:
+                db.close()
+                savepoint.rollback()
+                job.future.set_exception(e)
+                continue
+            # Объекты в результате остаются с загруженными атрибутами, но без сессии
+            db.close()
+            savepoint.commit()
+            done.append((job, result, events))
+        transaction.commit()
+
+        WRITE_QUEUE_COMMITS.inc()
+        WRITE_QUEUE_JOBS.inc(value=len(batch))
+        for job, result, events in done:
+            for event in events:
+                broker.publish(*event)
+            job.future.set_result(result)
+
+    @staticmethod
+    def _call(fn, db: Session):
+        with broker.hold() as events:
+            return fn(db), events
+
+
+# По очереди на базу с данными пользователей: одна без шардов, иначе — на каждый шард
+write_queues = [WriteQueue(user_engine) for user_engine in user_engines()]
+
+
+def start_write_queues():
+    for each in write_queues:
+        each.start()
+
+
+def stop_write_queues():
+    for each in write_queues:
+        each.stop()
+
+
+def queue_for(db: Session):
+    """Очередь базы, в которую пишет сессия; None — писать в обход очереди"""
+    bind = db.get_bind()
+    # Сессия, привязанная к соединению, уже внутри внешней транзакции (атомарный /api/batch)
+    if not isinstance(bind, Engine) or any(each.in_writer() for each in write_queues):
+        return None
+    return next((each for each in write_queues if each.engine is bind and each.running), None)
+
+
+def run_coroutine(coroutine):
+    """
+    Выполняет корутину обработчика в потоке-писателе. Записывающие async-обработчики
+    работают с базой синхронно и ничего не ждут — им хватает одного шага
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("Обработчик в очереди записей не может ждать внутри записи")
+
+
+def serialized_write(endpoint):
+    """
+    Декоратор записывающего обработчика: при включенной очереди обработчик целиком
+    выполняется в потоке-писателе с его сессией вместо db из запроса; иначе — как есть
+    (синхронный — в пуле потоков, как его вызвал бы FastAPI). Ставится под декоратором
+    маршрута.
+
+    Запись ждут в цикле событий, а не в пуле потоков, и сессию запроса перед этим
+    закрывают: иначе ждущие писателя запросы держат потоки и соединения, а новые
+    запросы в get_current_user ждут соединение из пула, которое не освободится.
+    Загруженный сессией пользователь остается со своими атрибутами, но без сессии
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        def call(session, args, kwargs):
+            return run_coroutine(endpoint(*args, db=session, **kwargs))
+    else:
+        def call(session, args, kwargs):
+            return endpoint(*args, db=session, **kwargs)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, db: Session, **kwargs):
+        target = queue_for(db)
+        if target is None:
+            if inspect.iscoroutinefunction(endpoint):
+                return await endpoint(*args, db=db, **kwargs)
+            return await run_in_threadpool(endpoint, *args, db=db, **kwargs)
+        db.close()
+        return await asyncio.wrap_future(target.submit(lambda session: call(session, args, kwargs)))
+    return wrapper
@@ -0,0 +1,34 @@
+# backend/test_batch.py
+"""Пакет записей (POST /api/batch) без atomic: ошибка одной операции не ломает следующие"""
+from sqlalchemy import select
+
+from backend.database import user_session
+from backend.models.subscription import Subscription
+from backend.routes import batch
+
+
+def test_failed_flush_does_not_break_later_operations(client, make_user, monkeypatch):
+    user_id, headers = make_user(subscriptions=2)
+    with user_session(user_id) as db:
+        first, second = db.scalars(
+            select(Subscription.id).where(Subscription.userId == user_id).order_by(Subscription.id)
+        )
+
+    def failing_archive(subscription_id: int, current_user=None, db=None):
+        # Вставка с занятым ключом: flush падает, обработчик не откатывает сессию
+        db.add(Subscription(id=subscription_id, userId=current_user.id, name="duplicate",
+                            currentAmount=1, category="other"))
+        db.flush()
+
+    route = next(route for method, route in batch._routes if route.path.endswith("/archive"))
+    monkeypatch.setattr(route, "endpoint", failing_archive)
+
+    response = client.post("/api/batch", headers=headers, json={"operations": [
+        {"id": "fail", "method": "PATCH", "path": f"/api/subscriptions/{first}/archive"},
+        {"id": "update", "method": "PATCH", "path": f"/api/subscriptions/{second}", "body": {"currentAmount": 777}},
+    ]})
+    assert response.status_code == 200, response.text
+    results = {result["id"]: result for result in response.json()["results"]}
+    assert results["fail"]["status"] == 500
+    assert results["update"]["status"] == 200, results["update"]
+    assert results["update"]["body"]["currentAmount"] == 777
@@ -0,0 +1,17 @@
+# backend/test_dashboard.py
+"""Главный экран: бейджи только активных подписок"""
+from backend.database import user_session
+from backend.models.subscription import Subscription
+
+
+def test_unread_counts_skip_archived(client, make_user):
+    user_id, headers = make_user(subscriptions=3, notifications=9, read_ratio=0)
+    with user_session(user_id) as db:
+        sub_ids = [row[0] for row in db.query(Subscription.id).filter(Subscription.userId == user_id)]
+
+    archived = sub_ids[0]
+    assert client.patch(f"/api/subscriptions/{archived}/archive", headers=headers).status_code == 200
+
+    body = client.get("/api/dashboard", headers=headers).json()
+    assert set(body["unread_counts"]) == {str(sub_id) for sub_id in sub_ids[1:]}
+    assert body["total_unread"] == 6
@@ -0,0 +1,78 @@
+# backend/test_etags.py
+"""Условные GET: ETag, ответ 304 без основного запроса и устаревание после записи"""
+import pytest
+
+from backend.benchmarks.check_etags import NOT_MODIFIED_QUERIES
+from backend.database import user_session
+from backend.models.subscription import Subscription
+from backend.services.notifications_service import NotificationService
+
+
+@pytest.fixture
+def user(make_user):
+    user_id, headers = make_user(subscriptions=2)
+    with user_session(user_id) as db:
+        sub_id = db.query(Subscription.id).filter(Subscription.userId == user_id).order_by(Subscription.id).first()[0]
+    return user_id, headers, sub_id
+
+
+def reads(sub_id: int) -> list:
+    return [
+        "/api/subscriptions",
+        "/api/subscriptions?archived=true",
+        f"/api/subscriptions/{sub_id}",
+        f"/api/subscriptions/{sub_id}/price-history",
+        "/notifications/grouped",
+    ]
+
+
+def etag_of(client, headers: dict, path: str) -> str:
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers.get("etag")
+    return response.headers["etag"]
+
+
+def is_fresh(client, headers: dict, path: str, etag: str) -> bool:
+    response = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert response.status_code in (200, 304)
+    return response.status_code == 304
+
+
+def test_not_modified_skips_main_query(client, user, query_budget):
+    _, headers, sub_id = user
+    for path in reads(sub_id):
+        etag = etag_of(client, headers, path)
+        with query_budget(NOT_MODIFIED_QUERIES):
+            response = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304 and not response.content, path
+
+
+def test_subscription_write_invalidates_all_reads(client, user):
+    _, headers, sub_id = user
+    etags = {path: etag_of(client, headers, path) for path in reads(sub_id)}
+
+    response = client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json={"currentAmount": 250})
+    assert response.status_code == 200, response.text
+
+    assert [path for path, etag in etags.items() if is_fresh(client, headers, path, etag)] == []
+
+
+def test_notification_write_invalidates_only_grouped(client, user):
+    user_id, headers, sub_id = user
+    etags = {path: etag_of(client, headers, path) for path in reads(sub_id)}
+
+    with user_session(user_id) as db:
+        NotificationService.create_notification(db, user_id, sub_id, "price_changed", "Проверка", "ETag")
+
+    stale = [path for path, etag in etags.items() if not is_fresh(client, headers, path, etag)]
+    assert stale == ["/notifications/grouped"]
+
+
+def test_read_all_without_unread_keeps_etags(client, user):
+    _, headers, sub_id = user
+    etags = {path: etag_of(client, headers, path) for path in reads(sub_id)}
+
+    assert client.post("/notifications/read-all", headers=headers).status_code == 200
+
+    assert all(is_fresh(client, headers, path, etag) for path, etag in etags.items())
@@ -0,0 +1,33 @@
+# backend/test_jobs.py
+"""Фоновые задачи: состав по умолчанию и автопродление"""
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from backend.database import user_session
+from backend.models.subscription import Subscription
+from backend.services import jobs
+
+
+@pytest.mark.skipif("AUTO_RENEWALS" in os.environ, reason="проверяется значение по умолчанию")
+def test_auto_renewals_are_opt_in():
+    assert not jobs.AUTO_RENEWALS_ENABLED
+    assert [name for name, _, _ in jobs.JOBS] == ["payment_reminders"]
+
+
+def test_renew_overdue_moves_payment_date_forward(make_user):
+    user_id, _ = make_user(subscriptions=2)
+    today = date.today()
+    with user_session(user_id) as db:
+        renewed, manual = db.query(Subscription).filter(Subscription.userId == user_id).order_by(Subscription.id)
+        renewed.autoRenewal, renewed.nextPaymentDate = True, today - timedelta(days=40)
+        manual.nextPaymentDate = today - timedelta(days=40)
+        db.commit()
+        ids = renewed.id, manual.id
+
+        assert jobs.renew_overdue_subscriptions(db, today) >= 1
+        dates = dict(db.query(Subscription.id, Subscription.nextPaymentDate).filter(Subscription.id.in_(ids)))
+
+    assert today <= dates[ids[0]] < today + timedelta(days=31)
+    assert dates[ids[1]] == today - timedelta(days=40)
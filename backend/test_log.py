@@ -0,0 +1,30 @@
+# backend/test_log.py
+"""Логирование в форкнутых воркерах (backend.serve)"""
+import logging
+import os
+
+import pytest
+
+from backend.utils.log import setup_logging, stop_logging
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен fork")
+def test_forked_worker_logs_through_own_listener(tmp_path):
+    setup_logging()  # настройка "мастера", как при импорте приложения до форка
+    path = tmp_path / "worker.log"
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            with open(path, "w") as stream:
+                setup_logging(fmt="text", stream=stream)
+                logging.getLogger("backend.worker").warning("запись воркера")
+                stop_logging()
+            code = 0
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert "запись воркера" in path.read_text()
@@ -0,0 +1,53 @@
+# backend/test_metrics.py
+"""/metrics: токен и сумма снимков нескольких воркеров (METRICS_DIR)"""
+import os
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routes import metrics as metrics_route
+from backend.utils import metrics
+
+OTHER_PID = 2 ** 22 + 1  # "воркер", которого нет: его снимок пишет сам тест
+LABELS = ["GET", "/test-metrics", "200"]
+
+
+def value(text: str, line: str) -> float:
+    match = re.search(rf"^{re.escape(line)} (\S+)$", text, re.M)
+    return float(match[1]) if match else 0.0
+
+
+def test_token_required_when_configured(monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "secret")
+    app = FastAPI()
+    app.include_router(metrics_route.router)
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200 and "# TYPE http_requests_total counter" in response.text
+
+
+def test_snapshots_are_summed_and_archived_without_gauges(tmp_path):
+    directory = str(tmp_path)
+    requests = 'http_requests_total{method="GET",route="/test-metrics",status="200"}'
+    in_flight = "http_requests_in_flight"
+    own_requests = value(metrics.registry.render(), requests)
+    own_in_flight = value(metrics.registry.render(), in_flight)
+
+    metrics._write_json(metrics._snapshot_path(directory, OTHER_PID), {
+        "http_requests_total": [[LABELS, 5]],
+        "http_requests_in_flight": [[[], 2]],
+    })
+    text = metrics.render_snapshots(directory)
+    assert value(text, requests) == own_requests + 5
+    assert value(text, in_flight) == own_in_flight + 2
+
+    # Воркер завершился: счетчик остается в сумме, датчик — нет
+    metrics.archive_snapshot(OTHER_PID, directory)
+    text = metrics.render_snapshots(directory)
+    assert value(text, requests) == own_requests + 5
+    assert value(text, in_flight) == own_in_flight
+    assert {path.name for path in tmp_path.glob("*.json")} == {metrics.ARCHIVE_SNAPSHOT, f"{os.getpid()}.json"}
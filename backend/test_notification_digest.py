@@ -0,0 +1,79 @@
+# backend/test_notification_digest.py
+"""Уведомления об изменении подписки и их слияние в дайджест (NOTIFICATION_DIGEST)"""
+import pytest
+
+from backend.database import user_session
+from backend.models.notification import Notification
+from backend.models.subscription import Subscription
+from backend.services import notifications_service
+from backend.services.notifications_service import DIGEST_TYPE, NotificationService
+from backend.services.unread_counters import get_unread_counts
+
+
+def first_subscription(user_id: int) -> int:
+    with user_session(user_id) as db:
+        return db.query(Subscription.id).filter(Subscription.userId == user_id).order_by(Subscription.id).first()[0]
+
+
+def notifications_of(user_id: int, subscription_id: int) -> tuple:
+    """(уведомления подписки по возрастанию id, бейдж непрочитанного)"""
+    with user_session(user_id) as db:
+        rows = db.query(Notification).filter(
+            Notification.subscription_id == subscription_id
+        ).order_by(Notification.id).all()
+        return rows, get_unread_counts(db, user_id).get(subscription_id, 0)
+
+
+@pytest.fixture
+def digest(monkeypatch):
+    monkeypatch.setattr(notifications_service, "DIGEST_ENABLED", True)
+
+
+def test_update_creates_change_notifications(client, make_user):
+    user_id, headers = make_user()
+    sub_id = first_subscription(user_id)
+
+    response = client.patch(f"/api/subscriptions/{sub_id}", headers=headers,
+                            json={"currentAmount": 999, "autoRenewal": True})
+    assert response.status_code == 200, response.text
+
+    rows, unread = notifications_of(user_id, sub_id)
+    assert sorted(row.type for row in rows) == ["auto_renewal_changed", "price_changed"]
+    assert unread == 2
+
+
+def test_update_without_changes_creates_nothing(client, make_user):
+    user_id, headers = make_user()
+    sub_id = first_subscription(user_id)
+
+    response = client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json={"notifyDays": 5})
+    assert response.status_code == 200, response.text
+    assert notifications_of(user_id, sub_id) == ([], 0)
+
+
+def test_digest_coalesces_updates(client, make_user, digest):
+    user_id, headers = make_user()
+    sub_id = first_subscription(user_id)
+
+    for body in ({"currentAmount": 300}, {"currentAmount": 350}, {"autoRenewal": True}):
+        assert client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json=body).status_code == 200
+
+    rows, unread = notifications_of(user_id, sub_id)
+    assert len(rows) == 1 and unread == 1
+    assert rows[0].type == DIGEST_TYPE
+    assert len(rows[0].message.splitlines()) == 3
+
+
+def test_read_digest_is_replaced_by_next_change(client, make_user, digest):
+    user_id, headers = make_user()
+    sub_id = first_subscription(user_id)
+
+    client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json={"currentAmount": 300})
+    with user_session(user_id) as db:
+        NotificationService.mark_read(db, user_id, Notification.subscription_id == sub_id)
+    client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json={"currentAmount": 400})
+
+    rows, unread = notifications_of(user_id, sub_id)
+    assert len(rows) == 1 and unread == 1
+    assert rows[0].type == "price_changed" and not rows[0].read
+    assert "400" in rows[0].message
@@ -0,0 +1,68 @@
+# backend/test_notifications.py
+"""Пометка уведомлений прочитанными: счетчики, версии данных и транзакция вызывающего кода"""
+from backend.database import user_session
+from backend.models.notification import Notification
+from backend.models.subscription import Subscription
+from backend.services.data_versions import get_versions
+from backend.services.notifications_service import NotificationService
+from backend.services.unread_counters import get_unread_counts
+
+
+def test_mark_read_updates_counters_and_version(make_user):
+    user_id, _ = make_user(subscriptions=2, notifications=6, read_ratio=0)
+    with user_session(user_id) as db:
+        before = get_versions(db, user_id)
+        changed = NotificationService.mark_read(db, user_id)
+        assert sum(changed.values()) == 6
+        assert not any(get_unread_counts(db, user_id).values())
+        assert get_versions(db, user_id).notifications == before.notifications + 1
+
+
+def test_mark_read_without_changes_keeps_caller_work(make_user):
+    user_id, _ = make_user(subscriptions=1)
+    with user_session(user_id) as db:
+        before = get_versions(db, user_id)
+        subscription = db.query(Subscription).filter(Subscription.userId == user_id).one()
+        subscription.currentAmount = 4321
+        db.flush()
+
+        assert NotificationService.mark_read(db, user_id, Notification.id == -1) == {}
+        db.commit()
+
+    with user_session(user_id) as db:
+        assert db.query(Subscription.currentAmount).filter(Subscription.userId == user_id).scalar() == 4321
+        assert get_versions(db, user_id) == before
+
+
+def test_stream_relay_resyncs_whenever_version_moves(make_user):
+    import asyncio
+
+    from backend.services.data_versions import NOTIFICATIONS, bump_versions
+    from backend.services.jobs import StreamRelay
+    from backend.services.notification_events import RESYNC_EVENT, broker
+
+    user_id, _ = make_user(subscriptions=1)
+    with user_session(user_id) as db:
+        sub_id = db.query(Subscription.id).filter(Subscription.userId == user_id).scalar()
+
+    async def scenario() -> list:
+        subscriber = broker.subscribe(user_id)
+        relay = StreamRelay()
+        try:
+            assert relay.poll() == 0  # первый проход только запоминает версии
+            # Запись этого процесса (событие уходит напрямую) и запись "другого воркера" —
+            # только версия в БД; в одном проходе релей обязан заметить вторую
+            with user_session(user_id) as db:
+                NotificationService.create_notification(db, user_id, sub_id, "price_changed", "Цена", "Выросла")
+                bump_versions(db, user_id, NOTIFICATIONS)
+                db.commit()
+            assert relay.poll() == 1
+            assert relay.poll() == 0
+            await asyncio.sleep(0)
+            return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+        finally:
+            broker.unsubscribe(subscriber)
+
+    events = asyncio.run(scenario())
+    assert [event["event"] for event in events] == ["notification", "resync"]
+    assert events[-1] == RESYNC_EVENT
@@ -0,0 +1,53 @@
+# backend/test_query_budgets.py
+"""
+Бюджеты SQL-запросов маршрутов (те же, что в benchmarks/check_query_budgets):
+по тесту на маршрут через фикстуру query_budget. Мутирующие маршруты идут в конце
+и работают с данными, которые оставили предыдущие
+"""
+import pytest
+from fastapi.routing import APIRoute, APIWebSocketRoute
+
+from backend.benchmarks.check_query_budgets import build_cases, seed
+
+# Шаблоны случаев без данных: функции запросов вызываются только в тесте
+CASES = build_cases({"user_id": 0, "sub_ids": [0, 0], "notification_ids": [0, 0]})
+
+
+@pytest.fixture(scope="module")
+def budget_data():
+    from backend.database import engine
+    from backend.utils.security import create_access_token
+
+    data = seed(engine)
+    token = create_access_token({"user_id": data["user_id"]}, 60)
+    return data, token, build_cases(data)
+
+
+@pytest.mark.parametrize("index", range(len(CASES)),
+                         ids=[f"{method} {template}" for method, template, _, _ in CASES])
+def test_route_budget(index, budget_data, client, query_budget):
+    from backend.routes.notifications import authenticate_stream
+
+    data, token, cases = budget_data
+    _, _, request, budget = cases[index]
+    with query_budget(budget):
+        if request == "stream":
+            # Поток бесконечный: вся работа с БД — проверка токена при подключении
+            authenticate_stream(token)
+            return
+        response = request(client, {"Authorization": f"Bearer {token}"})
+    assert response.status_code < 400, response.text
+
+
+def test_every_route_has_budget():
+    from backend.main import app
+
+    covered = {(method, template) for method, template, _, _ in CASES}
+    missing = [
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and not isinstance(route, APIWebSocketRoute)
+        for method in route.methods
+        if (method, route.path) not in covered
+    ]
+    assert not missing, f"нет бюджета: {missing}"
@@ -0,0 +1,65 @@
+# backend/test_shards.py
+"""Шарды (SHARDS > 1): отказ старта поверх несшардированных данных, имя подписки во всех шардах"""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED_SCRIPT = (
+    "from backend.benchmarks.common import seed_user; from backend.database import engine, init_db; "
+    "init_db(); seed_user(engine, 'unsharded@example.com', subscriptions=1)"
+)
+
+START_SCRIPT = "from backend.database import ensure_schema; ensure_schema()"
+
+# Два пользователя в разных шардах: имя, занятое первым, второй получить не может
+NAME_SCRIPT = """
+from fastapi.testclient import TestClient
+from backend.benchmarks.common import seed_user
+from backend.database import engine, init_db, shard_for
+from backend.main import app
+from backend.utils.security import create_access_token
+
+init_db()
+users = [seed_user(engine, f"shard{i}@example.com", subscriptions=1) for i in range(8)]
+first = users[0]
+second = next(user_id for user_id in users if shard_for(user_id) != shard_for(first))
+client = TestClient(app)
+body = {"name": "Shared", "currentAmount": 100, "category": "video"}
+for user_id in (first, second):
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+    print(client.post("/api/subscriptions", headers=headers, json=body).status_code)
+"""
+
+
+def run(script: str, db_path, shards: int) -> subprocess.CompletedProcess:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "SHARDS": str(shards), "LOG_LEVEL": "WARNING"}
+    return subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+
+
+def test_refuses_shards_over_unsharded_data(tmp_path):
+    db_path = tmp_path / "main.db"
+    seeded = run(SEED_SCRIPT, db_path, shards=1)
+    assert seeded.returncode == 0, seeded.stderr
+
+    started = run(START_SCRIPT, db_path, shards=2)
+    assert started.returncode != 0
+    assert "SHARDS=2" in started.stderr and "subscriptions" in started.stderr
+    assert not list(tmp_path.glob("main.shard*.db")), "шарды созданы до проверки"
+
+    # Без шардов база по-прежнему открывается
+    assert run(START_SCRIPT, db_path, shards=1).returncode == 0
+
+
+def test_empty_main_database_can_be_sharded(tmp_path):
+    db_path = tmp_path / "main.db"
+    assert run("from backend.database import init_db; init_db()", db_path, shards=1).returncode == 0
+    started = run(START_SCRIPT, db_path, shards=2)
+    assert started.returncode == 0, started.stderr
+
+
+def test_subscription_name_is_unique_across_shards(tmp_path):
+    result = run(NAME_SCRIPT, tmp_path / "main.db", shards=2)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-2:] == ["201", "400"]
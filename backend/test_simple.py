@@ -10,7 +10,6 @@ print("=" * 70)
 
 import sqlite3
 from datetime import datetime, timedelta
-import uuid
 
 db_path = "subscriptions.db"
 if not os.path.exists(db_path):
@@ -170,16 +169,14 @@ if should_notify == today_db:
             print(f"    ⚠️  Уведомление уже создано сегодня")
         else:
             # СОЗДАЕМ УВЕДОМЛЕНИЕ!
-            notification_id = str(uuid.uuid4())
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             cursor.execute("""
                 INSERT INTO notifications 
-                (id, user_id, subscription_id, type, title, message, scheduled_date, read, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (user_id, subscription_id, type, title, message, scheduled_date, read, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
-                notification_id,
-                str(user_id),
+                user_id,
                 sub_id,
                 "payment_reminder",
                 "Скоро списание",
@@ -188,10 +185,11 @@ if should_notify == today_db:
                 0,
                 now
             ))
+            notification_id = cursor.lastrowid
 
             created_count += 1
             print(f"    ✅ СОЗДАНО уведомление!")
-            print(f"       ID: {notification_id[:8]}...")
+            print(f"       ID: {notification_id}")
             print(f"       Сообщение: 'Через {notify_days} дня списание {amount} руб. за {name}'")
 
     if created_count > 0:
@@ -216,7 +214,7 @@ print(f"📨 Всего уведомлений в базе: {total_notifications
 cursor.execute("""
     SELECT 
         n.id,
-        substr(n.user_id, 1, 8) || '...' as user,
+        n.user_id as user,
         n.subscription_id,
         s.name as sub_name,
         n.title,
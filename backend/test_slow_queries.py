@@ -0,0 +1,35 @@
+# backend/test_slow_queries.py
+"""Журнал медленных запросов (SLOW_QUERY_MS): маршрут запроса в записях и без метрик"""
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_SCRIPT = """
+from fastapi.testclient import TestClient
+from backend.benchmarks.common import seed_user
+from backend.database import engine, init_db
+from backend.main import app
+from backend.utils.security import create_access_token
+
+init_db()
+user_id = seed_user(engine, "slow@example.com", subscriptions=2)
+headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id}, 60)}"}
+assert TestClient(app).get("/api/subscriptions", headers=headers).status_code == 200
+"""
+
+
+def test_entries_have_route_without_metrics(tmp_path):
+    log_path = tmp_path / "slow.jsonl"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'slow.db'}", "SLOW_QUERY_MS": "0.0001",
+           "SLOW_QUERY_LOG": str(log_path), "METRICS_ENABLED": "0", "LOG_LEVEL": "WARNING"}
+    result = subprocess.run([sys.executable, "-c", REQUEST_SCRIPT], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    routes = {json.loads(line)["route"] for line in log_path.read_text().splitlines()}
+    # Запросы init_db и seed_user идут вне HTTP-запроса
+    assert "GET /api/subscriptions" in routes
+    assert routes <= {None, "GET /api/subscriptions"}
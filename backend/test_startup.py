@@ -0,0 +1,24 @@
+# backend/test_startup.py
+"""Импорт приложения без побочных эффектов: ни базы, ни потоков, ни настройки логов"""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = (
+    "import logging, threading; import backend.main; "
+    "print(threading.active_count(), len(logging.getLogger('backend').handlers))"
+)
+
+
+def test_import_has_no_side_effects(tmp_path):
+    db_path = tmp_path / "import.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    threads, handlers = output.split()
+    assert threads == "1", "импорт запустил потоки"
+    assert handlers == "0", "импорт настроил логирование"
+    assert not db_path.exists(), "импорт создал файл базы"
@@ -0,0 +1,83 @@
+# backend/test_write_queue.py
+"""Очередь записей (WRITE_QUEUE): пачка одним коммитом, откат одной записи, обработчики через писателя"""
+import pytest
+from sqlalchemy import select, update
+
+from backend.database import user_engines, user_session
+from backend.models.subscription import Subscription
+from backend.services.write_queue import WriteQueue, start_write_queues, stop_write_queues
+from backend.utils.metrics import WRITE_QUEUE_COMMITS, WRITE_QUEUE_JOBS, registry
+
+
+def counter(metric) -> float:
+    return sum(registry.collect(metric).values())
+
+
+def set_amount(sub_id: int, amount: int, fail: bool = False):
+    def write(db):
+        db.execute(update(Subscription).where(Subscription.id == sub_id).values(currentAmount=amount))
+        db.commit()
+        if fail:
+            raise ValueError("запись отменена")
+        return amount
+    return write
+
+
+def amounts(user_id: int) -> list:
+    with user_session(user_id) as db:
+        return list(db.scalars(
+            select(Subscription.currentAmount).where(Subscription.userId == user_id).order_by(Subscription.id)
+        ))
+
+
+@pytest.fixture
+def write_queues():
+    start_write_queues()
+    yield
+    stop_write_queues()
+
+
+def test_batch_commits_once_and_isolates_failures(make_user):
+    user_id, _ = make_user(subscriptions=3)
+    with user_session(user_id) as db:
+        sub_ids = list(db.scalars(select(Subscription.id).where(Subscription.userId == user_id).order_by(Subscription.id)))
+    before = amounts(user_id)
+
+    writer = WriteQueue(user_engines()[0])
+    commits = counter(WRITE_QUEUE_COMMITS)
+    # Все три записи уже в очереди к старту писателя: они уходят одной пачкой
+    futures = [
+        writer.submit(set_amount(sub_ids[0], 901)),
+        writer.submit(set_amount(sub_ids[1], 902, fail=True)),
+        writer.submit(set_amount(sub_ids[2], 903)),
+    ]
+    writer.start()
+    try:
+        assert futures[0].result(timeout=10) == 901
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=10)
+        assert futures[2].result(timeout=10) == 903
+    finally:
+        writer.stop()
+
+    assert amounts(user_id) == [901, before[1], 903]
+    assert counter(WRITE_QUEUE_COMMITS) == commits + 1
+
+
+def test_serialized_endpoints_go_through_writer(client, make_user, write_queues):
+    user_id, headers = make_user(subscriptions=2)
+    with user_session(user_id) as db:
+        sub_id = db.scalar(select(Subscription.id).where(Subscription.userId == user_id).order_by(Subscription.id))
+    jobs = counter(WRITE_QUEUE_JOBS)
+
+    for amount in (310, 320, 330):
+        response = client.patch(f"/api/subscriptions/{sub_id}", headers=headers, json={"currentAmount": amount})
+        assert response.status_code == 200, response.text
+        assert response.json()["currentAmount"] == amount
+    # Ошибка обработчика в писателе доходит до клиента как обычно
+    assert client.patch("/api/subscriptions/0", headers=headers, json={"currentAmount": 1}).status_code == 404
+    # Ошибку записи писатель отдает до коммита пачки и счетчиков: дожидаемся его
+    stop_write_queues()
+
+    assert amounts(user_id)[0] == 330
+    assert counter(WRITE_QUEUE_JOBS) == jobs + 4
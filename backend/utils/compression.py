@@ -0,0 +1,127 @@
+# backend/utils/compression.py
+"""
+Сжатие ответов по Accept-Encoding: brotli (если установлен пакет brotli) или gzip.
+
+Сжимаются только ответы целиком (JSONResponse и т.п.) не меньше
+COMPRESSION_MIN_SIZE байт с текстовым или JSON Content-Type. Потоковые ответы,
+в том числе SSE /notifications/stream, проходят без изменений: буферизация
+задержала бы доставку событий.
+
+Уровни подобраны по backend/benchmarks/bench_compression.py: gzip 3 — последний
+«быстрый» уровень deflate, с 4-го время растет в 2-2.5 раза ради ~15% размера;
+brotli 3 сжимает сильнее gzip 9 при CPU на уровне gzip 3.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "3"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+SKIP_TYPES = ("text/event-stream",)
+
+
+def accepted_encodings(header: str) -> dict:
+    """Accept-Encoding -> {кодировка: q}"""
+    encodings = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header: str):
+    """br, gzip или None; при равных q предпочитаем brotli"""
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get("*", 0.0)
+    candidates = []
+    if brotli is not None:
+        candidates.append(("br", encodings.get("br", wildcard)))
+    candidates.append(("gzip", encodings.get("gzip", wildcard)))
+    encoding, q = max(candidates, key=lambda item: item[1])
+    return encoding if q > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: одинаковое тело дает одинаковые байты
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size: int = None):
+        self.app = app
+        self.min_size = COMPRESSION_MIN_SIZE if min_size is None else min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (b"content-encoding" in headers or content_type.startswith(SKIP_TYPES)
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Решение принимается по первому куску тела
+                    start = message
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [(name, value) for name, value in start.get("headers", [])
+                       if name not in (b"content-length", b"vary")]
+            vary = [value for name, value in start.get("headers", []) if name == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
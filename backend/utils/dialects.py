@@ -0,0 +1,40 @@
+# backend/utils/dialects.py
+"""
+SQL, который в поддерживаемых СУБД пишется по-разному.
+
+upsert_insert — INSERT ... ON CONFLICT DO UPDATE своего диалекта. У SQLite и
+PostgreSQL он устроен одинаково (on_conflict_do_update, excluded, RETURNING);
+для остальных СУБД — None, и вызывающий код идет переносимым путем: UPDATE,
+а если строки нет — INSERT.
+
+greatest(a, b) — наибольшее из значений: GREATEST в PostgreSQL и MySQL, скалярный
+max(a, b) в SQLite, где GREATEST нет.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import ReturnTypeFromArgs
+
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def dialect_of(db: Session):
+    return db.get_bind().dialect
+
+
+def upsert_insert(db: Session, model):
+    """insert(model) с on_conflict_do_update для диалекта сессии или None"""
+    insert = UPSERT_INSERTS.get(dialect_of(db).name)
+    return insert(model) if insert is not None else None
+
+
+class greatest(ReturnTypeFromArgs):
+    inherit_cache = True
+
+
+@compiles(greatest, "sqlite")
+def _greatest_sqlite(element, compiler, **kwargs):
+    return f"max({compiler.process(element.clauses, **kwargs)})"
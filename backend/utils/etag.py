@@ -0,0 +1,32 @@
+# backend/utils/etag.py
+"""Слабые ETag и ответ 304 для условных GET"""
+from typing import Optional
+
+from fastapi import Response
+
+# Увеличить при изменении формата ответов: старые ETag клиентов перестанут совпадать
+RESPONSE_REVISION = 1
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + ".".join(str(part) for part in (RESPONSE_REVISION,) + parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение (RFC 9110, 13.1.2): префикс W/ не учитывается"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,59 @@
+# backend/utils/fields.py
+"""
+Разреженные наборы полей: ?fields=id,name,currentAmount сужает и SELECT, и ответ
+до запрошенных полей. Модель ответа и TypeAdapter для набора строятся один раз
+и кешируются (LRU: набор полей приходит от клиента).
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, TypeAdapter, create_model
+
+SPARSE_CACHE_SIZE = 128
+
+
+def parse_fields(raw: Optional[str], allowed: Iterable[str], required: Tuple[str, ...] = ("id",)):
+    """
+    Поля из ?fields= в порядке allowed (порядок в запросе не влияет на ключ кеша и ETag);
+    None — все поля. Неизвестное поле — 400
+    """
+    if not raw:
+        return None
+    allowed = tuple(allowed)
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(sorted(unknown))}"
+        )
+    requested.update(required)
+    return tuple(name for name in allowed if name in requested)
+
+
+def fields_key(fields: Optional[Tuple[str, ...]]) -> str:
+    """Часть ETag: запятая в ETag недопустима, она разделяет значения If-None-Match"""
+    return "+".join(fields) if fields else "*"
+
+
+@lru_cache(maxsize=SPARSE_CACHE_SIZE)
+def sparse_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Модель с подмножеством полей model: те же типы и описания"""
+    return create_model(
+        f"{model.__name__}Sparse",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+
+@lru_cache(maxsize=SPARSE_CACHE_SIZE)
+def sparse_list_adapter(model: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(List[sparse_model(model, fields)])
+
+
+def dump_sparse_rows(model: Type[BaseModel], fields: Tuple[str, ...], rows) -> bytes:
+    """JSON-массив из строк запроса, выбравшего ровно fields; значения из БД не перепроверяются"""
+    sparse = sparse_model(model, fields)
+    return sparse_list_adapter(model, fields).dump_json(
+        [sparse.model_construct(**row._mapping) for row in rows]
+    )
@@ -0,0 +1,94 @@
+# backend/utils/log.py
+"""
+Логирование приложения: структурированные записи, уровень из окружения и
+неблокирующий вывод. Обработчики запросов только кладут запись в очередь
+(QueueHandler); форматирование и запись в поток делает фоновый поток
+QueueListener.
+
+Поток в форк не переходит: воркер backend.serve, унаследовавший настройку мастера,
+настраивает логирование заново (lifespan приложения), а сам мастер пишет в поток
+напрямую (background=False) — до форка фоновых потоков у него нет.
+
+Переменные окружения:
+    LOG_LEVEL   — DEBUG, INFO (по умолчанию), WARNING, ...
+    LOG_FORMAT  — json (по умолчанию) или text
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Стандартные атрибуты LogRecord; все остальное пришло через extra= и попадает в запись
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+_configured_pid = None  # процесс, в котором настроен логгер; после форка — чужая настройка
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: время, уровень, логгер, сообщение и поля из extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = None, fmt: str = None, stream=None, background: bool = True) -> logging.Logger:
+    """
+    Настраивает логгер "backend" один раз на процесс.
+    Повторный вызов только меняет уровень; в форкнутом процессе настройка родителя
+    заменяется своей. background=False — запись в поток без QueueListener
+    """
+    global _listener, _configured_pid
+
+    logger = logging.getLogger("backend")
+    logger.setLevel(level or LOG_LEVEL)
+    if _configured_pid == os.getpid():
+        return logger
+
+    # Унаследованный QueueHandler пишет в очередь, которую в этом процессе никто не читает
+    for inherited in list(logger.handlers):
+        logger.removeHandler(inherited)
+    _listener = None
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    if background:
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    else:
+        logger.addHandler(handler)
+    logger.propagate = False
+    _configured_pid = os.getpid()
+    return logger
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи: перед os._exit(), минуя atexit"""
+    global _listener
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+        _listener = None
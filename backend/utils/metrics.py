@@ -0,0 +1,392 @@
+# backend/utils/metrics.py
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Запись без блокировок: у каждого потока свой шард со счетчиками, экспорт
+суммирует шарды. Обработчики запросов (пул потоков) и цикл событий пишут
+каждый в свой шард.
+
+Выключены по умолчанию: METRICS_ENABLED=1 подключает middleware и /metrics.
+С METRICS_TOKEN /metrics отвечает только на Authorization: Bearer <токен>
+(bearer_token в настройках сбора Prometheus).
+
+Под backend.serve запрос на /metrics попадает в любой из воркеров, поэтому
+воркеры пишут снимки своих метрик в общий каталог METRICS_DIR (мастер создает
+его сам): раз в METRICS_FLUSH_SECONDS, при остановке и перед каждым ответом
+/metrics. Ответ — сумма снимков всех воркеров. Снимок завершившегося воркера
+мастер переносит в archive.json без датчиков (gauge), поэтому счетчики
+не уменьшаются и при перезапуске воркеров.
+
+MetricsMiddleware (чистый ASGI, без BaseHTTPMiddleware) пишет:
+    http_requests_total{method,route,status}
+    http_request_duration_seconds{method,route}     — гистограмма
+    http_request_size_bytes / http_response_size_bytes{method,route}
+    http_request_db_seconds{method,route}           — время SQL за запрос
+    http_requests_in_flight
+instrument_engine() вешает на Engine события SQLAlchemy:
+    db_queries_total{operation}, db_query_duration_seconds{operation}
+Очередь записей (services/write_queue):
+    write_queue_jobs_total, write_queue_commits_total — записей на коммит = отношение
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+ARCHIVE_SNAPSHOT = "archive.json"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+# Запрос, в контексте которого сейчас выполняется SQL: [время SQL, число запросов].
+# Пул потоков Starlette копирует контекст, поэтому синхронные обработчики видят тот же список
+current_request_stats = contextvars.ContextVar("current_request_stats", default=None)
+# ASGI scope текущего запроса: по нему журнал медленных запросов узнает маршрут.
+# Ставят MetricsMiddleware и RequestScopeMiddleware (журнал без метрик)
+current_request_scope = contextvars.ContextVar("current_request_scope", default=None)
+
+
+class Registry:
+    """Набор метрик процесса с пошардовым по потокам хранением"""
+
+    def __init__(self):
+        self.metrics = []
+        self._shards = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            # Блокировка только при первом обращении потока
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        """Забывает значения: форкнутый процесс не должен повторять метрики родителя"""
+        with self._lock:
+            self._shards = []
+            self._local = threading.local()
+
+    def collect(self, metric) -> dict:
+        """Сумма значений метрики по всем шардам: {labels: value или список}"""
+        with self._lock:
+            shards = list(self._shards)
+        total = {}
+        for shard in shards:
+            _add_series(total, list(shard.get(metric.name, {}).items()))
+        return total
+
+    def snapshot(self) -> dict:
+        """Значения всех метрик для JSON: {имя: [[labels, value], ...]}"""
+        return {metric.name: [[list(labels), value] for labels, value in self.collect(metric).items()]
+                for metric in self.metrics}
+
+    def render(self, collected: dict = None) -> str:
+        """Текст для Prometheus; collected — готовые значения {имя: {labels: value}} вместо своих"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            values = self.collect(metric) if collected is None else collected.get(metric.name, {})
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+
+def _add_series(total: dict, series):
+    """Прибавляет к total пары (labels, value); у гистограмм value — список корзин"""
+    for labels, value in series:
+        if isinstance(value, list):
+            acc = total.setdefault(labels, [0] * len(value))
+            for i, item in enumerate(value):
+                acc[i] += item
+        else:
+            total[labels] = total.get(labels, 0) + value
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry: Registry, name: str, documentation: str, labelnames: tuple = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.register(self)
+
+    def inc(self, labels: tuple = (), value: float = 1):
+        series = self.registry.shard().setdefault(self.name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def render(self, values: dict) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                for labels, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), value: float = 1):
+        self.inc(labels, -value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry: Registry, name: str, documentation: str,
+                 labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def observe(self, labels: tuple, value: float):
+        series = self.registry.shard().setdefault(self.name, {})
+        # [по корзинам (последняя — +Inf)..., сумма, количество]
+        state = series.get(labels)
+        if state is None:
+            state = series[labels] = [0] * (len(self.buckets) + 3)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def render(self, values: dict) -> list:
+        lines = []
+        for labels, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), state):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+registry = Registry()
+
+HTTP_REQUESTS = Counter(registry, "http_requests_total", "HTTP requests by route template and status",
+                        ("method", "route", "status"))
+HTTP_DURATION = Histogram(registry, "http_request_duration_seconds", "HTTP request latency",
+                          ("method", "route"))
+HTTP_REQUEST_SIZE = Histogram(registry, "http_request_size_bytes", "HTTP request body size",
+                              ("method", "route"), SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = Histogram(registry, "http_response_size_bytes", "HTTP response body size",
+                               ("method", "route"), SIZE_BUCKETS)
+HTTP_DB_TIME = Histogram(registry, "http_request_db_seconds", "Time spent in SQL per HTTP request",
+                         ("method", "route"), DB_BUCKETS)
+HTTP_IN_FLIGHT = Gauge(registry, "http_requests_in_flight", "HTTP requests being processed")
+DB_QUERIES = Counter(registry, "db_queries_total", "SQL statements executed", ("operation",))
+DB_DURATION = Histogram(registry, "db_query_duration_seconds", "SQL statement duration",
+                        ("operation",), DB_BUCKETS)
+WRITE_QUEUE_JOBS = Counter(registry, "write_queue_jobs_total", "Writes executed by the write queue")
+WRITE_QUEUE_COMMITS = Counter(registry, "write_queue_commits_total", "Write queue transactions, one commit each")
+
+
+def route_template(scope) -> str:
+    """Шаблон пути (/api/subscriptions/{subscription_id}), а не сам путь: ограниченная кардинальность"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class RequestScopeMiddleware:
+    """Только current_request_scope, без учета метрик: маршрут для журнала медленных запросов"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request_scope.reset(token)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, skip_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        response = [500, 0]  # статус, байт тела ответа
+        stats = [0.0, 0]
+        token = current_request_stats.set(stats)
+        scope_token = current_request_scope.set(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+            current_request_scope.reset(scope_token)
+            labels = (scope["method"], route_template(scope))
+            HTTP_REQUESTS.inc(labels + (str(response[0]),))
+            HTTP_DURATION.observe(labels, time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.observe(labels, response[1])
+            HTTP_DB_TIME.observe(labels, stats[0])
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    HTTP_REQUEST_SIZE.observe(labels, int(value))
+                    break
+            else:
+                HTTP_REQUEST_SIZE.observe(labels, 0)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Начало — в контексте выполнения, а не в соединении: у упавшего оператора
+    # after_cursor_execute не вызывается, и запись в conn.info осталась бы навсегда
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    operation = statement.lstrip()[:6].upper()
+    if operation not in SQL_OPERATIONS:
+        operation = "OTHER"
+    DB_QUERIES.inc((operation,))
+    DB_DURATION.observe((operation,), elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats[0] += elapsed
+        stats[1] += 1
+
+
+def instrument_engine(engine):
+    """Подключает учет SQL-запросов к Engine (один раз)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstrument_engine(engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Форкнутый воркер начинает с нуля: иначе метрики мастера (проверка схемы до форка)
+# попали бы в сумму по разу от каждого воркера
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def _write_json(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(data, snapshot_file)
+    # Читатель видит старый или новый снимок целиком
+    os.replace(tmp_path, path)
+
+
+def _read_series(path: str) -> dict:
+    """{имя: [(labels, value), ...]} из файла снимка; нет файла — пусто"""
+    try:
+        with open(path, encoding="utf-8") as snapshot_file:
+            data = json.load(snapshot_file)
+    except FileNotFoundError:
+        return {}
+    return {name: [(tuple(labels), value) for labels, value in series] for name, series in data.items()}
+
+
+@contextmanager
+def _locked(directory: str, exclusive: bool):
+    """Чтение снимков (общая блокировка) не пересекается с переносом в архив (исключительная)"""
+    import fcntl
+
+    with open(os.path.join(directory, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_snapshot(directory: str = None):
+    """Снимок метрик этого процесса в METRICS_DIR/<pid>.json"""
+    _write_json(_snapshot_path(directory or METRICS_DIR, os.getpid()), registry.snapshot())
+
+
+def render_snapshots(directory: str = None) -> str:
+    """Сумма снимков всех воркеров и архива; свой снимок обновляется перед чтением"""
+    directory = directory or METRICS_DIR
+    write_snapshot(directory)
+    collected = {}
+    with _locked(directory, exclusive=False):
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                for metric_name, series in _read_series(os.path.join(directory, name)).items():
+                    _add_series(collected.setdefault(metric_name, {}), series)
+    return registry.render(collected)
+
+
+def archive_snapshot(pid: int, directory: str = None):
+    """Переносит снимок завершившегося воркера в архив: счетчики и гистограммы, без датчиков"""
+    directory = directory or METRICS_DIR
+    path = _snapshot_path(directory, pid)
+    gauges = {metric.name for metric in registry.metrics if metric.kind == "gauge"}
+    with _locked(directory, exclusive=True):
+        if not os.path.exists(path):
+            return
+        archive_path = os.path.join(directory, ARCHIVE_SNAPSHOT)
+        archive = {}
+        for name, series in _read_series(archive_path).items():
+            _add_series(archive.setdefault(name, {}), series)
+        for name, series in _read_series(path).items():
+            if name not in gauges:
+                _add_series(archive.setdefault(name, {}), series)
+        _write_json(archive_path, {
+            name: [[list(labels), value] for labels, value in series.items()] for name, series in archive.items()
+        })
+        os.remove(path)
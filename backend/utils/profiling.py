@@ -0,0 +1,201 @@
+# backend/utils/profiling.py
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если в нем есть заголовок X-Profile-Token с токеном
+администратора (PROFILING_ADMIN_TOKEN) или он попал в выборку PROFILE_SAMPLE_RATE.
+Если ни токен, ни доля выборки не заданы, middleware не подключается вовсе.
+
+Режимы (PROFILE_MODE):
+    sampling — статистический профиль: отдельный поток раз в PROFILE_INTERVAL_MS
+               снимает стеки всех потоков, где выполняется код backend (цикл событий
+               и пул потоков синхронных обработчиков). Файл .speedscope.json,
+               открывается на https://www.speedscope.app
+    cprofile — cProfile потока цикла событий, файл .pstats. Подходит для async
+               обработчиков; синхронные выполняются в пуле потоков и сюда не попадут
+
+Файлы складываются в PROFILE_DIR, хранятся последние PROFILE_MAX_FILES.
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.utils.metrics import route_template
+
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "subs-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(speedscope\.json|pstats)$")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILING_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def is_admin_token(token: str) -> bool:
+    return bool(PROFILING_ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+
+class StackSampler(threading.Thread):
+    """Снимает стеки потоков с кодом backend, пока не вызван stop()"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples = {}  # thread_id -> Counter(стек от корня к листу)
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                in_backend = False
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    in_backend = in_backend or code.co_filename.startswith(BACKEND_DIR)
+                    frame = frame.f_back
+                # Простаивающие потоки пула и цикл событий в select() не интересны
+                if in_backend:
+                    self.samples.setdefault(thread_id, Counter())[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        self.duration = time.perf_counter() - self.started
+
+    def to_speedscope(self, name: str) -> dict:
+        frames, index = [], {}
+        profiles = []
+        for thread_id, stacks in self.samples.items():
+            samples, weights = [], []
+            for stack, count in stacks.items():
+                ids = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    ids.append(index[frame])
+                samples.append(ids)
+                weights.append(count * self.interval)
+            profiles.append({
+                "type": "sampled", "name": f"thread {thread_id}", "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name, "exporter": "backend.utils.profiling",
+            "shared": {"frames": frames}, "profiles": profiles,
+        }
+
+
+def _profile_filename(scope, extension: str) -> str:
+    route = re.sub(r"[^\w-]+", "_", route_template(scope)).strip("_") or "root"
+    return f"{time.time_ns()}-{scope['method']}-{route}.{extension}"
+
+
+def _save(filename: str, write) -> None:
+    """Записывает профиль и удаляет самые старые файлы сверх PROFILE_MAX_FILES"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    write(os.path.join(PROFILE_DIR, filename))
+    for stale in list_profiles()[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, stale["name"]))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles() -> list:
+    """Профили от новых к старым"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if PROFILE_NAME.match(name):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            profiles.append({"name": name, "size": stat.st_size, "created_at": stat.st_mtime})
+    return sorted(profiles, key=lambda item: item["name"], reverse=True)
+
+
+def profile_path(name: str):
+    """Путь к профилю или None, если имя недопустимо или файла нет"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, sample_rate: float = None, mode: str = None):
+        self.app = app
+        self.sample_rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.mode = mode or PROFILE_MODE
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile-token":
+                return is_admin_token(value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        extension = "pstats" if self.mode == "cprofile" else "speedscope.json"
+        filename = None
+
+        async def send_wrapper(message):
+            nonlocal filename
+            if message["type"] == "http.response.start":
+                # Маршрут уже известен: имя файла отдаем клиенту в заголовке
+                filename = _profile_filename(scope, extension)
+                message = {**message, "headers": list(message.get("headers", [])) +
+                           [(b"x-profile-id", filename.encode())]}
+            await send(message)
+
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+            if filename:
+                await run_in_threadpool(_save, filename, profiler.dump_stats)
+            return
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+        if filename:
+            document = sampler.to_speedscope(f"{scope['method']} {scope['path']}")
+
+            def write(path):
+                with open(path, "w") as profile_file:
+                    json.dump(document, profile_file)
+
+            await run_in_threadpool(_save, filename, write)
@@ -0,0 +1,162 @@
+# backend/utils/query_tracker.py
+"""
+Учет SQL-запросов в пределах HTTP-запроса и поиск N+1.
+
+QueryTracker считает запросы, время SQL и повторы одинаковых по форме
+операторов (одинаковый SQL с разными параметрами подряд — признак N+1).
+
+QueryTrackerMiddleware включается при QUERY_DEBUG=1: добавляет в ответ
+заголовки X-DB-Query-Count, X-DB-Time-Ms и X-DB-Repeated-Statements и пишет
+предупреждение в лог, если одна форма повторилась N_PLUS_ONE_THRESHOLD раз.
+
+track_queries() — то же для тестов и скриптов: учитывает все запросы
+процесса, включая выполненные в потоке TestClient.
+"""
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from backend.utils.metrics import route_template
+
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger(__name__)
+
+_current_tracker = contextvars.ContextVar("current_query_tracker", default=None)
+_global_trackers = []
+_global_lock = threading.Lock()
+
+# Списки параметров IN (?, ?, ?) разной длины — одна и та же форма оператора
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)")
+_POSTCOMPILE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _IN_LIST.sub("(?...)", statement)
+    return " ".join(_POSTCOMPILE.sub("(?...)", shape).split())
+
+
+class QueryTracker:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = 2) -> list:
+        """[(форма, сколько раз)] для операторов, выполненных не меньше threshold раз"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Как в utils/metrics: начало в контексте выполнения, упавший оператор его не оставит
+    context._tracker_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._tracker_query_start
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement, elapsed)
+    if _global_trackers:
+        for tracker in list(_global_trackers):
+            tracker.record(statement, elapsed)
+
+
+def instrument_engine(engine):
+    """Подключает трекер к Engine (один раз)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries(engine=None):
+    """Учитывает все SQL-запросы процесса внутри блока"""
+    if engine is not None:
+        instrument_engine(engine)
+    tracker = QueryTracker()
+    with _global_lock:
+        _global_trackers.append(tracker)
+    try:
+        yield tracker
+    finally:
+        with _global_lock:
+            _global_trackers.remove(tracker)
+
+
+class QueryTrackerMiddleware:
+    def __init__(self, app, threshold: int = None):
+        self.app = app
+        self.threshold = threshold or N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker()
+        token = _current_tracker.set(tracker)
+
+        async def send_wrapper(message):
+            # Заголовки уходят до тела: к этому моменту обработчик уже выполнил свои запросы
+            if message["type"] == "http.response.start":
+                repeated = tracker.repeated(self.threshold)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(tracker.count).encode()))
+                headers.append((b"x-db-time-ms", f"{tracker.seconds * 1000:.2f}".encode()))
+                headers.append((b"x-db-repeated-statements", str(len(repeated)).encode()))
+                message = {**message, "headers": headers}
+                for shape, count in repeated:
+                    logger.warning(
+                        "Возможный N+1: оператор выполнен %s раз за запрос", count,
+                        extra={"route": route_template(scope), "statement": shape[:500]}
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_tracker.reset(token)
+
+
+# Фикстура нужна только под pytest, который к этому моменту уже загружен; сам импорт
+# pytest стоит ~0.1 с и не должен доставаться каждому старту приложения
+pytest = sys.modules.get("pytest")
+
+if pytest is not None:
+    @pytest.fixture
+    def query_budget():
+        """
+        Фикстура pytest (подключена в backend/conftest.py):
+
+            def test_list(client, query_budget):
+                with query_budget(3):
+                    client.get("/api/subscriptions", headers=auth)
+        """
+        from backend.database import all_engines
+
+        @contextmanager
+        def budget(max_queries: int):
+            for db_engine in all_engines():
+                instrument_engine(db_engine)
+            with track_queries() as tracker:
+                yield tracker
+            assert tracker.count <= max_queries, (
+                f"{tracker.count} SQL-запросов при бюджете {max_queries}: {tracker.shapes.most_common()}"
+            )
+
+        return budget
@@ -0,0 +1,166 @@
+# backend/utils/slow_queries.py
+"""
+Журнал медленных SQL-запросов.
+
+Каждый оператор дольше SLOW_QUERY_MS записывается строкой JSON в SLOW_QUERY_LOG
+(ротация по SLOW_QUERY_MAX_BYTES, SLOW_QUERY_BACKUPS файлов): нормализованный SQL,
+форма параметров, длительность, маршрут, из которого выполнен запрос, и план
+EXPLAIN QUERY PLAN. План снимается один раз на форму оператора; остальные
+записи этой формы ссылаются на него по shape_id.
+
+Журнал выключен по умолчанию (SLOW_QUERY_MS=0): он пишет на диск и выполняет
+EXPLAIN в пути запроса. Включается порогом, например SLOW_QUERY_MS=250.
+Сводка: python -m backend.manage slow-queries
+"""
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from backend.utils.metrics import current_request_scope, route_template
+from backend.utils.query_tracker import statement_shape
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(tempfile.gettempdir(), "subs-slow-queries.jsonl"))
+SLOW_QUERY_MAX_BYTES = int(os.getenv("SLOW_QUERY_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_BACKUPS = int(os.getenv("SLOW_QUERY_BACKUPS", "5"))
+EXPLAINED_SHAPES_LIMIT = 1000
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def parameters_shape(parameters, executemany: bool):
+    """Типы параметров без значений: в журнал не попадают пользовательские данные"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameters_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def shape_id(shape: str) -> str:
+    return hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    def __init__(self, path: str = None, threshold_ms: float = None,
+                 max_bytes: int = None, backups: int = None):
+        self.path = path or SLOW_QUERY_LOG
+        self.threshold = (SLOW_QUERY_MS if threshold_ms is None else threshold_ms) / 1000
+        self.explained = set()
+        self.logger = logging.getLogger(f"backend.slow_queries.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self._dir_ready = False
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_bytes or SLOW_QUERY_MAX_BYTES,
+            backupCount=SLOW_QUERY_BACKUPS if backups is None else backups, encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Начало — в контексте выполнения: упавший оператор не оставит его в соединении
+        context._slow_query_start = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_start
+        if elapsed < self.threshold:
+            return
+
+        shape = statement_shape(statement)
+        key = shape_id(shape)
+        scope = current_request_scope.get()
+        entry = {
+            "ts": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "shape_id": key,
+            "sql": shape,
+            "params": parameters_shape(parameters, executemany),
+            "duration_ms": round(elapsed * 1000, 3),
+            "route": f"{scope['method']} {route_template(scope)}" if scope else None,
+        }
+        if key not in self.explained and len(self.explained) < EXPLAINED_SHAPES_LIMIT:
+            self.explained.add(key)
+            entry["plan"] = self.explain(conn, statement, parameters, executemany)
+        if not self._dir_ready:
+            # Каталог создаем при первой записи, а не при импорте database.py
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._dir_ready = True
+        self.logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    @staticmethod
+    def explain(conn, statement: str, parameters, executemany: bool):
+        if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        if executemany:
+            parameters = list(parameters)[0] if parameters else ()
+        # Отдельный курсор того же соединения: результаты основного запроса не трогаем
+        raw = conn.connection.driver_connection.cursor()
+        try:
+            rows = raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            raw.close()
+        return [row[-1] for row in rows]
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def detach(self, engine):
+        event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self.after_cursor_execute)
+
+
+def read_entries(path: str = None) -> list:
+    """Записи текущего файла и его ротаций, от старых к новым"""
+    path = path or SLOW_QUERY_LOG
+    files = [f"{path}.{i}" for i in range(SLOW_QUERY_BACKUPS, 0, -1)] + [path]
+    entries = []
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as log_file:
+            for line in log_file:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    return entries
+
+
+def summarize(entries: list, order_by: str = "total") -> list:
+    """Сводка по формам операторов: количество, суммарное/максимальное/p95 время, маршруты, план"""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry["shape_id"], {
+            "shape_id": entry["shape_id"], "sql": entry["sql"], "durations": [],
+            "routes": {}, "plan": None
+        })
+        group["durations"].append(entry["duration_ms"])
+        route = entry.get("route") or "-"
+        group["routes"][route] = group["routes"].get(route, 0) + 1
+        if entry.get("plan"):
+            group["plan"] = entry["plan"]
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop("durations"))
+        group.update({
+            "count": len(durations),
+            "total_ms": round(sum(durations), 3),
+            "max_ms": durations[-1],
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        })
+        summary.append(group)
+    key = {"total": "total_ms", "max": "max_ms", "count": "count", "p95": "p95_ms"}[order_by]
+    return sorted(summary, key=lambda item: item[key], reverse=True)